@@ -1,20 +1,171 @@
 import logging
+import string
+import threading
+import time
+import weakref
+from urllib.parse import quote
 
 import requests
 
+from apis.cache import ResponseCache
+from apis.circuitbreaker import CircuitBreaker, CircuitOpenError
+from apis.codec import JSONCodec, get_codec, encode_json_body
+from apis.deadline import (Deadline, DeadlineExceeded, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT,
+                           current_deadline, normalize_timeout)
+from apis.healthcheck import HealthStatus, HealthMonitor, DEFAULT_HEALTHCHECK_INTERVAL, DEFAULT_HEALTHCHECK_TIMEOUT
+from apis.keypool import KeyPool, NoKeyAvailableError
+from apis.metrics import RequestEvent, TimedHTTPAdapter, emit, get_connect_time, reset_connect_time
+from apis.ratelimit import TokenBucket
+from apis.retry import RetryPolicy
+from apis.singleflight import SingleFlight, flight_key
+from apis.stream import iter_response
+from apis.transport import Transport
+
 logger = logging.getLogger('APIs.API')
 
 SUCCESS_HTTP_CODES = [200, 201, 202, 204]
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+# verbs accepted by _request, each one is dispatched to the transport method of the same name
+HTTP_METHODS = frozenset({'get', 'post', 'put', 'patch', 'delete', 'head'})
+
+
+class RequestStats:
+    """
+    Class responsible for collecting the statistics of a single call, it is provided by the caller to get, post
+    or _request and filled while the request is made.
+    """
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.retries = 0
+        self.status_code = None
+        # Date header of the response, the server time when it was sent
+        self.date = None
+        self.from_cache = False
+        self.coalesced = False
+
+
+def _record_response(event: RequestEvent, response: requests.Response, started: float, streamed: bool) -> None:
+    """
+    Fills the event with the status, phase durations and sizes of the response.
+
+    :param RequestEvent event: event of the attempt.
+    :param requests.Response response: response received.
+    :param float started: time.perf_counter value taken before the request was sent.
+    :param bool streamed: if True, the body has not been read and its size is taken from the Content-Length header.
+    """
+    event.status_code = response.status_code
+    event.elapsed = time.perf_counter() - started
+    event.connect = get_connect_time()
+    # requests measures the time until the response headers are parsed, which includes opening the connection
+    headers_at = response.elapsed.total_seconds()
+    event.ttfb = max(0.0, headers_at - event.connect)
+    event.read = max(0.0, event.elapsed - headers_at)
+
+    body = response.request.body if response.request is not None else None
+    if body is not None and isinstance(body, (bytes, str)):
+        event.bytes_out = len(body.encode('utf-8') if isinstance(body, str) else body)
+    if streamed:
+        length = response.headers.get('Content-Length')
+        event.bytes_in = int(length) if length and length.isdigit() else None
+    else:
+        event.bytes_in = len(response.content)
+
+
+def _fits(deadline: Deadline or None, delay: float) -> bool:
+    """
+    :return: True if a retry after delay seconds still has time to be sent before the deadline, if there is one.
+    """
+    if deadline is None or delay < deadline.remaining():
+        return True
+    logger.warning('Retry in %.2fs given up, %.2fs left to the deadline', delay, deadline.remaining())
+    return False
+
+
+class EndpointTemplates:
+    """
+    Class responsible for resolving endpoint keys into urls.
+
+    Endpoints may contain path fields, e.g. "/persons/{id}". The urls are built and parsed once at construction, so
+    resolving an endpoint is a dict lookup plus, for templates, a format call with the quoted path parameters.
+    """
+
+    def __init__(self, base_url: str, endpoints: dict) -> None:
+        """
+        :param str base_url: url prepended to every endpoint.
+        :param dict endpoints: dictionary with the endpoint paths by endpoint key.
+        """
+        self._urls = {}
+        for endpoint_key, path in endpoints.items():
+            url = base_url + path
+            fields = frozenset(field for _, field, _, _ in string.Formatter().parse(url) if field)
+            self._urls[endpoint_key] = (url, fields)
+
+    def url(self, endpoint_key: str, path_params: dict = None) -> str:
+        """
+        :param str endpoint_key: endpoint key, as defined in the api_source.
+        :param dict path_params: dictionary with the values of the endpoint path fields.
+
+        :return: url of the endpoint.
+        """
+        url, fields = self._urls[endpoint_key]
+        if not fields:
+            return url
+        path_params = path_params or {}
+        missing = fields - path_params.keys()
+        if missing:
+            raise KeyError(f'{endpoint_key} path field {", ".join(sorted(missing))}')
+        return url.format_map({field: quote(str(path_params[field]), safe='') for field in fields})
 
 
 class API:
 
-    def __init__(self, api_source: dict, enforce_healthcheck: bool = False) -> None:
+    def __init__(self, api_source: dict, enforce_healthcheck: bool = False,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = False, keep_alive: bool = True,
+                 healthcheck_interval: float = DEFAULT_HEALTHCHECK_INTERVAL,
+                 healthcheck_background: bool = False,
+                 healthcheck_timeout: float = DEFAULT_HEALTHCHECK_TIMEOUT, retry_policy: RetryPolicy = None,
+                 rate_limiter: TokenBucket = None, response_cache: ResponseCache = None,
+                 json_codec: JSONCodec = None, hooks: list = None, single_flight: bool = False,
+                 circuit_breaker: CircuitBreaker = None,
+                 timeout: float or tuple = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 timeouts: dict = None, transport: Transport = None, key_pool: KeyPool = None) -> None:
         """
         :param dict api_source: dict containing API consumption paths and keys.
             The dict has the following keys:
             - endpoints: dictionary with "base_url", "healthcheck", and resource endpoints;
         :param bool enforce_healthcheck: boolean that enables healthcheck validation before API consumption.
+        :param int pool_connections: number of per-host connection pools kept by the session.
+        :param int pool_maxsize: maximum number of connections kept alive for a single host.
+        :param bool pool_block: if True, requests wait for a free connection instead of opening extra ones
+            when the per-host pool is exhausted.
+        :param bool keep_alive: if False, the connection is closed after every request.
+        :param float healthcheck_interval: seconds the healthcheck result is cached, 0 checks before every request.
+        :param bool healthcheck_background: if True, a background thread refreshes the healthcheck every
+            healthcheck_interval seconds and requests never wait for it.
+        :param float healthcheck_timeout: seconds the healthcheck request waits for the API.
+        :param RetryPolicy retry_policy: policy used to retry failed requests, if not provided requests are not retried.
+        :param TokenBucket rate_limiter: bucket pacing every request of the instance, it may be shared with other
+            instances using the same credentials.
+        :param ResponseCache response_cache: cache of successful GET responses, if not provided nothing is cached.
+        :param JSONCodec json_codec: codec encoding the json payloads and decoding the responses, defaults to the
+            fastest one installed, see apis.codec.get_codec.
+        :param list hooks: list of RequestHooks receiving the events of every request attempt, e.g. a
+            MetricsCollector.
+        :param bool single_flight: if True, identical GET requests made by concurrent threads share one request and
+            its response, which must not be mutated.
+        :param CircuitBreaker circuit_breaker: breaker failing fast the requests of endpoints that keep failing, with
+            one circuit per endpoint key. If not provided requests always reach the API.
+        :param timeout: seconds a request waits to connect and for each read, as a number or a (connect, read) tuple.
+            None waits forever. A timeout passed to a request replaces it.
+        :param dict timeouts: timeout by endpoint key, replacing the timeout of the instance for the endpoint.
+        :param Transport transport: transport sending the requests, e.g. a HTTPXTransport for HTTP/2. If not provided
+            a connection-pooled requests Session is built from the pool options.
+        :param KeyPool key_pool: pool of credentials the requests are spread over, each attempt takes a key from it
+            and an attempt rejected or throttled by the API is sent again right away with another key. It may be
+            shared with other instances, sync or async, of the same API.
         """
         self.api_source = api_source
         try:
@@ -22,9 +173,109 @@ class API:
             if enforce_healthcheck:
                 self.hc_url = self.base_url + api_source["endpoints"]["healthcheck"]
         except KeyError as e:
-            logger.error(f"Invalid API source, key {str(e)} not found.")
+            logger.error("Invalid API source, key %s not found.", e)
             raise
+        if key_pool is not None and type(self)._with_key is API._with_key:
+            raise ValueError(f'{type(self).__name__} does not support a key pool.')
         self.enforce_healthcheck = enforce_healthcheck
+        # the transport is kept as session, the requests Session being the default one
+        self.session = transport if transport is not None else self._build_session(pool_connections, pool_maxsize,
+                                                                                     pool_block, keep_alive)
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.json_codec = json_codec or get_codec()
+        self.hooks = list(hooks or [])
+        self.single_flight = SingleFlight() if single_flight else None
+        self.circuit_breaker = circuit_breaker
+        self.timeout = normalize_timeout(timeout)
+        self.timeouts = {key: normalize_timeout(value) for key, value in (timeouts or {}).items()}
+        self.key_pool = key_pool
+
+        self.health = HealthStatus(interval=healthcheck_interval)
+        self.healthcheck_timeout = healthcheck_timeout
+        self._health_lock = threading.Lock()
+        self._health_monitor = HealthMonitor(self.health, self._weak_health_probe())
+        if enforce_healthcheck and healthcheck_background:
+            self._health_monitor.start()
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, base_url: str) -> None:
+        self._base_url = base_url
+        self.endpoints = EndpointTemplates(base_url, self.api_source["endpoints"])
+
+    def _url(self, endpoint_key: str, path_params: dict = None) -> str:
+        """
+        :param str endpoint_key: endpoint key, as defined in the api_source.
+        :param dict path_params: dictionary with the values of the endpoint path fields.
+
+        :return: url of the endpoint.
+        """
+        try:
+            return self.endpoints.url(endpoint_key, path_params)
+        except KeyError as e:
+            logger.error("Invalid API source, key %s not found.", e)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @staticmethod
+    def _build_session(pool_connections: int, pool_maxsize: int, pool_block: bool,
+                       keep_alive: bool) -> requests.Session:
+        """
+        Method responsible for creating the connection-pooled session used by every request of the instance.
+
+        :param int pool_connections: number of per-host connection pools kept by the session.
+        :param int pool_maxsize: maximum number of connections kept alive for a single host.
+        :param bool pool_block: if True, requests wait for a free pooled connection.
+        :param bool keep_alive: if False, the connection is closed after every request.
+
+        :return: configured requests Session.
+        """
+        if not pool_connections > 0:
+            raise ValueError("pool_connections must be a integer greater than 0.")
+        if not pool_maxsize > 0:
+            raise ValueError("pool_maxsize must be a integer greater than 0.")
+
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self) -> None:
+        """
+        Closes the session and every pooled connection held by it.
+        """
+        self._health_monitor.stop(timeout=self.healthcheck_timeout)
+        self.session.close()
+
+    def _weak_health_probe(self):
+        """
+        Builds the probe of the background healthcheck. It only holds a weak reference to the instance, so the monitor
+        thread does not keep an API that was never closed alive, and stops once the instance is collected.
+
+        :return: callable returning the healthcheck result, or None if the instance no longer exists.
+        """
+        api_ref = weakref.ref(self)
+
+        def probe() -> int or dict or None:
+            api = api_ref()
+            if api is None:
+                return None
+            return api._api_health_check(api.hc_url)
+
+        return probe
 
     def _api_health_check(self, url: str) -> int or dict:
         """
@@ -35,102 +286,338 @@ class API:
         :return: 200 if healthcheck is OK or a dict with the error in healthcheck validation.
         """
         try:
-            response = requests.get(url=url)
-            logger.info(f'API HealthCheck status code: "{response.status_code}"')
+            response = self.session.get(url=url, timeout=self.healthcheck_timeout)
+            logger.info('API HealthCheck status code: "%s"', response.status_code)
             if response.status_code != 200:
                 return {"error": f"API healthcheck not OK -> ({response.status_code}) {response.reason}"}
         except Exception as e:
-            logger.error(f'API HealthCheck failed: "{str(e)}"')
+            logger.error('API HealthCheck failed: "%s"', e)
             return {"error": f"Failed to validate API HealthCheck, please check the logs for more information."}
         return response.status_code
 
-    def _request(self, request_type: str, url: str, params: dict = None, **kwargs) -> dict:
+    def _cached_health_check(self) -> int or dict:
+        """
+        Method responsible for returning the cached healthcheck result, probing the API when it is out of date.
+
+        Only one thread probes at a time, the other ones keep using the cached result unless the API was never probed.
+        When the background healthcheck is running, the API is only probed here if it was never probed before.
+
+        :return: 200 if requests are allowed or a dict with the error in healthcheck validation.
+        """
+        if self.health.is_stale() and (self.health.state is None or not self._health_monitor.running):
+            if self._health_lock.acquire(blocking=self.health.state is None):
+                try:
+                    if self.health.is_stale():
+                        self.health.record(self._api_health_check(self.hc_url))
+                finally:
+                    self._health_lock.release()
+        return self.health.result
+
+    def _send(self, request_type: str, url: str, params: dict = None, stats: RequestStats = None,
+              endpoint_key: str = None, **kwargs) -> requests.Response:
+        """
+        Method responsible for sending the request, retrying it as defined by the retry_policy.
+
+        :param str request_type: string with type of request to be made. Currently supported types: "get", "post",
+            "put", "patch", "delete", "head".
+        :param str url: url to request.
+        :param dict params: dictionary with the request parameters.
+        :param RequestStats stats: statistics of the call, filled with the number of attempts and retries and the
+            status code of the last response.
+        :param str endpoint_key: endpoint key of the url, used to label the request events passed to the hooks and
+            as the circuit breaker key, which is the url when it is not provided.
+
+        :return: the last response received.
+        :raises CircuitOpenError: if the circuit breaker of the endpoint is open.
+        :raises DeadlineExceeded: if the active Deadline expires before an attempt is sent. Its time left also bounds
+            the timeouts of the attempts and the retries are given up when their delay does not fit in it.
+        :raises NoKeyAvailableError: if every key of the key_pool was rejected.
+        """
+        if request_type not in HTTP_METHODS:
+            raise Exception((f'The provided request_type: "{request_type}" is not valid,'
+                             ' please check the method documentation for more information.'))
+        send = getattr(self.session, request_type)
+        api_name = type(self).__name__
+
+        stats = RequestStats() if stats is None else stats
+        circuit_key = endpoint_key or url
+        if 'timeout' in kwargs:
+            timeout = normalize_timeout(kwargs.pop('timeout'))
+        else:
+            timeout = self.timeouts.get(endpoint_key, self.timeout)
+        deadline = current_deadline()
+        attempt = 1
+        # attempts sent again with another key of the pool are not counted by the retry_policy
+        rotations = 0
+        while True:
+            stats.attempts = attempt
+            stats.retries = attempt - 1
+            policy_attempt = attempt - rotations
+            event = RequestEvent(api_name, endpoint_key, request_type, url, attempt)
+            if self.circuit_breaker is not None:
+                try:
+                    self._circuit_change(event, self.circuit_breaker.allow(circuit_key))
+                except CircuitOpenError as e:
+                    event.error = e
+                    emit(self.hooks, 'on_error', event, e)
+                    raise
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            key = None
+            attempt_params, attempt_kwargs = params, kwargs
+            try:
+                if self.key_pool is not None:
+                    key = self.key_pool.acquire()
+                    attempt_params, attempt_kwargs = self._with_key(key, params, kwargs)
+                attempt_timeout = timeout if deadline is None else deadline.clamp(timeout)
+            except (DeadlineExceeded, NoKeyAvailableError) as e:
+                if key is not None:
+                    self.key_pool.report(key)
+                event.error = e
+                emit(self.hooks, 'on_error', event, e)
+                raise
+            emit(self.hooks, 'before_request', event)
+            reset_connect_time()
+            started = time.perf_counter()
+            try:
+                response = send(url, params=attempt_params, timeout=attempt_timeout, **attempt_kwargs)
+            except requests.exceptions.RequestException as e:
+                event.elapsed = time.perf_counter() - started
+                event.error = e
+                if key is not None:
+                    self.key_pool.report(key)
+                if self.circuit_breaker is not None:
+                    self._circuit_change(event, self.circuit_breaker.record(circuit_key, True))
+                if self.retry_policy is None or not self.retry_policy.should_retry_exception(request_type, e,
+                                                                                             policy_attempt):
+                    emit(self.hooks, 'on_error', event, e)
+                    raise
+                delay = self.retry_policy.delay(policy_attempt)
+                if not _fits(deadline, delay):
+                    emit(self.hooks, 'on_error', event, e)
+                    raise
+                logger.warning('%s request in "%s" failed with "%s", retrying in %.2fs (attempt %s of %s)',
+                               request_type.upper(), url, e, delay, policy_attempt + 1,
+                               self.retry_policy.max_attempts)
+            else:
+                _record_response(event, response, started, kwargs.get('stream', False))
+                emit(self.hooks, 'after_response', event)
+                if self.circuit_breaker is not None:
+                    failed = self.circuit_breaker.is_failure(response.status_code)
+                    self._circuit_change(event, self.circuit_breaker.record(circuit_key, failed))
+                logger.info('%s request in "%s" with params "%s" returned status code: "%s"',
+                            request_type.upper(), url, params, response.status_code)
+                stats.status_code = response.status_code
+                stats.date = response.headers.get('Date')
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update_from_headers(response.headers)
+                if (key is not None and
+                        self.key_pool.report(key, response.status_code, response.headers.get('Retry-After')) and
+                        rotations < len(self.key_pool) - 1 and self.key_pool.available()):
+                    rotations += 1
+                    delay = 0.0
+                    response.close()
+                    logger.warning('%s request in "%s" returned "%s", retrying with another key', request_type.upper(),
+                                   url, response.status_code)
+                else:
+                    if self.retry_policy is None or not self.retry_policy.should_retry_status(request_type,
+                                                                                              response.status_code,
+                                                                                              policy_attempt):
+                        return response
+                    delay = self.retry_policy.delay(policy_attempt, response.headers.get('Retry-After'))
+                    if not _fits(deadline, delay):
+                        return response
+                    response.close()
+                    logger.warning('%s request in "%s" returned "%s", retrying in %.2fs (attempt %s of %s)',
+                                   request_type.upper(), url, response.status_code, delay, policy_attempt + 1,
+                                   self.retry_policy.max_attempts)
+
+            emit(self.hooks, 'on_retry', event, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _with_key(self, key: str, params: dict, kwargs: dict) -> tuple:
+        """
+        Sets a key of the key_pool as the credential of a request, the APIs supporting a pool define where it goes.
+
+        :param str key: key taken from the pool.
+        :param dict params: request parameters, they must not be changed.
+        :param dict kwargs: request keyword arguments, e.g. headers, they must not be changed.
+
+        :return: (params, kwargs) tuple for the request, with the key.
+        """
+        raise NotImplementedError
+
+    def _circuit_change(self, event: RequestEvent, change: tuple or None) -> None:
+        if change is not None:
+            emit(self.hooks, 'on_circuit_change', event, *change)
+
+    def _request(self, request_type: str, url: str, params: dict = None, stats: RequestStats = None,
+                 stream: bool or str = None, endpoint_key: str = None, **kwargs) -> dict:
         """
         Method responsible for making the request in the provided url of the type defined in request_type.
 
-        :param str request_type: string with type of request to be made. Currently supported types: "get", "post".
+        :param str request_type: string with type of request to be made. Currently supported types: "get", "post",
+            "put", "patch", "delete", "head".
         :param str url: url to request.
         :param dict params: dictionary with the request parameters.
+        :param RequestStats stats: statistics of the call, filled with the number of attempts and retries and the
+            status code of the last response.
+        :param stream: True to stream the body as bytes chunks, or the path of a JSON array whose items are streamed,
+            e.g. "data.*". Only successful responses are streamed, errors are returned as usual.
+        :param str endpoint_key: endpoint key of the url, used to label the request events passed to the hooks.
 
         :return: dict with response. If response is not a valid JSON, response will be returned in bytes.
+            HEAD responses have no body, the response headers are returned instead. Streamed responses are returned
+            as a generator, which must be consumed or closed to release the connection.
         """
+        if stream:
+            kwargs['stream'] = True
+        encode_json_body(self.json_codec, kwargs)
+
         api_healthcheck = None
         if self.enforce_healthcheck:
-            api_healthcheck = self._api_health_check(self.hc_url)
+            api_healthcheck = self._cached_health_check()
 
         if api_healthcheck == 200 or api_healthcheck is None:
             try:
-                if request_type == 'get':
-                    response = requests.get(url, params=params, **kwargs)
-                    logger.info((f'GET request in "{url}" with params "{params}" returned status code:'
-                                 f' "{response.status_code}"'))
-                elif request_type == 'post':
-                    response = requests.post(url, params=params, **kwargs)
-                    logger.info((f'POST request in "{url}" with params "{params}" returned status code:'
-                                 f' "{response.status_code}"'))
-                else:
-                    raise Exception((f'The provided request_type: "{request_type}" is not valid,'
-                                     ' please check the method documentation for more information.'))
+                response = self._send(request_type, url, params=params, stats=stats, endpoint_key=endpoint_key,
+                                      **kwargs)
 
-                if response.status_code in SUCCESS_HTTP_CODES:
-                    dict_response = response.json()
-                    if not dict_response:
-                        logger.warning(f"Empty response with params ({str(params)})")
-                else:
-                    logger.error(f"API returned an error: ({response.status_code}) {response.reason}")
-                    dict_response = response.json()
+                if request_type == 'head':
+                    return {"response": dict(response.headers)}
+                if stream and response.status_code in SUCCESS_HTTP_CODES:
+                    return {"response": iter_response(response, stream, loads=self.json_codec.loads)}
+                if response.status_code not in SUCCESS_HTTP_CODES:
+                    logger.error("API returned an error: (%s) %s", response.status_code, response.reason)
+
+                try:
+                    dict_response = self.json_codec.loads(response.content)
+                except ValueError:
+                    logger.warning("Response is not a valid JSON for params (%s) and args (%s)."
+                                   " The response was returned in bytes.", params, kwargs)
+                    return {"response": response.content}
+                if response.status_code in SUCCESS_HTTP_CODES and not dict_response:
+                    logger.warning("Empty response with params (%s)", params)
                 return {"response": dict_response}
 
-            except requests.exceptions.JSONDecodeError:
-                logger.warning((f"Response is not a valid JSON for params ({str(params)}) and args ({str(kwargs)})."
-                                " The response was returned in bytes."))
-                return {"response": response.content()}
             except requests.exceptions.Timeout:
-                logger.error((f"Failed to get response with params ({str(params)}) and args ({str(kwargs)}),"
-                              " timeout request"))
+                logger.error("Failed to get response with params (%s) and args (%s), timeout request", params, kwargs)
                 raise
             except requests.exceptions.TooManyRedirects:
-                logger.error((f"Failed to get response with params ({str(params)}) and args ({str(kwargs)}),"
-                              " too many redirects"))
+                logger.error("Failed to get response with params (%s) and args (%s), too many redirects", params,
+                             kwargs)
                 raise
             except requests.exceptions.RequestException as e:
-                logger.error((f"Failed to get response with params ({str(params)}) and args ({str(kwargs)}),"
-                              f" {str(e)}"))
+                logger.error("Failed to get response with params (%s) and args (%s), %s", params, kwargs, e)
                 raise
         else:
             return api_healthcheck
 
-    def get(self, endpoint_key: str, params: dict = None, **kwargs) -> dict:
+    def get(self, endpoint_key: str, params: dict = None, stats: RequestStats = None, path_params: dict = None,
+            stream: bool or str = None, **kwargs) -> dict:
         """
         GET request to consume a REST API defined by the api_source.
 
         :param str endpoint_key: endpoint key to consume from, as defined in the api_source.
         :param dict params: dictionary with the request parameters.
+        :param RequestStats stats: statistics of the call, filled with the number of attempts and retries and the
+            status code of the last response.
+        :param dict path_params: dictionary with the values of the endpoint path fields, e.g. {"id": 1}.
+        :param stream: True to return the body as a generator of bytes chunks, or the path of a JSON array, e.g.
+            "data.*", to return a generator of its items, holding only one item in memory at a time. Streamed
+            responses are not cached nor shared by the single-flight.
 
         :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
         """
-        try:
-            url = self.base_url + self.api_source["endpoints"][endpoint_key]
-        except KeyError as e:
-            logger.error(f"Invalid API source, key {str(e)} not found.")
-            raise
+        url = self._url(endpoint_key, path_params)
+        if stream or (self.response_cache is None and self.single_flight is None):
+            return self._request('get', url=url, params=params, stats=stats, stream=stream, endpoint_key=endpoint_key,
+                                 **kwargs)
+
+        stats = RequestStats() if stats is None else stats
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.key(url, params, kwargs.get('headers'))
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                stats.from_cache = True
+                # only successful responses are cached, callers checking the status see a success
+                stats.status_code = 200
+                return cached
+
+        def fetch() -> tuple:
+            response = self._request('get', url=url, params=params, stats=stats, endpoint_key=endpoint_key, **kwargs)
+            if cache_key is not None and stats.status_code in SUCCESS_HTTP_CODES:
+                self.response_cache.set(cache_key, response, self.response_cache.ttl(endpoint_key))
+            return response, stats
 
-        return self._request('get', url=url, params=params, **kwargs)
+        if self.single_flight is None:
+            return fetch()[0]
 
-    def post(self, endpoint_key: str, params: dict = None, **kwargs) -> dict:
+        (response, flight_stats), shared = self.single_flight.do(flight_key(url, params, kwargs.get('headers')), fetch)
+        if shared:
+            stats.attempts, stats.retries = flight_stats.attempts, flight_stats.retries
+            stats.status_code, stats.date = flight_stats.status_code, flight_stats.date
+            stats.coalesced = True
+        return response
+
+    def post(self, endpoint_key: str, params: dict = None, stats: RequestStats = None, path_params: dict = None,
+             stream: bool or str = None, **kwargs) -> dict:
         """
         POST request to consume a REST API defined by the api_source.
 
-        :param str endpoint_key: endpoint key to consume from, as defined in the api_source.
-        :param dict params: dictionary with the request parameters.
+        Receives the same parameters as get.
 
         :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
         """
+        return self._request('post', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                             endpoint_key=endpoint_key, stream=stream, **kwargs)
 
-        try:
-            url = self.base_url + self.api_source["endpoints"][endpoint_key]
-        except KeyError as e:
-            logger.error(f"Invalid API source, key {str(e)} not found.")
-            raise
+    def put(self, endpoint_key: str, params: dict = None, stats: RequestStats = None, path_params: dict = None,
+            **kwargs) -> dict:
+        """
+        PUT request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return self._request('put', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                             endpoint_key=endpoint_key, **kwargs)
+
+    def patch(self, endpoint_key: str, params: dict = None, stats: RequestStats = None, path_params: dict = None,
+              **kwargs) -> dict:
+        """
+        PATCH request to consume a REST API defined by the api_source, only the provided fields are updated.
+
+        Receives the same parameters as get.
 
-        return self._request('post', url=url, params=params, **kwargs)
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return self._request('patch', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                             endpoint_key=endpoint_key, **kwargs)
+
+    def delete(self, endpoint_key: str, params: dict = None, stats: RequestStats = None, path_params: dict = None,
+               **kwargs) -> dict:
+        """
+        DELETE request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return self._request('delete', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                             endpoint_key=endpoint_key, **kwargs)
+
+    def head(self, endpoint_key: str, params: dict = None, stats: RequestStats = None, path_params: dict = None,
+             **kwargs) -> dict:
+        """
+        HEAD request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with the response headers.
+        """
+        return self._request('head', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                             endpoint_key=endpoint_key, **kwargs)
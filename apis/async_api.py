@@ -0,0 +1,477 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+import aiohttp
+
+from apis.api import SUCCESS_HTTP_CODES, DEFAULT_POOL_MAXSIZE, HTTP_METHODS, EndpointTemplates, RequestStats
+from apis.circuitbreaker import CircuitBreaker, CircuitOpenError
+from apis.codec import JSONCodec, get_codec, encode_json_body
+from apis.deadline import (DeadlineExceeded, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, current_deadline,
+                           normalize_timeout)
+from apis.healthcheck import HealthStatus, DEFAULT_HEALTHCHECK_INTERVAL, DEFAULT_HEALTHCHECK_TIMEOUT
+from apis.keypool import KeyPool, NoKeyAvailableError
+from apis.metrics import RequestEvent, emit
+from apis.ratelimit import TokenBucket
+from apis.singleflight import AsyncSingleFlight, flight_key
+
+logger = logging.getLogger('APIs.AsyncAPI')
+
+DEFAULT_CONCURRENCY = 100
+
+
+def _record_response(event: RequestEvent, status: int, started: float, headers_at: float, body, content: bytes) -> None:
+    """
+    Fills the event with the status, phase durations and sizes of the response.
+
+    :param RequestEvent event: event of the request, its connect time is filled by the session trace.
+    :param int status: status code of the response.
+    :param float started: time.perf_counter value taken before the request was sent.
+    :param float headers_at: time.perf_counter value taken when the response headers were received.
+    :param body: request body.
+    :param bytes content: response body.
+    """
+    event.status_code = status
+    event.elapsed = time.perf_counter() - started
+    event.ttfb = max(0.0, headers_at - started - event.connect)
+    event.read = max(0.0, event.elapsed - (headers_at - started))
+    event.bytes_out = len(body) if isinstance(body, bytes) else None
+    event.bytes_in = len(content)
+
+
+async def _on_connection_create_start(session, context, params) -> None:
+    context.connect_started = time.perf_counter()
+
+
+async def _on_connection_create_end(session, context, params) -> None:
+    if isinstance(context.trace_request_ctx, RequestEvent):
+        context.trace_request_ctx.connect += time.perf_counter() - context.connect_started
+
+
+def _connect_trace_config() -> aiohttp.TraceConfig:
+    """
+    :return: TraceConfig adding the DNS resolution and connection time to the RequestEvent of each request.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    return trace_config
+
+
+class AsyncAPI:
+    """
+    Asyncio counterpart of API, every request is made without blocking the event loop.
+    """
+
+    def __init__(self, api_source: dict, enforce_healthcheck: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE, keep_alive: bool = True,
+                 healthcheck_interval: float = DEFAULT_HEALTHCHECK_INTERVAL,
+                 healthcheck_background: bool = False,
+                 healthcheck_timeout: float = DEFAULT_HEALTHCHECK_TIMEOUT, rate_limiter: TokenBucket = None,
+                 json_codec: JSONCodec = None, hooks: list = None, single_flight: bool = False,
+                 circuit_breaker: CircuitBreaker = None,
+                 timeout: float or tuple = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 timeouts: dict = None, key_pool: KeyPool = None) -> None:
+        """
+        :param dict api_source: dict containing API consumption paths and keys.
+            The dict has the following keys:
+            - endpoints: dictionary with "base_url", "healthcheck", and resource endpoints;
+        :param bool enforce_healthcheck: boolean that enables healthcheck validation before API consumption.
+        :param int concurrency: maximum number of requests in flight at the same time, the remaining ones wait.
+        :param int pool_maxsize: maximum number of connections kept alive for a single host.
+        :param bool keep_alive: if False, the connection is closed after every request.
+        :param float healthcheck_interval: seconds the healthcheck result is cached, 0 checks before every request.
+        :param bool healthcheck_background: if True, an asyncio task refreshes the healthcheck every
+            healthcheck_interval seconds and requests never wait for it.
+        :param float healthcheck_timeout: seconds the healthcheck request waits for the API.
+        :param TokenBucket rate_limiter: bucket pacing every request of the instance, it may be shared with other
+            instances, sync or async, using the same credentials.
+        :param JSONCodec json_codec: codec encoding the json payloads and decoding the responses, defaults to the
+            fastest one installed, see apis.codec.get_codec.
+        :param list hooks: list of RequestHooks receiving the events of every request, e.g. a MetricsCollector.
+        :param bool single_flight: if True, identical GET requests made by concurrent tasks share one request and its
+            response, which must not be mutated.
+        :param CircuitBreaker circuit_breaker: breaker failing fast the requests of endpoints that keep failing, with
+            one circuit per endpoint key. It may be shared with sync instances.
+        :param timeout: seconds a request waits to connect and for each read, as a number or a (connect, read) tuple.
+            None waits forever. A timeout passed to a request replaces it.
+        :param dict timeouts: timeout by endpoint key, replacing the timeout of the instance for the endpoint.
+        :param KeyPool key_pool: pool of credentials the requests are spread over, each request takes a key from it.
+            It may be shared with other instances, sync or async, of the same API.
+        """
+        self.api_source = api_source
+        try:
+            self.base_url = api_source["endpoints"]["base_url"]
+            if enforce_healthcheck:
+                self.hc_url = self.base_url + api_source["endpoints"]["healthcheck"]
+        except KeyError as e:
+            logger.error("Invalid API source, key %s not found.", e)
+            raise
+        if not concurrency > 0:
+            raise ValueError("concurrency must be a integer greater than 0.")
+        if not pool_maxsize > 0:
+            raise ValueError("pool_maxsize must be a integer greater than 0.")
+        if key_pool is not None and type(self)._with_key is AsyncAPI._with_key:
+            raise ValueError(f'{type(self).__name__} does not support a key pool.')
+
+        self.enforce_healthcheck = enforce_healthcheck
+        self.concurrency = concurrency
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.session = None
+        self.rate_limiter = rate_limiter
+        self.json_codec = json_codec or get_codec()
+        self.hooks = list(hooks or [])
+        self.single_flight = AsyncSingleFlight() if single_flight else None
+        self.circuit_breaker = circuit_breaker
+        self.timeout = normalize_timeout(timeout)
+        self.timeouts = {key: normalize_timeout(value) for key, value in (timeouts or {}).items()}
+        self.key_pool = key_pool
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+        if healthcheck_background and not healthcheck_interval > 0:
+            raise ValueError("The background healthcheck needs an interval greater than 0.")
+        self.health = HealthStatus(interval=healthcheck_interval)
+        self.healthcheck_background = healthcheck_background
+        self.healthcheck_timeout = healthcheck_timeout
+        self._health_lock = asyncio.Lock()
+        self._health_task = None
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, base_url: str) -> None:
+        self._base_url = base_url
+        self.endpoints = EndpointTemplates(base_url, self.api_source["endpoints"])
+
+    def _url(self, endpoint_key: str, path_params: dict = None) -> str:
+        """
+        :param str endpoint_key: endpoint key, as defined in the api_source.
+        :param dict path_params: dictionary with the values of the endpoint path fields.
+
+        :return: url of the endpoint.
+        """
+        try:
+            return self.endpoints.url(endpoint_key, path_params)
+        except KeyError as e:
+            logger.error("Invalid API source, key %s not found.", e)
+            raise
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Method responsible for lazily creating the session, aiohttp sessions must be created inside the event loop.
+
+        :return: connection-pooled aiohttp ClientSession.
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.pool_maxsize,
+                                             force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=[_connect_trace_config()])
+        return self.session
+
+    async def close(self) -> None:
+        """
+        Closes the session and every pooled connection held by it.
+        """
+        if self._health_task is not None:
+            self._health_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._health_task
+            self._health_task = None
+        if self.session is not None:
+            await self.session.close()
+
+    async def _api_health_check(self, url: str) -> int or dict:
+        """
+        Method responsible for checking the API integrity.
+
+        :param str url: API healthcheck endpoint url.
+
+        :return: 200 if healthcheck is OK or a dict with the error in healthcheck validation.
+        """
+        timeout = aiohttp.ClientTimeout(total=self.healthcheck_timeout)
+        try:
+            async with self._get_session().get(url, timeout=timeout) as response:
+                logger.info('API HealthCheck status code: "%s"', response.status)
+                if response.status != 200:
+                    return {"error": f"API healthcheck not OK -> ({response.status}) {response.reason}"}
+        except Exception as e:
+            logger.error('API HealthCheck failed: "%s"', e)
+            return {"error": f"Failed to validate API HealthCheck, please check the logs for more information."}
+        return response.status
+
+    async def _refresh_health(self) -> None:
+        """
+        Task responsible for probing the API every healthcheck_interval seconds.
+        """
+        while True:
+            self.health.record(await self._api_health_check(self.hc_url))
+            await asyncio.sleep(self.health.interval)
+
+    async def _cached_health_check(self) -> int or dict:
+        """
+        Method responsible for returning the cached healthcheck result, probing the API when it is out of date.
+
+        Only one coroutine probes at a time, the other ones keep using the cached result unless the API was never
+        probed. When the background healthcheck is running, the API is only probed here if it was never probed before.
+
+        :return: 200 if requests are allowed or a dict with the error in healthcheck validation.
+        """
+        if self.healthcheck_background and self._health_task is None:
+            self._health_task = asyncio.ensure_future(self._refresh_health())
+
+        if self.health.is_stale() and (self.health.state is None or self._health_task is None):
+            if self.health.state is None or not self._health_lock.locked():
+                async with self._health_lock:
+                    if self.health.is_stale():
+                        self.health.record(await self._api_health_check(self.hc_url))
+        return self.health.result
+
+    def _circuit_change(self, event: RequestEvent, change: tuple or None) -> None:
+        if change is not None:
+            emit(self.hooks, 'on_circuit_change', event, *change)
+
+    def _client_timeout(self, endpoint_key: str, timeout) -> aiohttp.ClientTimeout:
+        """
+        :param str endpoint_key: endpoint key of the request.
+        :param timeout: timeout passed to the request, None if it was not.
+
+        :return: timeout of the request, bounded by the active Deadline. An aiohttp.ClientTimeout passed to the
+            request is used as is.
+        :raises DeadlineExceeded: if the active Deadline has expired.
+        """
+        if isinstance(timeout, aiohttp.ClientTimeout):
+            return timeout
+        connect, read = self.timeouts.get(endpoint_key, self.timeout) if timeout is None else normalize_timeout(timeout)
+        deadline = current_deadline()
+        if deadline is None:
+            return aiohttp.ClientTimeout(total=None, connect=connect, sock_read=read)
+        connect, read = deadline.clamp((connect, read))
+        return aiohttp.ClientTimeout(total=deadline.remaining(), connect=connect, sock_read=read)
+
+    def _with_key(self, key: str, params: dict, kwargs: dict) -> tuple:
+        """
+        Sets a key of the key_pool as the credential of a request, the APIs supporting a pool define where it goes.
+
+        :param str key: key taken from the pool.
+        :param dict params: request parameters, they must not be changed.
+        :param dict kwargs: request keyword arguments, e.g. headers, they must not be changed.
+
+        :return: (params, kwargs) tuple for the request, with the key.
+        """
+        raise NotImplementedError
+
+    def _record_error(self, event: RequestEvent, circuit_key: str, error: Exception) -> None:
+        event.error = error
+        if self.circuit_breaker is not None:
+            self._circuit_change(event, self.circuit_breaker.record(circuit_key, True))
+        emit(self.hooks, 'on_error', event, error)
+
+    async def _request(self, request_type: str, url: str, params: dict = None, stats: RequestStats = None,
+                       endpoint_key: str = None, **kwargs) -> dict:
+        """
+        Method responsible for making the request in the provided url of the type defined in request_type.
+
+        :param str request_type: string with type of request to be made. Currently supported types: "get", "post",
+            "put", "patch", "delete", "head".
+        :param str url: url to request.
+        :param dict params: dictionary with the request parameters.
+        :param RequestStats stats: statistics of the call, filled with the status code of the response.
+        :param str endpoint_key: endpoint key of the url, used to label the request events passed to the hooks.
+
+        :return: dict with response. If response is not a valid JSON, response will be returned in bytes.
+            HEAD responses have no body, the response headers are returned instead.
+        """
+        if request_type not in HTTP_METHODS:
+            raise Exception((f'The provided request_type: "{request_type}" is not valid,'
+                             ' please check the method documentation for more information.'))
+
+        encode_json_body(self.json_codec, kwargs)
+
+        api_healthcheck = None
+        if self.enforce_healthcheck:
+            api_healthcheck = await self._cached_health_check()
+
+        if api_healthcheck == 200 or api_healthcheck is None:
+            event = RequestEvent(type(self).__name__, endpoint_key, request_type, url)
+            circuit_key = endpoint_key or url
+            if self.circuit_breaker is not None:
+                try:
+                    self._circuit_change(event, self.circuit_breaker.allow(circuit_key))
+                except CircuitOpenError as e:
+                    event.error = e
+                    emit(self.hooks, 'on_error', event, e)
+                    raise
+            key = None
+            try:
+                async with self._semaphore:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire_async()
+                    if self.key_pool is not None:
+                        key = await self.key_pool.acquire_async()
+                    client_timeout = self._client_timeout(endpoint_key, kwargs.pop('timeout', None))
+                    request_params, request_kwargs = (params, kwargs) if key is None else self._with_key(key, params,
+                                                                                                         kwargs)
+                    emit(self.hooks, 'before_request', event)
+                    event.connect = 0.0
+                    started = time.perf_counter()
+                    async with self._get_session().request(request_type, url, params=request_params,
+                                                           trace_request_ctx=event, timeout=client_timeout,
+                                                           **request_kwargs) as response:
+                        headers_at = time.perf_counter()
+                        logger.info('%s request in "%s" with params "%s" returned status code: "%s"',
+                                    request_type.upper(), url, params, response.status)
+                        if self.rate_limiter is not None:
+                            self.rate_limiter.update_from_headers(response.headers)
+                        content = await response.read()
+                    if key is not None:
+                        self.key_pool.report(key, response.status, response.headers.get('Retry-After'))
+                        key = None
+                    _record_response(event, response.status, started, headers_at, kwargs.get('data'), content)
+                    emit(self.hooks, 'after_response', event)
+                    if self.circuit_breaker is not None:
+                        failed = self.circuit_breaker.is_failure(response.status)
+                        self._circuit_change(event, self.circuit_breaker.record(circuit_key, failed))
+                if stats is not None:
+                    stats.attempts = 1
+                    stats.status_code = response.status
+                    stats.date = response.headers.get('Date')
+                if request_type == 'head':
+                    return {"response": dict(response.headers)}
+
+                try:
+                    dict_response = self.json_codec.loads(content)
+                except ValueError:
+                    logger.warning("Response is not a valid JSON for params (%s) and args (%s)."
+                                   " The response was returned in bytes.", params, kwargs)
+                    return {"response": content}
+
+                if response.status in SUCCESS_HTTP_CODES:
+                    if not dict_response:
+                        logger.warning("Empty response with params (%s)", params)
+                else:
+                    logger.error("API returned an error: (%s) %s", response.status, response.reason)
+                return {"response": dict_response}
+
+            except (DeadlineExceeded, NoKeyAvailableError) as e:
+                event.error = e
+                emit(self.hooks, 'on_error', event, e)
+                raise
+            except asyncio.TimeoutError as e:
+                self._record_error(event, circuit_key, e)
+                logger.error("Failed to get response with params (%s) and args (%s), timeout request", params, kwargs)
+                raise
+            except aiohttp.TooManyRedirects as e:
+                self._record_error(event, circuit_key, e)
+                logger.error("Failed to get response with params (%s) and args (%s), too many redirects", params,
+                             kwargs)
+                raise
+            except aiohttp.ClientError as e:
+                self._record_error(event, circuit_key, e)
+                logger.error("Failed to get response with params (%s) and args (%s), %s", params, kwargs, e)
+                raise
+            finally:
+                # the key of a request that got no response, e.g. a timeout or a cancellation, is given back
+                if key is not None:
+                    self.key_pool.report(key)
+        else:
+            return api_healthcheck
+
+    async def get(self, endpoint_key: str, params: dict = None, stats: RequestStats = None,
+                  path_params: dict = None, **kwargs) -> dict:
+        """
+        GET request to consume a REST API defined by the api_source.
+
+        :param str endpoint_key: endpoint key to consume from, as defined in the api_source.
+        :param dict params: dictionary with the request parameters.
+        :param RequestStats stats: statistics of the call, filled with the status code of the response.
+        :param dict path_params: dictionary with the values of the endpoint path fields, e.g. {"id": 1}.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        url = self._url(endpoint_key, path_params)
+        if self.single_flight is None:
+            return await self._request('get', url=url, params=params, stats=stats, endpoint_key=endpoint_key, **kwargs)
+
+        stats = RequestStats() if stats is None else stats
+
+        async def fetch() -> tuple:
+            return await self._request('get', url=url, params=params, stats=stats, endpoint_key=endpoint_key,
+                                       **kwargs), stats
+
+        (response, flight_stats), shared = await self.single_flight.do(flight_key(url, params, kwargs.get('headers')),
+                                                                        fetch)
+        if shared:
+            stats.attempts, stats.status_code = flight_stats.attempts, flight_stats.status_code
+            stats.date = flight_stats.date
+            stats.coalesced = True
+        return response
+
+    async def post(self, endpoint_key: str, params: dict = None, stats: RequestStats = None,
+                   path_params: dict = None, **kwargs) -> dict:
+        """
+        POST request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return await self._request('post', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                                   endpoint_key=endpoint_key, **kwargs)
+
+    async def put(self, endpoint_key: str, params: dict = None, stats: RequestStats = None,
+                  path_params: dict = None, **kwargs) -> dict:
+        """
+        PUT request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return await self._request('put', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                                   endpoint_key=endpoint_key, **kwargs)
+
+    async def patch(self, endpoint_key: str, params: dict = None, stats: RequestStats = None,
+                    path_params: dict = None, **kwargs) -> dict:
+        """
+        PATCH request to consume a REST API defined by the api_source, only the provided fields are updated.
+
+        Receives the same parameters as get.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return await self._request('patch', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                                   endpoint_key=endpoint_key, **kwargs)
+
+    async def delete(self, endpoint_key: str, params: dict = None, stats: RequestStats = None,
+                     path_params: dict = None, **kwargs) -> dict:
+        """
+        DELETE request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with response. If API response is not a valid JSON, response will be returned in bytes.
+        """
+        return await self._request('delete', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                                   endpoint_key=endpoint_key, **kwargs)
+
+    async def head(self, endpoint_key: str, params: dict = None, stats: RequestStats = None,
+                   path_params: dict = None, **kwargs) -> dict:
+        """
+        HEAD request to consume a REST API defined by the api_source.
+
+        Receives the same parameters as get.
+
+        :return: dict with the response headers.
+        """
+        return await self._request('head', url=self._url(endpoint_key, path_params), params=params, stats=stats,
+                                   endpoint_key=endpoint_key, **kwargs)
@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from apis.codec import JSONCodec, get_codec
+
+logger = logging.getLogger('APIs.Bulk')
+
+DEFAULT_BULK_WORKERS = 10
+
+
+class BulkResult:
+    """
+    Class responsible for holding the outcome of one item of a bulk operation.
+    """
+
+    __slots__ = ('item', 'value', 'error')
+
+    def __init__(self, item, value=None, error: Exception = None) -> None:
+        """
+        :param item: input item the result belongs to.
+        :param value: value returned for the item, None if it failed.
+        :param Exception error: exception raised while processing the item, None if it succeeded.
+        """
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return f'BulkResult(item={self.item!r}, ok={self.ok})'
+
+
+def _validate_workers(max_workers: int) -> None:
+    if not max_workers > 0:
+        raise ValueError("max_workers must be a integer greater than 0.")
+
+
+def _call(func, item) -> BulkResult:
+    try:
+        return BulkResult(item, value=func(item))
+    except Exception as e:
+        logger.error(f'Bulk item {item!r} failed. Error: {str(e)}.')
+        return BulkResult(item, error=e)
+
+
+def run_bulk(func, items, max_workers: int = DEFAULT_BULK_WORKERS):
+    """
+    Calls func for every item in a bounded thread pool, yielding the results as they complete.
+
+    Items are read from the iterable only as workers become free, so at most 2 * max_workers items are held at once
+    and the input may be an arbitrarily long stream. A failing item is reported in its BulkResult and does not abort
+    the remaining ones. Each item runs in a copy of the caller's context, so an active Deadline bounds it too.
+
+    :param func: callable receiving one item.
+    :param items: iterable with the input items.
+    :param int max_workers: maximum number of items processed at the same time.
+
+    :return: generator of BulkResult, in completion order.
+    """
+    _validate_workers(max_workers)
+    items = iter(items)
+
+    def results():
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(contextvars.copy_context().run, _call, func, item)
+                       for item in itertools.islice(items, 2 * max_workers)}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                    for item in itertools.islice(items, len(done)):
+                        pending.add(executor.submit(contextvars.copy_context().run, _call, func, item))
+            finally:
+                # the caller stopped consuming the results, items not started yet are dropped
+                for future in pending:
+                    future.cancel()
+
+    return results()
+
+
+async def _call_async(func, item) -> BulkResult:
+    try:
+        return BulkResult(item, value=await func(item))
+    except Exception as e:
+        logger.error(f'Bulk item {item!r} failed. Error: {str(e)}.')
+        return BulkResult(item, error=e)
+
+
+def run_bulk_async(func, items, max_workers: int = DEFAULT_BULK_WORKERS):
+    """
+    Asyncio counterpart of run_bulk, awaiting func for every item with at most max_workers tasks at once.
+
+    :param func: coroutine function receiving one item.
+    :param items: iterable with the input items.
+    :param int max_workers: maximum number of items processed at the same time.
+
+    :return: async generator of BulkResult, in completion order.
+    """
+    _validate_workers(max_workers)
+    items = iter(items)
+
+    async def results():
+        pending = {asyncio.ensure_future(_call_async(func, item)) for item in itertools.islice(items, max_workers)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+                for item in itertools.islice(items, len(done)):
+                    pending.add(asyncio.ensure_future(_call_async(func, item)))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return results()
+
+
+class JSONLSink:
+    """
+    Class responsible for writing the items of a bulk operation to a binary file, one JSON document per line.
+
+    It is a callable, so it can be passed wherever a callback sink is accepted.
+    """
+
+    def __init__(self, file, json_codec: JSONCodec = None) -> None:
+        """
+        :param file: binary file object the lines are written to, it is not closed by the sink.
+        :param JSONCodec json_codec: codec encoding the items, defaults to the fastest installed one.
+        """
+        self.file = file
+        self.json_codec = json_codec or get_codec()
+        self.count = 0
+
+    def __call__(self, item) -> None:
+        self.file.write(self.json_codec.dumps(item) + b'\n')
+        self.count += 1
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from apis.codec import JSONCodec, get_codec
+
+logger = logging.getLogger('APIs.Cache')
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_DISK_ENTRIES = 100000
+DEFAULT_TTL = 3600
+# headers identifying the caller instead of the requested resource, they are not part of the cache key
+EXCLUDED_HEADERS = frozenset({'authorization', 'proxy-authorization', 'cookie'})
+
+
+class CacheStats:
+    """
+    Class responsible for counting the cache hits, misses and evictions.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class ResponseCache:
+    """
+    Class responsible for caching API responses in a memory LRU tier, optionally backed by a SQLite file.
+
+    Entries are looked up in memory first, then on disk; disk hits are promoted to memory. Every entry expires after
+    the TTL of its endpoint. Cached responses are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, path: str = None, default_ttl: float = DEFAULT_TTL,
+                 ttls: dict = None, max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+                 json_codec: JSONCodec = None) -> None:
+        """
+        :param int max_entries: maximum number of responses kept in memory, the least recently used are evicted.
+        :param str path: path of the SQLite file of the disk tier, if not provided only the memory tier is used.
+        :param float default_ttl: seconds a response stays valid when its endpoint has no TTL in ttls.
+        :param dict ttls: seconds a response stays valid by endpoint key, 0 disables the cache for the endpoint.
+        :param int max_disk_entries: maximum number of responses kept on disk, the least recently used are evicted.
+        :param JSONCodec json_codec: codec serializing the responses of the disk tier, defaults to the fastest one
+            installed.
+        """
+        if not max_entries > 0:
+            raise ValueError("max_entries must be a integer greater than 0.")
+        if not max_disk_entries > 0:
+            raise ValueError("max_disk_entries must be a integer greater than 0.")
+
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.stats = CacheStats()
+        self.json_codec = json_codec or get_codec()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_entries = 0
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL,'
+                             ' accessed_at REAL, value TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+            self._db.commit()
+            self._disk_entries = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def ttl(self, endpoint_key: str) -> float:
+        """
+        :return: seconds a response of the endpoint stays valid.
+        """
+        return self.ttls.get(endpoint_key, self.default_ttl)
+
+    @staticmethod
+    def key(resource: str, params: dict = None, headers: dict = None) -> str:
+        """
+        Builds the cache key of a request. Authentication headers are left out, so the same resource requested with
+        different credentials shares the entry.
+
+        :param str resource: url or endpoint key of the requested resource.
+        :param dict params: dictionary with the request parameters.
+        :param dict headers: dictionary with the request headers.
+
+        :return: SHA-256 hex digest identifying the request.
+        """
+        headers = {name.lower(): value for name, value in (headers or {}).items()
+                   if name.lower() not in EXCLUDED_HEADERS}
+        raw = json.dumps([resource, params or {}, headers], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """
+        :param str key: cache key built by the key method.
+
+        :return: the cached response or None if it is not cached or has expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats.hits += 1
+                    return value
+                del self._memory[key]
+                self.stats.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute('SELECT expires_at, value FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    if row[0] > now:
+                        self._db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+                        self._db.commit()
+                        value = self.json_codec.loads(row[1])
+                        self._set_memory(key, row[0], value)
+                        self.stats.disk_hits += 1
+                        return value
+                    self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self._db.commit()
+                    self._disk_entries -= 1
+                    self.stats.expirations += 1
+
+            self.stats.misses += 1
+            return None
+
+    def set(self, key: str, value, ttl: float) -> None:
+        """
+        Caches a response. Responses that are not JSON serializable, e.g. bytes, are only kept in memory.
+
+        :param str key: cache key built by the key method.
+        :param value: response to be cached.
+        :param float ttl: seconds the response stays valid, 0 does not cache it.
+        """
+        if not ttl > 0:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._set_memory(key, expires_at, value)
+            if self._db is not None:
+                try:
+                    serialized = self.json_codec.dumps(value)
+                except TypeError:
+                    return
+                updated = self._db.execute('UPDATE responses SET expires_at = ?, accessed_at = ?, value = ?'
+                                           ' WHERE key = ?', (expires_at, now, serialized, key)).rowcount
+                if not updated:
+                    self._db.execute('INSERT INTO responses VALUES (?, ?, ?, ?)', (key, expires_at, now, serialized))
+                    self._disk_entries += 1
+                    self._evict_disk()
+                self._db.commit()
+
+    def _set_memory(self, key: str, expires_at: float, value) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _evict_disk(self) -> None:
+        excess = self._disk_entries - self.max_disk_entries
+        if excess > 0:
+            self._db.execute('DELETE FROM responses WHERE key IN'
+                             ' (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)', (excess,))
+            self._disk_entries -= excess
+            self.stats.disk_evictions += excess
+
+    def clear(self) -> None:
+        """
+        Removes every cached response from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM responses')
+                self._db.commit()
+                self._disk_entries = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('APIs.CircuitBreaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_STATUS_CODES = frozenset({500, 502, 503, 504})
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_WINDOW_SIZE = 20
+DEFAULT_MIN_CALLS = 5
+DEFAULT_COOLDOWN = 30
+DEFAULT_HALF_OPEN_CALLS = 1
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the circuit of its endpoint is open.
+    """
+
+    def __init__(self, key: str, retry_in: float) -> None:
+        """
+        :param str key: key of the open circuit, usually an endpoint key.
+        :param float retry_in: seconds until the circuit lets a trial request through.
+        """
+        super(CircuitOpenError, self).__init__(f'Circuit of "{key}" is open, retry in {retry_in:.2f}s.')
+        self.key = key
+        self.retry_in = retry_in
+
+
+class _Circuit:
+    __slots__ = ('state', 'outcomes', 'failures', 'opened_at', 'trials')
+
+    def __init__(self, window_size: int) -> None:
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window_size)
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+
+
+class CircuitBreaker:
+    """
+    Class responsible for failing fast the requests of endpoints that keep failing, with one circuit per key.
+
+    A closed circuit lets every request through and records their outcomes in a sliding window of the last
+    window_size requests. Once the window holds min_calls outcomes and the failure rate reaches failure_rate, the
+    circuit opens and requests fail with CircuitOpenError, without touching the network. After cooldown seconds it
+    becomes half open and lets half_open_calls trial requests through: it closes if all of them succeed and opens
+    again as soon as one fails.
+
+    It may be shared by several API instances, sync or async.
+    """
+
+    def __init__(self, failure_rate: float = DEFAULT_FAILURE_RATE, window_size: int = DEFAULT_WINDOW_SIZE,
+                 min_calls: int = DEFAULT_MIN_CALLS, cooldown: float = DEFAULT_COOLDOWN,
+                 half_open_calls: int = DEFAULT_HALF_OPEN_CALLS,
+                 failure_statuses: frozenset = FAILURE_STATUS_CODES) -> None:
+        """
+        :param float failure_rate: fraction of failed requests in the window, between 0 and 1, opening the circuit.
+        :param int window_size: number of the latest requests the failure rate is computed over.
+        :param int min_calls: minimum number of requests in the window before the circuit can open.
+        :param float cooldown: seconds an open circuit fails fast before letting trial requests through.
+        :param int half_open_calls: number of trial requests of a half open circuit.
+        :param frozenset failure_statuses: response status codes counted as failures, besides the connection errors
+            and timeouts.
+        """
+        if not 0 < failure_rate <= 1:
+            raise ValueError("failure_rate must be a number greater than 0 and lower or equal to 1.")
+        if not window_size > 0 or not half_open_calls > 0:
+            raise ValueError("window_size and half_open_calls must be integers greater than 0.")
+        if not 0 < min_calls <= window_size:
+            raise ValueError("min_calls must be a integer greater than 0 and lower or equal to window_size.")
+        if not cooldown >= 0:
+            raise ValueError("cooldown must be a number equal or greater than 0.")
+
+        self.failure_rate = failure_rate
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_calls = half_open_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, key: str) -> _Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self.window_size)
+        return circuit
+
+    def state(self, key: str) -> str:
+        """
+        :return: CLOSED, OPEN or HALF_OPEN, an open circuit whose cooldown is over is reported as HALF_OPEN.
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                return CLOSED
+            if circuit.state == OPEN and time.monotonic() - circuit.opened_at >= self.cooldown:
+                return HALF_OPEN
+            return circuit.state
+
+    def allow(self, key: str) -> tuple or None:
+        """
+        Must be called before each request, which must then be reported with record.
+
+        :param str key: key of the circuit, usually the endpoint key of the request.
+
+        :return: (old state, new state) tuple if the circuit changed state, otherwise None.
+        :raises CircuitOpenError: if the circuit is open, or half open with every trial request in flight.
+        """
+        with self._lock:
+            circuit = self._circuit(key)
+            change = None
+            if circuit.state == OPEN:
+                retry_in = circuit.opened_at + self.cooldown - time.monotonic()
+                if retry_in > 0:
+                    raise CircuitOpenError(key, retry_in)
+                change = self._transition(key, circuit, HALF_OPEN)
+            if circuit.state == HALF_OPEN:
+                # trials never reported, e.g. cancelled requests, are given up after the cooldown
+                if circuit.trials >= self.half_open_calls and time.monotonic() - circuit.opened_at < self.cooldown:
+                    raise CircuitOpenError(key, circuit.opened_at + self.cooldown - time.monotonic())
+                if circuit.trials >= self.half_open_calls:
+                    circuit.trials = 0
+                if circuit.trials == 0:
+                    circuit.opened_at = time.monotonic()
+                circuit.trials += 1
+            return change
+
+    def record(self, key: str, failed: bool) -> tuple or None:
+        """
+        :param str key: key of the circuit the request was allowed by.
+        :param bool failed: True if the request failed.
+
+        :return: (old state, new state) tuple if the circuit changed state, otherwise None.
+        """
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit.state == HALF_OPEN:
+                if failed:
+                    return self._transition(key, circuit, OPEN)
+                circuit.trials = max(0, circuit.trials - 1)
+                circuit.outcomes.append(False)
+                # the circuit closes once half_open_calls trials succeeded in a row
+                if len(circuit.outcomes) >= self.half_open_calls:
+                    return self._transition(key, circuit, CLOSED)
+                return None
+            if circuit.state == OPEN:
+                # the request was allowed before the circuit opened
+                return None
+
+            if len(circuit.outcomes) == circuit.outcomes.maxlen:
+                circuit.failures -= circuit.outcomes[0]
+            circuit.outcomes.append(failed)
+            circuit.failures += failed
+            if (failed and len(circuit.outcomes) >= self.min_calls and
+                    circuit.failures >= self.failure_rate * len(circuit.outcomes)):
+                return self._transition(key, circuit, OPEN)
+            return None
+
+    def is_failure(self, status_code: int) -> bool:
+        return status_code in self.failure_statuses
+
+    def _transition(self, key: str, circuit: _Circuit, state: str) -> tuple:
+        old_state = circuit.state
+        circuit.state = state
+        circuit.outcomes.clear()
+        circuit.failures = 0
+        circuit.trials = 0
+        if state == OPEN:
+            circuit.opened_at = time.monotonic()
+            logger.warning('Circuit of "%s" opened, failing fast for %ss', key, self.cooldown)
+        else:
+            logger.info('Circuit of "%s" changed from %s to %s', key, old_state, state)
+        return old_state, state
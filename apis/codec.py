@@ -0,0 +1,102 @@
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+logger = logging.getLogger('APIs.Codec')
+
+
+class JSONCodec:
+    """
+    Class responsible for encoding and decoding JSON with the stdlib json module.
+
+    Every codec encodes to UTF-8 bytes, which are sent as the request body as is, and decodes bytes or str.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes or str):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Class responsible for encoding and decoding JSON with orjson, which writes bytes natively.
+    """
+
+    name = 'orjson'
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: bytes or str):
+        return orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """
+    Class responsible for encoding and decoding JSON with ujson.
+    """
+
+    name = 'ujson'
+
+    def dumps(self, obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data: bytes or str):
+        return ujson.loads(data)
+
+
+# codecs by name, in order of preference
+CODECS = {
+    OrjsonCodec.name: (OrjsonCodec, orjson),
+    UjsonCodec.name: (UjsonCodec, ujson),
+    JSONCodec.name: (JSONCodec, json),
+}
+
+
+def get_codec(name: str = None) -> JSONCodec:
+    """
+    Gets a JSON codec by name, or the fastest one installed when no name is provided.
+
+    :param str name: "orjson", "ujson" or "json".
+
+    :return: the JSONCodec.
+    """
+    if name is None:
+        name = next(codec_name for codec_name, (_, module) in CODECS.items() if module is not None)
+    try:
+        codec, module = CODECS[name]
+    except KeyError:
+        raise ValueError(f'Unknown JSON codec "{name}", it must be one of: {", ".join(CODECS)}.')
+    if module is None:
+        raise ValueError(f'The JSON codec "{name}" is not installed.')
+    return codec()
+
+
+def encode_json_body(codec: JSONCodec, kwargs: dict) -> dict:
+    """
+    Replaces the json request argument by its encoded body, so the payload is serialized by the codec instead of the
+    HTTP library.
+
+    :param JSONCodec codec: codec encoding the payload.
+    :param dict kwargs: request arguments.
+
+    :return: the request arguments with the body in data and the JSON Content-Type header.
+    """
+    payload = kwargs.pop('json', None)
+    if payload is not None:
+        kwargs['data'] = codec.dumps(payload)
+        kwargs['headers'] = {'Content-Type': 'application/json', **(kwargs.get('headers') or {})}
+    return kwargs
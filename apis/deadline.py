@@ -0,0 +1,89 @@
+import contextvars
+import time
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+_current = contextvars.ContextVar('apis_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of sending a request when the deadline it runs under has expired.
+    """
+
+
+def normalize_timeout(timeout) -> tuple:
+    """
+    :param timeout: seconds applied to both the connect and read timeouts, a (connect, read) tuple or None for no
+        timeout.
+
+    :return: (connect, read) tuple, each value may be None.
+    """
+    if isinstance(timeout, (tuple, list)):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    for value in (connect, read):
+        if value is not None and not value > 0:
+            raise ValueError("timeouts must be numbers greater than 0.")
+    return connect, read
+
+
+class Deadline:
+    """
+    Class responsible for bounding the total time of every request made while it is active, e.g. all the requests of
+    a get_persons call.
+
+    It is a context manager bound to the current thread or asyncio task: each request checks it before being sent and
+    has its connect and read timeouts shrunk to the time left. Nested deadlines never extend the outer ones.
+    run_bulk propagates it to its worker threads and asyncio to the tasks created under it.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        """
+        :param float seconds: seconds, from now, the requests have to complete.
+        """
+        if not seconds > 0:
+            raise ValueError("seconds must be a number greater than 0.")
+        self.expires_at = time.monotonic() + seconds
+        self._tokens = []
+
+    def __enter__(self):
+        outer = _current.get()
+        if outer is not None and outer.expires_at < self.expires_at:
+            self.expires_at = outer.expires_at
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        _current.reset(self._tokens.pop())
+
+    def remaining(self) -> float:
+        """
+        :return: seconds left, 0 once the deadline has expired.
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clamp(self, timeout: tuple) -> tuple:
+        """
+        :param tuple timeout: (connect, read) tuple, each value may be None.
+
+        :return: the timeout with both values shrunk to the time left.
+        :raises DeadlineExceeded: if the deadline has expired.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline exceeded before the request was sent.')
+        return tuple(remaining if value is None else min(value, remaining) for value in timeout)
+
+
+def current_deadline() -> Deadline or None:
+    """
+    :return: the innermost active Deadline of the current thread or task, None if there is none.
+    """
+    return _current.get()
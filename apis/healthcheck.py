@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger('APIs.HealthCheck')
+
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'
+UNHEALTHY = 'unhealthy'
+
+DEFAULT_HEALTHCHECK_INTERVAL = 30
+DEFAULT_HEALTHCHECK_TIMEOUT = 5
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RECOVERY_THRESHOLD = 2
+
+
+class HealthStatus:
+    """
+    Class responsible for keeping the cached result of the API healthcheck.
+
+    The status moves between healthy, degraded and unhealthy with hysteresis: a healthy API becomes degraded on the
+    first failed probe and only becomes unhealthy after failure_threshold consecutive failures, an unhealthy API needs
+    recovery_threshold consecutive successful probes to become healthy again. Only the unhealthy status blocks
+    requests. Before the first probe the status is unknown, and the first probe result is taken as is.
+    """
+
+    def __init__(self, interval: float = DEFAULT_HEALTHCHECK_INTERVAL,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 recovery_threshold: int = DEFAULT_RECOVERY_THRESHOLD) -> None:
+        """
+        :param float interval: seconds a probe result is considered up to date, 0 probes before every request.
+        :param int failure_threshold: consecutive failed probes needed to mark a healthy API as unhealthy.
+        :param int recovery_threshold: consecutive successful probes needed to mark an unhealthy API as healthy.
+        """
+        if not interval >= 0:
+            raise ValueError("interval must be a number equal or greater than 0.")
+        if not failure_threshold > 0:
+            raise ValueError("failure_threshold must be a integer greater than 0.")
+        if not recovery_threshold > 0:
+            raise ValueError("recovery_threshold must be a integer greater than 0.")
+
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.recovery_threshold = recovery_threshold
+        self.state = None
+        self.last_error = None
+        self.checked_at = None
+        self._failures = 0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        """
+        :return: True if the API was never probed or the last probe is older than interval.
+        """
+        return self.checked_at is None or time.monotonic() - self.checked_at >= self.interval
+
+    def record(self, result: int or dict) -> str:
+        """
+        Updates the status with a probe result.
+
+        :param result: value returned by the healthcheck, 200 if healthy or a dict with the error.
+
+        :return: the new status.
+        """
+        with self._lock:
+            previous = self.state
+            if result == 200:
+                self._successes += 1
+                self._failures = 0
+                if self.state != UNHEALTHY or self._successes >= self.recovery_threshold:
+                    self.state = HEALTHY
+            else:
+                self.last_error = result
+                self._failures += 1
+                self._successes = 0
+                if self.state is None or self._failures >= self.failure_threshold:
+                    self.state = UNHEALTHY
+                elif self.state == HEALTHY:
+                    self.state = DEGRADED
+            self.checked_at = time.monotonic()
+
+        if previous != self.state:
+            logger.info(f'API health status changed from "{previous}" to "{self.state}"')
+        return self.state
+
+    @property
+    def result(self) -> int or dict:
+        """
+        :return: 200 if requests are allowed or a dict with the last healthcheck error if the API is unhealthy.
+        """
+        return self.last_error if self.state == UNHEALTHY else 200
+
+
+class HealthMonitor:
+    """
+    Class responsible for refreshing a HealthStatus from a background thread.
+    """
+
+    def __init__(self, status: HealthStatus, probe) -> None:
+        """
+        :param HealthStatus status: status refreshed by the monitor.
+        :param probe: callable without arguments returning 200 if healthy or a dict with the error. Returning None
+            stops the monitor, e.g. when the API it probes was garbage collected.
+        """
+        self.status = status
+        self.probe = probe
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts probing the API every status.interval seconds, the first probe is made right away.
+        """
+        if self.running:
+            return
+        if not self.status.interval > 0:
+            raise ValueError("The background healthcheck needs an interval greater than 0.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='api-healthcheck', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Stops the monitor.
+
+        :param float timeout: maximum seconds to wait for a probe in progress, None waits until it finishes.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            result = self.probe()
+            if result is None:
+                return
+            self.status.record(result)
+            self._stop.wait(self.status.interval)
@@ -0,0 +1,256 @@
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+
+from apis.bulk import run_bulk, DEFAULT_BULK_WORKERS
+from apis.codec import JSONCodec, get_codec
+
+logger = logging.getLogger('APIs.Jobs')
+
+DEFAULT_CHECKPOINT_EVERY = 100
+# number of outputs read from the database at a time when they are iterated
+_OUTPUTS_BATCH = 1000
+# number of ids looked up per query, below the SQLite limit of parameters
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_outputs (job TEXT NOT NULL, item_id NOT NULL, output BLOB, UNIQUE (job, item_id));
+CREATE TABLE IF NOT EXISTS job_state (job TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                                      PRIMARY KEY (job, key)) WITHOUT ROWID;
+"""
+
+_MISSING = object()
+
+
+def _chunks(items, size: int):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class JobStore:
+    """
+    Class responsible for persisting the progress of resumable jobs in a SQLite database: the ids of the completed
+    items with their outputs, and small state values, e.g. pagination cursors.
+
+    Outputs and state are committed together, so a crash leaves either the previous or the new checkpoint on disk.
+    Several jobs, identified by name, may share a store, which may be shared by several threads.
+    """
+
+    def __init__(self, path: str, json_codec: JSONCodec = None) -> None:
+        """
+        :param str path: path of the SQLite database, it is created if it does not exist.
+        :param JSONCodec json_codec: codec encoding the outputs, defaults to the fastest installed one.
+        """
+        self.path = path
+        self.json_codec = json_codec or get_codec()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(_SCHEMA)
+
+    def _fetch(self, sql: str, parameters: tuple = ()) -> list:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def completed(self, job: str, ids) -> set:
+        """
+        :param str job: name of the job.
+        :param ids: iterable with the ids of the items.
+
+        :return: set with the ids already completed by the job.
+        """
+        completed = set()
+        for chunk in _chunks(ids, _LOOKUP_BATCH):
+            rows = self._fetch(f'SELECT item_id FROM job_outputs WHERE job = ? AND item_id IN '
+                               f'({", ".join("?" * len(chunk))})', (job, *chunk))
+            completed.update(row[0] for row in rows)
+        return completed
+
+    def commit(self, job: str, outputs: dict, state: dict = None) -> int:
+        """
+        Marks items as completed with their outputs and saves the state, in a single transaction.
+
+        :param str job: name of the job.
+        :param dict outputs: output by item id, the items already completed keep their first output.
+        :param dict state: JSON serializable values by key.
+
+        :return: number of items completed by this call.
+        """
+        with self._lock, self._connection:
+            inserted = self._connection.executemany(
+                'INSERT OR IGNORE INTO job_outputs (job, item_id, output) VALUES (?, ?, ?)',
+                [(job, id, self.json_codec.dumps(output)) for id, output in outputs.items()])
+            self._connection.executemany('INSERT OR REPLACE INTO job_state (job, key, value) VALUES (?, ?, ?)',
+                                         [(job, key, json.dumps(value)) for key, value in (state or {}).items()])
+        return max(0, inserted.rowcount)
+
+    def get_state(self, job: str, key: str, default=None):
+        """
+        :param str job: name of the job.
+        :param str key: key of the value.
+        :param default: value returned when the key is not stored.
+
+        :return: the stored value.
+        """
+        rows = self._fetch('SELECT value FROM job_state WHERE job = ? AND key = ?', (job, key))
+        return json.loads(rows[0][0]) if rows else default
+
+    def count(self, job: str) -> int:
+        """
+        :return: number of items completed by the job.
+        """
+        return self._fetch('SELECT COUNT(*) FROM job_outputs WHERE job = ?', (job,))[0][0]
+
+    def outputs(self, job: str):
+        """
+        :param str job: name of the job.
+
+        :return: generator of (item id, output) tuples, in completion order, read from the database in batches.
+        """
+        last = 0
+        while True:
+            rows = self._fetch('SELECT rowid, item_id, output FROM job_outputs WHERE job = ? AND rowid > ? '
+                               'ORDER BY rowid LIMIT ?', (job, last, _OUTPUTS_BATCH))
+            for last, id, output in rows:
+                yield id, self.json_codec.loads(output)
+            if len(rows) < _OUTPUTS_BATCH:
+                return
+
+    def reset(self, job: str) -> None:
+        """
+        Deletes the progress of the job, so its next run starts over.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM job_outputs WHERE job = ?', (job,))
+            self._connection.execute('DELETE FROM job_state WHERE job = ?', (job,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class CheckpointedJob:
+    """
+    Class responsible for running a bulk job that resumes where it stopped, e.g. after a crash, without processing
+    the completed items again.
+
+    run processes an input stream with run_bulk, skipping the items completed by a previous run, and checkpoints the
+    outputs every checkpoint_every completed items. run_pages follows a paginated listing and checkpoints each page
+    with the cursor of the next one. An item is completed once: its output is stored only the first time, so a
+    resumed run never duplicates outputs. After a crash, only the items in flight or completed since the last
+    checkpoint are processed again.
+    """
+
+    def __init__(self, store: JobStore, name: str, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> None:
+        """
+        :param JobStore store: store of the progress.
+        :param str name: name of the job, the runs of the same job share its progress.
+        :param int checkpoint_every: number of completed items written per checkpoint.
+        """
+        if not checkpoint_every > 0:
+            raise ValueError("checkpoint_every must be a integer greater than 0.")
+        self.store = store
+        self.name = name
+        self.checkpoint_every = checkpoint_every
+
+    def run(self, func, items, key=None, max_workers: int = DEFAULT_BULK_WORKERS) -> dict:
+        """
+        Calls func for every item not completed yet, with up to max_workers calls at the same time.
+
+        Failed items are not completed, the next run processes them again.
+
+        :param func: callable receiving one item and returning its JSON serializable output.
+        :param items: iterable with the input items, it may be a stream of any length.
+        :param key: callable returning the id of an item, the item itself by default, e.g. an email.
+        :param int max_workers: maximum number of items processed at the same time.
+
+        :return: dict with the number of "processed", "skipped" (completed before or repeated) and "failed" items.
+        """
+        key = key or (lambda item: item)
+        summary = {"processed": 0, "skipped": 0, "failed": 0}
+        scheduled = set()
+
+        def pending():
+            # the completed ids are looked up a chunk at a time, while the workers keep running
+            for chunk in _chunks(items, self.checkpoint_every):
+                ids = [key(item) for item in chunk]
+                completed = self.store.completed(self.name, ids)
+                for id, item in zip(ids, chunk):
+                    if id in completed or id in scheduled:
+                        summary["skipped"] += 1
+                        continue
+                    scheduled.add(id)
+                    yield item
+
+        outputs = {}
+        try:
+            for result in run_bulk(func, pending(), max_workers):
+                if not result.ok:
+                    summary["failed"] += 1
+                    continue
+                outputs[key(result.item)] = result.value
+                if len(outputs) >= self.checkpoint_every:
+                    summary["processed"] += self.store.commit(self.name, outputs)
+                    outputs = {}
+        finally:
+            # the outputs received before an interruption are kept
+            if outputs:
+                summary["processed"] += self.store.commit(self.name, outputs)
+
+        logger.info('Job "%s" finished: %s items processed, %s skipped, %s failed.', self.name,
+                    summary["processed"], summary["skipped"], summary["failed"])
+        return summary
+
+    def run_pages(self, fetch_page, key=None, start=0) -> dict:
+        """
+        Follows a paginated listing from the cursor saved by the previous run, storing the items of every page.
+
+        :param fetch_page: callable receiving a cursor and returning a (items, next cursor) tuple, the next cursor is
+            None on the last page, e.g. Pipedrive.get_persons with the start as cursor.
+        :param key: callable returning the id of an item, item['id'] by default.
+        :param start: cursor of the first page.
+
+        :return: dict with the number of "processed" and "duplicates" items and of "pages" requested.
+        """
+        key = key or (lambda item: item['id'])
+        summary = {"processed": 0, "duplicates": 0, "pages": 0}
+        cursor = self.store.get_state(self.name, 'cursor', _MISSING)
+        if cursor is _MISSING:
+            cursor = start
+        elif cursor is None:
+            logger.info('Job "%s" already finished.', self.name)
+            return summary
+
+        while cursor is not None:
+            items, cursor = fetch_page(cursor)
+            outputs = {key(item): item for item in items or ()}
+            processed = self.store.commit(self.name, outputs, {"cursor": cursor})
+            summary["processed"] += processed
+            summary["duplicates"] += len(items or ()) - processed
+            summary["pages"] += 1
+
+        logger.info('Job "%s" finished: %s items processed, %s duplicates, %s pages.', self.name,
+                    summary["processed"], summary["duplicates"], summary["pages"])
+        return summary
+
+    def outputs(self):
+        """
+        :return: generator of (item id, output) tuples of the completed items, in completion order.
+        """
+        return self.store.outputs(self.name)
+
+    def reset(self) -> None:
+        self.store.reset(self.name)
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import threading
+import time
+
+from apis.retry import parse_retry_after
+
+logger = logging.getLogger('APIs.KeyPool')
+
+LEAST_THROTTLED = 'least_throttled'
+WEIGHTED = 'weighted'
+STRATEGIES = (LEAST_THROTTLED, WEIGHTED)
+
+THROTTLED_STATUS_CODES = frozenset({429})
+REJECTED_STATUS_CODES = frozenset({401, 403})
+DEFAULT_THROTTLE_COOLDOWN = 60
+
+
+class NoKeyAvailableError(Exception):
+    """
+    Raised when every key of a KeyPool was rejected by the API.
+    """
+
+
+def mask_key(key: str) -> str:
+    """
+    :return: the key with all but its last 4 characters hidden, safe to be logged or exported.
+    """
+    return '...' + key[-4:] if len(key) > 8 else '...'
+
+
+def resolve_key(key: str or None, key_pool) -> str:
+    """
+    :param str key: credential of an API instance, it may be None when the instance has a key pool.
+    :param KeyPool key_pool: key pool of the instance, or None.
+
+    :return: the key, or the first key of the pool when it is not provided.
+    """
+    if key is not None:
+        return key
+    if key_pool is None:
+        raise ValueError("A key or a key_pool must be provided.")
+    return key_pool.keys[0]
+
+
+class _PooledKey:
+    __slots__ = ('key', 'weight', 'current_weight', 'requests', 'in_flight', 'throttled', 'rejected',
+                 'throttled_at', 'available_at', 'used_at')
+
+    def __init__(self, key: str, weight: float) -> None:
+        self.key = key
+        self.weight = weight
+        self.current_weight = 0.0
+        self.requests = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.rejected = False
+        self.throttled_at = float('-inf')
+        self.available_at = 0.0
+        self.used_at = float('-inf')
+
+
+class KeyPool:
+    """
+    Class responsible for spreading the requests of an API over several credentials, e.g. Pipedrive tokens or
+    Proxycurl API keys, so the throughput is not capped by the quota of a single one.
+
+    Each request takes a key with acquire and reports its response status with report. A key answered with a 429
+    leaves the rotation for the seconds of the Retry-After header, or cooldown seconds, and a key answered with a
+    401 or 403 leaves it for good. The keys are selected with one of the strategies:
+    - LEAST_THROTTLED: the key throttled the longest ago, the least busy one among the never throttled;
+    - WEIGHTED: smooth weighted round-robin, each key gets a share of the requests proportional to its weight.
+
+    It may be shared by several API instances, sync or async.
+    """
+
+    def __init__(self, keys, weights=None, strategy: str = LEAST_THROTTLED,
+                 cooldown: float = DEFAULT_THROTTLE_COOLDOWN) -> None:
+        """
+        :param keys: iterable with the credentials.
+        :param weights: iterable with the weight of each key, e.g. its quota, all keys weight 1 by default.
+        :param str strategy: LEAST_THROTTLED or WEIGHTED.
+        :param float cooldown: seconds a throttled key leaves the rotation when the response has no Retry-After.
+        """
+        keys = list(keys)
+        weights = [1] * len(keys) if weights is None else list(weights)
+        if not keys or len(set(keys)) != len(keys):
+            raise ValueError("keys must be a non empty iterable of unique keys.")
+        if len(weights) != len(keys) or not all(weight > 0 for weight in weights):
+            raise ValueError("weights must have one number greater than 0 per key.")
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unknown strategy "{strategy}", it must be one of: {", ".join(STRATEGIES)}.')
+        if not cooldown >= 0:
+            raise ValueError("cooldown must be a number equal or greater than 0.")
+
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self._keys = {key: _PooledKey(key, weight) for key, weight in zip(keys, weights)}
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self) -> list:
+        return list(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _select(self, candidates: list) -> _PooledKey:
+        if self.strategy == WEIGHTED:
+            total = sum(candidate.weight for candidate in candidates)
+            for candidate in candidates:
+                candidate.current_weight += candidate.weight
+            selected = max(candidates, key=lambda candidate: candidate.current_weight)
+            selected.current_weight -= total
+            return selected
+        return min(candidates, key=lambda candidate: (candidate.throttled_at, candidate.in_flight, candidate.used_at))
+
+    def reserve(self) -> tuple:
+        """
+        Takes a key for a request, which must then be reported with report.
+
+        :return: (key, seconds to wait) tuple, the wait is 0 unless every key is throttled, in which case the key is
+            the first one back in the rotation.
+        :raises NoKeyAvailableError: if every key was rejected.
+        """
+        with self._lock:
+            now = time.monotonic()
+            active = [pooled for pooled in self._keys.values() if not pooled.rejected]
+            if not active:
+                raise NoKeyAvailableError('Every key of the pool was rejected by the API.')
+            available = [pooled for pooled in active if pooled.available_at <= now]
+            if available:
+                selected, wait = self._select(available), 0.0
+            else:
+                selected = min(active, key=lambda pooled: pooled.available_at)
+                wait = selected.available_at - now
+            selected.requests += 1
+            selected.in_flight += 1
+            selected.used_at = now
+            return selected.key, wait
+
+    def acquire(self) -> str:
+        """
+        Takes a key for a request, blocking the thread while every key is throttled.
+
+        :return: the key.
+        """
+        key, wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return key
+
+    async def acquire_async(self) -> str:
+        """
+        Takes a key for a request, suspending the task while every key is throttled.
+
+        :return: the key.
+        """
+        key, wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return key
+
+    def report(self, key: str, status_code: int = None, retry_after: str = None) -> bool:
+        """
+        :param str key: key returned by acquire.
+        :param int status_code: status code of the response, None if no response was received.
+        :param str retry_after: value of the Retry-After response header.
+
+        :return: True if the response took the key out of the rotation.
+        """
+        with self._lock:
+            pooled = self._keys[key]
+            pooled.in_flight = max(0, pooled.in_flight - 1)
+            if status_code in REJECTED_STATUS_CODES:
+                if not pooled.rejected:
+                    pooled.rejected = True
+                    logger.warning('Key %s rejected with status code %s, removed from the pool', mask_key(key),
+                                   status_code)
+                return True
+            if status_code in THROTTLED_STATUS_CODES:
+                seconds = parse_retry_after(retry_after) if retry_after else None
+                seconds = self.cooldown if seconds is None else seconds
+                pooled.throttled += 1
+                pooled.throttled_at = time.monotonic()
+                pooled.available_at = max(pooled.available_at, pooled.throttled_at + seconds)
+                logger.warning('Key %s throttled, out of the pool rotation for %.2fs', mask_key(key), seconds)
+                return True
+            return False
+
+    def available(self) -> int:
+        """
+        :return: number of keys in the rotation right now.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for pooled in self._keys.values() if not pooled.rejected and pooled.available_at <= now)
+
+    def usage(self) -> list:
+        """
+        :return: list with one dict per key, with the masked "key", the number of "requests", "in_flight" and
+            "throttled" responses, and its "state": "active", "throttled" or "rejected".
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [{"key": mask_key(pooled.key), "requests": pooled.requests, "in_flight": pooled.in_flight,
+                     "throttled": pooled.throttled,
+                     "state": 'rejected' if pooled.rejected else 'throttled' if pooled.available_at > now else 'active'}
+                    for pooled in self._keys.values()]
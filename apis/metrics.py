@@ -0,0 +1,322 @@
+import bisect
+import logging
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger('APIs.Metrics')
+
+# upper bounds, in seconds, of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# phases of a request: DNS resolution and connection, time to the first byte and body read
+PHASES = ('connect', 'ttfb', 'read')
+
+
+class RequestEvent:
+    """
+    Class responsible for describing one attempt of a request, the same event is passed to every hook of the attempt.
+
+    The durations are in seconds. connect is 0 when a pooled connection is reused, and connect, ttfb and read add
+    up to elapsed. Sizes are None when they are not known, e.g. the body of a streamed response.
+    """
+
+    __slots__ = ('api', 'endpoint_key', 'method', 'url', 'attempt', 'status_code', 'elapsed', 'connect', 'ttfb',
+                 'read', 'bytes_out', 'bytes_in', 'error')
+
+    def __init__(self, api: str, endpoint_key: str, method: str, url: str, attempt: int = 1) -> None:
+        """
+        :param str api: name of the API class making the request, e.g. "Pipedrive".
+        :param str endpoint_key: endpoint key of the request, None for requests made directly by url.
+        :param str method: HTTP verb, in lower case.
+        :param str url: requested url.
+        :param int attempt: number of the attempt, starting at 1.
+        """
+        self.api = api
+        self.endpoint_key = endpoint_key
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        self.status_code = None
+        self.elapsed = None
+        self.connect = None
+        self.ttfb = None
+        self.read = None
+        self.bytes_out = None
+        self.bytes_in = None
+        self.error = None
+
+    def __repr__(self) -> str:
+        return (f'RequestEvent(api={self.api!r}, endpoint_key={self.endpoint_key!r}, method={self.method!r},'
+                f' attempt={self.attempt}, status_code={self.status_code})')
+
+
+class RequestHooks:
+    """
+    Class responsible for receiving the request events of an API. Subclasses override the callbacks they need.
+
+    Hooks are called synchronously in the thread, or event loop, making the request and must be fast. Exceptions
+    raised by a hook are logged and do not affect the request.
+    """
+
+    def before_request(self, event: RequestEvent) -> None:
+        """
+        Called before every attempt is sent.
+        """
+
+    def after_response(self, event: RequestEvent) -> None:
+        """
+        Called when a response is received, whatever its status code.
+        """
+
+    def on_retry(self, event: RequestEvent, delay: float) -> None:
+        """
+        Called when the attempt is going to be retried after delay seconds.
+        """
+
+    def on_error(self, event: RequestEvent, error: Exception) -> None:
+        """
+        Called when the request fails without a response and is not retried, before the error is raised.
+        """
+
+    def on_circuit_change(self, event: RequestEvent, old_state: str, new_state: str) -> None:
+        """
+        Called when the circuit breaker of the endpoint changes state, e.g. from "closed" to "open", because of the
+        attempt described by the event.
+        """
+
+
+def emit(hooks: list, callback: str, *args) -> None:
+    """
+    Calls the callback of every hook.
+
+    :param list hooks: list of RequestHooks.
+    :param str callback: name of the callback, e.g. "after_response".
+    """
+    for hook in hooks:
+        try:
+            getattr(hook, callback)(*args)
+        except Exception:
+            logger.exception('Request hook %s.%s failed', type(hook).__name__, callback)
+
+
+class Histogram:
+    """
+    Class responsible for counting observations in cumulative buckets, as Prometheus histograms do.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """
+        :return: list of (upper bound, count of observations lower or equal to it) tuples, ending with +Inf.
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        :return: upper bound of the bucket holding the q quantile, e.g. 0.99 for the p99.
+        """
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsCollector(RequestHooks):
+    """
+    Class responsible for aggregating the request events in memory, by API class, endpoint key, verb and status code.
+
+    It is a RequestHooks and may be shared by several API instances. The metrics are exported with to_prometheus.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, prefix: str = 'apis') -> None:
+        """
+        :param tuple buckets: upper bounds, in seconds, of the duration histogram buckets.
+        :param str prefix: prefix of the exported metric names.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.durations = {}
+        self.phases = {}
+        self.bytes_in = {}
+        self.bytes_out = {}
+        self.retries = {}
+        self.errors = {}
+        self.circuit_changes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(event: RequestEvent) -> tuple:
+        return event.api, event.endpoint_key or '', event.method.upper()
+
+    def _histogram(self, histograms: dict, key: tuple) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def after_response(self, event: RequestEvent) -> None:
+        key = self._labels(event) + (str(event.status_code),)
+        with self._lock:
+            if event.elapsed is not None:
+                self._histogram(self.durations, key).observe(event.elapsed)
+            for phase in PHASES:
+                value = getattr(event, phase)
+                if value is not None:
+                    self._histogram(self.phases, key + (phase,)).observe(value)
+            if event.bytes_in is not None:
+                self.bytes_in[key] = self.bytes_in.get(key, 0) + event.bytes_in
+            if event.bytes_out is not None:
+                self.bytes_out[key] = self.bytes_out.get(key, 0) + event.bytes_out
+
+    def on_retry(self, event: RequestEvent, delay: float) -> None:
+        key = self._labels(event)
+        with self._lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def on_error(self, event: RequestEvent, error: Exception) -> None:
+        key = self._labels(event) + (type(error).__name__,)
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def on_circuit_change(self, event: RequestEvent, old_state: str, new_state: str) -> None:
+        key = (event.api, event.endpoint_key or '', new_state)
+        with self._lock:
+            self.circuit_changes[key] = self.circuit_changes.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        """
+        :return: dict with the request count, mean, p50 and p99 durations by (api, endpoint_key, method, status).
+        """
+        with self._lock:
+            return {key: {"count": histogram.count, "mean": histogram.sum / histogram.count,
+                          "p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99)}
+                    for key, histogram in self.durations.items()}
+
+    def to_prometheus(self) -> str:
+        """
+        :return: the metrics in the Prometheus text exposition format.
+        """
+        request_labels = ('api', 'endpoint', 'method', 'status')
+        lines = []
+        with self._lock:
+            self._export_histograms(lines, 'request_duration_seconds', 'Duration of the requests.',
+                                    self.durations, request_labels)
+            self._export_histograms(lines, 'request_phase_seconds',
+                                    'Duration of the connect, time to first byte and body read phases.',
+                                    self.phases, request_labels + ('phase',))
+            self._export_counters(lines, 'response_bytes_total', 'Bytes received in response bodies.',
+                                  self.bytes_in, request_labels)
+            self._export_counters(lines, 'request_bytes_total', 'Bytes sent in request bodies.',
+                                  self.bytes_out, request_labels)
+            self._export_counters(lines, 'request_retries_total', 'Retried request attempts.',
+                                  self.retries, ('api', 'endpoint', 'method'))
+            self._export_counters(lines, 'request_errors_total', 'Requests failed without a response.',
+                                  self.errors, ('api', 'endpoint', 'method', 'error'))
+            self._export_counters(lines, 'circuit_changes_total', 'Circuit breaker state changes, by new state.',
+                                  self.circuit_changes, ('api', 'endpoint', 'state'))
+        return '\n'.join(lines) + '\n'
+
+    def _export_histograms(self, lines: list, name: str, help_text: str, histograms: dict, label_names: tuple) -> None:
+        name = f'{self.prefix}_{name}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, histogram in sorted(histograms.items()):
+            labels = _format_labels(label_names, key)
+            for bound, total in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+    def _export_counters(self, lines: list, name: str, help_text: str, counters: dict, label_names: tuple) -> None:
+        name = f'{self.prefix}_{name}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for key, value in sorted(counters.items()):
+            lines.append(f'{name}{{{_format_labels(label_names, key)}}} {value}')
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+# seconds spent opening connections by the current thread, read by the API after each attempt
+_connect_time = threading.local()
+
+
+def reset_connect_time() -> None:
+    _connect_time.value = 0.0
+
+
+def add_connect_time(seconds: float) -> None:
+    """
+    Adds seconds spent resolving and connecting to the current thread, called by the transports.
+    """
+    _connect_time.value = get_connect_time() + seconds
+
+
+def get_connect_time() -> float:
+    """
+    :return: seconds the current thread spent resolving and connecting since the last reset_connect_time.
+    """
+    return getattr(_connect_time, 'value', 0.0)
+
+
+class _TimedConnection:
+    """
+    Mixin timing the DNS resolution and connection of urllib3 connections.
+    """
+
+    def connect(self) -> None:
+        started = time.perf_counter()
+        try:
+            super(_TimedConnection, self).connect()
+        finally:
+            add_connect_time(time.perf_counter() - started)
+
+
+class _TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    Class responsible for opening connections that report their connect time, otherwise it is a regular HTTPAdapter.
+    """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
@@ -0,0 +1,227 @@
+import logging
+import sqlite3
+import threading
+
+from apis.codec import JSONCodec, get_codec
+from apis.pipedrive import DEFAULT_PAGE_SIZE, PersonChange
+
+logger = logging.getLogger('APIs.Mirror')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS person_emails (
+    email TEXT NOT NULL, person_id INTEGER NOT NULL, PRIMARY KEY (email, person_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS person_emails_person_id ON person_emails (person_id);
+CREATE TABLE IF NOT EXISTS person_phones (
+    phone TEXT NOT NULL, person_id INTEGER NOT NULL, PRIMARY KEY (phone, person_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS person_phones_person_id ON person_phones (person_id);
+CREATE TABLE IF NOT EXISTS mirror_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def normalize_email(email: str) -> str:
+    """
+    :return: the email without surrounding blanks and in lower case.
+    """
+    return email.strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    :return: the digits of the phone, so "+55 (11) 9999-0000" and "5511999990000" match.
+    """
+    return ''.join(char for char in phone if char.isdigit())
+
+
+def _contact_keys(values, normalize) -> set:
+    """
+    :param values: 'email' or 'phone' field of a contact, a list of {"value", "primary", "label"} dicts or a str.
+
+    :return: set with the normalized values, the empty ones are left out.
+    """
+    if not values:
+        return set()
+    if isinstance(values, str):
+        values = [values]
+    keys = (normalize((item.get('value') if isinstance(item, dict) else item) or '') for item in values)
+    return {key for key in keys if key}
+
+
+class _MirrorState:
+    """
+    Stores the sync high-water mark in the mirror database, so it is committed together with the contacts.
+    """
+
+    def __init__(self, mirror) -> None:
+        self.mirror = mirror
+
+    def get(self, key: str, default=None):
+        rows = self.mirror._fetch('SELECT value FROM mirror_state WHERE key = ?', (key,))
+        return rows[0][0] if rows else default
+
+    def set(self, key: str, value: str) -> None:
+        self.mirror._commit_changes({key: value})
+
+
+class PersonMirror:
+    """
+    Class responsible for keeping a local copy of the Pipedrive contacts in a SQLite database, indexed by id and by
+    normalized email and phone, so the contacts are looked up without requests or linear scans.
+
+    The contacts are stored as JSON documents, the emails and phones in their own indexed tables. refresh brings the
+    mirror up to date through Pipedrive.sync_persons: the first one copies every contact and the next ones apply
+    only the changes since the previous refresh. The high-water mark is saved in the same database and committed
+    with the contacts, so an interrupted refresh resumes from the last complete page.
+
+    It may be shared by several threads.
+    """
+
+    def __init__(self, path: str, json_codec: JSONCodec = None) -> None:
+        """
+        :param str path: path of the SQLite database, it is created if it does not exist, ":memory:" keeps the
+            mirror in memory.
+        :param JSONCodec json_codec: codec encoding the contacts, defaults to the fastest installed one.
+        """
+        self.path = path
+        self.json_codec = json_codec or get_codec()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._pending = {}
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(_SCHEMA)
+
+    def _fetch(self, sql: str, parameters: tuple = ()) -> list:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def upsert(self, persons) -> int:
+        """
+        Inserts or replaces contacts, in a single transaction.
+
+        :param persons: iterable of Pipedrive contacts formatted as dictionaries.
+
+        :return: number of contacts written.
+        """
+        persons = {person['id']: person for person in persons}
+        with self._lock, self._connection:
+            self._write(persons, ())
+        return len(persons)
+
+    def delete(self, ids) -> int:
+        """
+        :param ids: iterable of contact ids, the ones not in the mirror are ignored.
+
+        :return: number of contacts deleted.
+        """
+        ids = set(ids)
+        with self._lock, self._connection:
+            return self._write({}, ids)
+
+    def _write(self, persons: dict, deleted_ids) -> int:
+        """
+        Writes the contacts and deletes the ids in the current transaction.
+
+        :return: number of contacts deleted.
+        """
+        ids = [(id,) for id in (*persons, *deleted_ids)]
+        self._connection.executemany('DELETE FROM person_emails WHERE person_id = ?', ids)
+        self._connection.executemany('DELETE FROM person_phones WHERE person_id = ?', ids)
+        deleted = self._connection.executemany('DELETE FROM persons WHERE id = ?', [(id,) for id in deleted_ids])
+        self._connection.executemany('INSERT OR REPLACE INTO persons (id, data) VALUES (?, ?)',
+                                     [(id, self.json_codec.dumps(person)) for id, person in persons.items()])
+        self._connection.executemany('INSERT INTO person_emails (email, person_id) VALUES (?, ?)',
+                                     [(email, id) for id, person in persons.items()
+                                      for email in _contact_keys(person.get('email'), normalize_email)])
+        self._connection.executemany('INSERT INTO person_phones (phone, person_id) VALUES (?, ?)',
+                                     [(phone, id) for id, person in persons.items()
+                                      for phone in _contact_keys(person.get('phone'), normalize_phone)])
+        return max(0, deleted.rowcount)
+
+    def _commit_changes(self, state: dict = None) -> None:
+        """
+        Writes the pending changes of a refresh and the state in a single transaction.
+        """
+        with self._lock, self._connection:
+            pending, self._pending = self._pending, {}
+            self._write({id: change.person for id, change in pending.items()
+                         if change.action == PersonChange.UPSERT},
+                        [id for id, change in pending.items() if change.action == PersonChange.DELETE])
+            self._connection.executemany('INSERT OR REPLACE INTO mirror_state (key, value) VALUES (?, ?)',
+                                         list((state or {}).items()))
+
+    def refresh(self, pipedrive, page_size: int = DEFAULT_PAGE_SIZE, state_key: str = None) -> dict:
+        """
+        Applies the contacts changed since the previous refresh, or copies every contact on the first one.
+
+        :param Pipedrive pipedrive: Pipedrive instance of the account mirrored.
+        :param int page_size: The number of contacts requested per page.
+        :param str state_key: key of the high-water mark, by default it is derived from the token, see sync_persons.
+
+        :return: dict with the number of "upserted" and "deleted" contacts.
+        """
+        summary = {"upserted": 0, "deleted": 0}
+        # the lookups are answered while the pages are requested, only the writes hold the database
+        with self._refresh_lock:
+            self._pending = {}
+            try:
+                for change in pipedrive.sync_persons(_MirrorState(self), page_size=page_size, state_key=state_key):
+                    # a contact changed twice during the refresh keeps its latest change only
+                    self._pending[change.id] = change
+                    summary["upserted" if change.action == PersonChange.UPSERT else "deleted"] += 1
+                    # the first refresh saves its mark only at the end, the contacts are written page by page
+                    if len(self._pending) >= page_size:
+                        self._commit_changes()
+                self._commit_changes()
+            finally:
+                self._pending = {}
+        logger.info('Contacts mirror refreshed: %s contacts upserted, %s deleted.',
+                    summary["upserted"], summary["deleted"])
+        return summary
+
+    def get(self, id: int) -> dict or None:
+        """
+        :param int id: ID of the contact.
+
+        :return: the contact, None if it is not in the mirror.
+        """
+        rows = self._fetch('SELECT data FROM persons WHERE id = ?', (id,))
+        return self.json_codec.loads(rows[0][0]) if rows else None
+
+    def find_by_email(self, email: str) -> list:
+        """
+        :param str email: email of the contacts, compared case insensitively.
+
+        :return: list with the contacts having the email, ordered by id.
+        """
+        return self._find('person_emails', 'email', normalize_email(email))
+
+    def find_by_phone(self, phone: str) -> list:
+        """
+        :param str phone: phone of the contacts, only its digits are compared.
+
+        :return: list with the contacts having the phone, ordered by id.
+        """
+        return self._find('person_phones', 'phone', normalize_phone(phone))
+
+    def _find(self, table: str, column: str, key: str) -> list:
+        if not key:
+            return []
+        rows = self._fetch(f'SELECT persons.data FROM {table} JOIN persons ON persons.id = {table}.person_id '
+                           f'WHERE {table}.{column} = ? ORDER BY persons.id', (key,))
+        return [self.json_codec.loads(row[0]) for row in rows]
+
+    def __len__(self) -> int:
+        return self._fetch('SELECT COUNT(*) FROM persons')[0][0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
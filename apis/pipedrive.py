@@ -1,13 +1,322 @@
+import contextvars
+import datetime
+import email.utils
+import hashlib
+import itertools
 import logging
-
-from apis.api import API
+import queue
+import threading
+import time
+
+from apis.api import API, RequestStats
+from apis.bulk import run_bulk, DEFAULT_BULK_WORKERS
+from apis.jobs import CheckpointedJob
+from apis.keypool import resolve_key
+from apis.async_api import AsyncAPI
+from apis.records import ColumnBatch, intern_value, record_class
+from apis.state import StateStore
 
 logger = logging.getLogger('APIs.Pipedrive')
 
 BASE_URL = 'https://api.pipedrive.com'
 USERS_ME = '/v1/users/me/'
 PERSONS = '/api/v1/persons/'
-UPDATE_KEY = 'contact_update'
+RECENTS = '/v1/recents'
+DEFAULT_PAGE_SIZE = 100
+# largest limit accepted by the 'persons' endpoint, bigger ones are lowered by the server
+MAX_PAGE_SIZE = 500
+DEFAULT_DOMAIN_TTL = 3600
+# fields kept by the compact person records when none are selected
+DEFAULT_PERSON_FIELDS = ('id', 'name', 'email', 'phone', 'owner_name', 'org_name', 'update_time')
+# fields whose values repeat across many contacts, they are interned
+INTERNED_PERSON_FIELDS = frozenset({'owner_name', 'org_name', 'first_name', 'visible_to', 'label', 'update_time',
+                                    'add_time'})
+
+_END_OF_PAGES = object()
+
+
+def _api_source() -> dict:
+    """
+    :return: api_source dict shared by the sync and async Pipedrive clients.
+    """
+    return {
+        "endpoints": {
+            "base_url": BASE_URL,
+            "users_me": USERS_ME,
+            "persons": PERSONS,
+            "person": PERSONS + '{id}',
+            "recents": RECENTS
+        }
+    }
+
+
+def _check_content(content: dict) -> dict:
+    """
+    Raises if the Pipedrive response content reports an error.
+
+    :param dict content: content of the Pipedrive response.
+
+    :return: the same content when the request was successful.
+    """
+    if content["success"] is False:
+        msg = f'{content["error"]}! {content["error_info"]}'
+        raise Exception(msg)
+    return content
+
+
+def _persons_params(token: str, start: int = None, limit: int = None) -> dict:
+    """
+    Builds and validates the 'persons' endpoint params.
+
+    :param str token: Pipedrive personal token.
+    :param int start: Pagination start.
+    :param int limit: The number of contacts per page.
+
+    :return: dictionary with the request parameters.
+    """
+    params = {
+        'api_token': token
+    }
+
+    if start is not None and limit is not None:
+        if not start >= 0:
+            raise ValueError(f"start must be a integer equal or greater than 0.")
+        if not limit > 0:
+            raise ValueError(f"limit must be a integer greater than 0.")
+        params['start'] = start
+        params['limit'] = limit
+    return params
+
+
+def _parse_persons(content: dict, start: int = None) -> tuple:
+    """
+    Extracts the contacts and the next page start from a 'persons' response content.
+
+    :param dict content: content of the Pipedrive response.
+    :param int start: Pagination start used in the request.
+
+    :return: List of contacts and next page start.
+    """
+    next_start = None
+
+    if start is not None:
+        more_items = content['additional_data']['pagination']['more_items_in_collection']
+        if more_items:
+            next_start = content['additional_data']['pagination']['next_start']
+
+    return content['data'], next_start
+
+
+def _persons_log_level(data: list or None) -> int:
+    """
+    :return: level of the log line written by _log_persons for the given contacts.
+    """
+    return logging.WARNING if data is None else logging.INFO
+
+
+def _log_persons(data: list or None, company_domain: str) -> None:
+    """
+    Logs the result of a 'persons' request.
+
+    :param data: List of contacts retrieved.
+    :param str company_domain: company domain the contacts belong to.
+    """
+    if isinstance(data, type(None)):
+        logger.warning(f'List of contacts for company domain {company_domain} is empty.')
+    else:
+        logger.info((f'Retrieving list of contacts for company domain {company_domain} was successful.'
+                     f' {len(data)} contacts retrieved.'))
+
+
+class PersonChange:
+    """
+    Class responsible for describing a contact change yielded by Pipedrive.sync_persons.
+    """
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+    __slots__ = ('action', 'id', 'person')
+
+    def __init__(self, action: str, id: int, person: dict = None) -> None:
+        """
+        :param str action: PersonChange.UPSERT or PersonChange.DELETE.
+        :param int id: ID of the contact.
+        :param dict person: the contact, it may be None for deletes.
+        """
+        self.action = action
+        self.id = id
+        self.person = person
+
+    def __repr__(self) -> str:
+        return f'PersonChange(action={self.action!r}, id={self.id!r})'
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, PersonChange) and
+                (self.action, self.id, self.person) == (other.action, other.id, other.person))
+
+
+def _person_change(item: dict) -> PersonChange:
+    """
+    :param dict item: item of a 'recents' response.
+
+    :return: the PersonChange described by the item, deleted contacts come with no data or with active_flag False.
+    """
+    person = item.get('data')
+    if person is None or person.get('active_flag') is False:
+        return PersonChange(PersonChange.DELETE, item['id'], person)
+    return PersonChange(PersonChange.UPSERT, item['id'], person)
+
+
+def _max_update_time(cursor: str or None, persons) -> str or None:
+    """
+    :return: the latest of the cursor and the update_time of the contacts, Pipedrive timestamps sort as strings.
+    """
+    for person in persons:
+        update_time = person.get('update_time') if person else None
+        if update_time and (cursor is None or update_time > cursor):
+            cursor = update_time
+    return cursor
+
+
+def _server_time(date: str or None) -> str or None:
+    """
+    :param date: Date header of a response, e.g. "Wed, 03 Jan 2024 10:00:00 GMT".
+
+    :return: the date as a Pipedrive timestamp in UTC, e.g. "2024-01-03 10:00:00", None if it is missing or invalid.
+    """
+    try:
+        server_time = email.utils.parsedate_to_datetime(date)
+    except (TypeError, ValueError):
+        return None
+    if server_time.tzinfo is not None:
+        server_time = server_time.astimezone(datetime.timezone.utc)
+    return server_time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _contact_values(values: list or None) -> tuple:
+    """
+    :param values: 'email' or 'phone' field of a contact, a list of {"value", "primary", "label"} dicts.
+
+    :return: tuple with the values, the primary one first.
+    """
+    if not values:
+        return ()
+    ordered = sorted(values, key=lambda item: not item.get('primary'))
+    return tuple(item['value'] for item in ordered if item.get('value'))
+
+
+def _person_value(person: dict, field: str):
+    """
+    :return: the compact value of a contact field, the nested objects are reduced to the ids and names.
+    """
+    if field in ('email', 'phone'):
+        return _contact_values(person.get(field))
+    if field in ('owner_name', 'org_name'):
+        value = person.get(field)
+        if value is None:
+            related = person.get(field[:-len('name')] + 'id')
+            value = related.get('name') if isinstance(related, dict) else None
+        return intern_value(value)
+    value = person.get(field)
+    if field in ('owner_id', 'org_id') and isinstance(value, dict):
+        return value.get('value')
+    return intern_value(value) if field in INTERNED_PERSON_FIELDS else value
+
+
+def compact_persons(persons, fields: tuple = DEFAULT_PERSON_FIELDS):
+    """
+    Converts contacts into compact records keeping only the selected fields.
+
+    The 'email' and 'phone' fields become tuples of values, primary first, 'owner_id' and 'org_id' become ids and
+    'owner_name' and 'org_name' are read from the related objects when the contact does not have them.
+
+    :param persons: iterable of Pipedrive contacts formatted as dictionaries.
+    :param tuple fields: fields kept by the records.
+
+    :return: generator of PersonRecord, whose to_dict method converts them back to dictionaries.
+    """
+    cls = record_class('PersonRecord', fields)
+    return (cls(*[_person_value(person, field) for field in fields]) for person in persons)
+
+
+class _TTLValue:
+    """
+    Holds a single value that expires ttl seconds after being set.
+    """
+
+    def __init__(self, ttl: float or None) -> None:
+        """
+        :param ttl: seconds the value stays valid, None keeps it until invalidated and 0 disables the cache.
+        """
+        if ttl is not None and not ttl >= 0:
+            raise ValueError("ttl must be a number equal or greater than 0.")
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        :return: the stored value or None if it was never set, has expired or was invalidated.
+        """
+        with self._lock:
+            if self._value is not None and (self.ttl is None or time.monotonic() < self._expires_at):
+                return self._value
+            return None
+
+    def set(self, value) -> None:
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + (self.ttl or 0)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+
+def _prefetch(iterable, depth: int):
+    """
+    Consumes an iterable in a background thread, staying at most depth items ahead of the caller.
+
+    :param iterable: iterable to be consumed, e.g. a generator of pages.
+    :param int depth: maximum number of items buffered ahead of the caller.
+
+    :return: generator with the items of the iterable, exceptions raised while consuming it are re-raised here.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_END_OF_PAGES, e))
+            return
+        put((_END_OF_PAGES, None))
+
+    threading.Thread(target=contextvars.copy_context().run, args=(produce,), daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _END_OF_PAGES:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
 
 
 class Pipedrive(API):
@@ -15,125 +324,449 @@ class Pipedrive(API):
     Class responsible for all interactions with the Pipedrive API.
     """
 
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str = None, domain_ttl: float = DEFAULT_DOMAIN_TTL, **kwargs) -> None:
         """
-        :param token:  Pipedrive personal token for request authentication.
+        :param token:  Pipedrive personal token for request authentication, it may be omitted when a key_pool of
+         tokens is provided, whose first token is then used where a single one is needed, e.g. as the state key.
+        :param domain_ttl: Seconds the 'users/me' result is cached, None caches it until invalidate_domain is called
+         and 0 disables the cache.
+        :param kwargs: connection options forwarded to API, e.g. pool_maxsize and keep_alive.
         """
 
-        self.token = token
+        self.token = resolve_key(token, kwargs.get('key_pool'))
+        self._users_me = _TTLValue(domain_ttl)
 
-        api_source = {
-            "endpoints": {
-                "base_url": BASE_URL,
-                "users_me": USERS_ME,
-                "persons": PERSONS
-            }
-        }
+        super(Pipedrive, self).__init__(api_source=_api_source(), **kwargs)
 
-        super(Pipedrive, self).__init__(api_source=api_source)
+    def _with_key(self, key: str, params: dict, kwargs: dict) -> tuple:
+        return dict(params or {}, api_token=key), kwargs
 
-    def get_domain(self) -> str:
+    def get_domain(self, refresh: bool = False) -> str:
         """
         Gets the company domain the user's token is linked to.
 
+        The 'users/me' result is cached for domain_ttl seconds.
+
+        :param bool refresh: if True, ignores the cached result and requests it again.
+
         :return: Company domain.
         """
+        users_me = None if refresh else self._users_me.get()
 
-        try:
-            params = {
-                'api_token': self.token
-            }
-            content = self.get(endpoint_key='users_me', params=params)["response"]
-
-            if content["success"] is False:
-                msg = content["error"] + '! ' + content["error_info"]
-                raise Exception(msg)
-            else:
-                return content["data"]["company_domain"]
+        if users_me is None:
+            try:
+                params = {
+                    'api_token': self.token
+                }
+                users_me = _check_content(self.get(endpoint_key='users_me', params=params)["response"])["data"]
+                self._users_me.set(users_me)
 
-        except Exception as e:
-            logger.error(f'Failed to get company domain with provided api token. Error: {str(e)}.')
-            raise
+            except Exception as e:
+                logger.error(f'Failed to get company domain with provided api token. Error: {str(e)}.')
+                raise
 
-    def get_persons(self, start: int = None, limit: int = None) -> list or None:
+        return users_me["company_domain"]
+
+    def invalidate_domain(self) -> None:
+        """
+        Discards the cached 'users/me' result, the next get_domain call requests it again.
+        """
+        self._users_me.invalidate()
+
+    def get_persons(self, start: int = None, limit: int = None, stats: RequestStats = None) -> list or None:
         """
         Gets the contacts a company has in Pipedrive using the 'people' Pipedrive API endpoint.
 
         :param start: Pagination start, the default value is 0. Check Pipedrive API pagination documentation
         for more information.
         :param limit: The number of contacts per page, if not provided, 100 items will be returned.
+        :param RequestStats stats: statistics of the call, filled while the request is made.
 
         :return: List of Pipedrive contacts formatted as dictionaries and next page number,
          if there are no more contacts None will be returned as next page.
         """
-        params = {
-            'api_token': self.token
-        }
+        params = _persons_params(self.token, start, limit)
+
+        try:
+            content = _check_content(self.get(endpoint_key='persons', params=params, stats=stats)["response"])
+        except Exception as e:
+            logger.error(f'Failed to get company contacts with the params {params}. Error: {str(e)}.')
+            raise
+
+        data, next_start = _parse_persons(content, start)
+
+        # the company domain is only needed by the log line, so it is not resolved when the line is not emitted
+        if logger.isEnabledFor(_persons_log_level(data)):
+            _log_persons(data, self.get_domain())
+
+        return data, next_start
+
+    def _iter_pages(self, page_size: int, start: int = 0):
+        """
+        Follows the pagination cursor returned by get_persons.
+
+        :param int page_size: The number of contacts per page.
+        :param int start: Pagination start of the first page.
 
-        if start is not None and limit is not None:
-            if not start >= 0:
-                raise ValueError(f"start must be a integer equal or greater than 0.")
-            if not limit > 0:
-                raise ValueError(f"limit must be a integer greater than 0.")
-            params['start'] = start
-            params['limit'] = limit
+        :return: generator with one list of contacts per page.
+        """
+        while start is not None:
+            data, start = self.get_persons(start=start, limit=page_size)
+            if data:
+                yield data
+
+    def iter_persons(self, page_size: int = DEFAULT_PAGE_SIZE, prefetch: int = 0):
+        """
+        Iterates over every contact of the company, requesting the pages on demand.
 
-        company_domain = self.get_domain()
+        Only the page being consumed, plus the prefetched ones, are kept in memory.
 
+        :param int page_size: The number of contacts requested per page.
+        :param int prefetch: Number of pages fetched in background ahead of the one being consumed,
+         0 fetches each page only when the previous one is exhausted.
+
+        :return: generator with the Pipedrive contacts formatted as dictionaries.
+        """
+        if not page_size > 0:
+            raise ValueError(f"page_size must be a integer greater than 0.")
+        if not prefetch >= 0:
+            raise ValueError(f"prefetch must be a integer equal or greater than 0.")
+
+        pages = self._iter_pages(page_size)
+        if prefetch:
+            pages = _prefetch(pages, prefetch)
+
+        return (person for page in pages for person in page)
+
+    def export_persons(self, sink, page_size: int = DEFAULT_PAGE_SIZE,
+                       max_workers: int = DEFAULT_BULK_WORKERS) -> dict:
+        """
+        Exports every contact of the company to a sink, requesting up to max_workers pages at the same time.
+
+        The pages are offset based, so their starts are computed ahead instead of waiting for each next_start. Starts
+        stop being requested once a page reports the end of the collection, the few requested past it come back
+        empty. The pages are passed to the sink in order and contacts repeated across pages, which happens when the
+        collection changes during the export, are passed only once. A page whose next_start differs from the
+        computed one, e.g. because the server lowered the limit, raises, since contacts would be missed.
+
+        :param sink: callable receiving each contact, e.g. a JSONLSink.
+        :param int page_size: The number of contacts requested per page, at most MAX_PAGE_SIZE.
+        :param int max_workers: maximum number of pages requested at the same time, it should not exceed the
+         pool_maxsize.
+
+        :return: Dictionary with the number of "exported" contacts, "duplicates" skipped and "pages" requested.
+        """
+        if not 0 < page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be a integer greater than 0 and lower or equal to {MAX_PAGE_SIZE}.")
+
+        end = None
+        summary = {"exported": 0, "duplicates": 0, "pages": 0}
+        seen = set()
+        pages = {}
+        next_start = 0
+
+        def starts():
+            for start in itertools.count(0, page_size):
+                if end is not None and start >= end:
+                    return
+                yield start
+
+        results = run_bulk(lambda start: self.get_persons(start=start, limit=page_size), starts(), max_workers)
         try:
-            content = self.get(endpoint_key='persons', params=params)["response"]
+            for result in results:
+                summary["pages"] += 1
+                if not result.ok:
+                    raise result.error
+                start = result.item
+                data, page_next_start = result.value
+                if page_next_start is None and (end is None or start < end):
+                    end = start + page_size
+                elif page_next_start is not None and page_next_start != start + page_size:
+                    raise Exception(f'The contacts page starting at {start} continues at {page_next_start} instead '
+                                    f'of {start + page_size}, the export would miss contacts.')
+                pages[start] = data or ()
+
+                # pages completed out of order wait until the previous ones are written
+                while next_start in pages and (end is None or next_start < end):
+                    for person in pages.pop(next_start):
+                        if person["id"] in seen:
+                            summary["duplicates"] += 1
+                            continue
+                        seen.add(person["id"])
+                        sink(person)
+                        summary["exported"] += 1
+                    next_start += page_size
+        finally:
+            results.close()
+
+        logger.info('Contacts export finished: %s contacts exported, %s duplicates skipped, %s pages requested.',
+                    summary["exported"], summary["duplicates"], summary["pages"])
+        return summary
+
+    def checkpointed_export_persons(self, job: CheckpointedJob, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+        """
+        Exports every contact of the company in a resumable job, which stores the contacts by id and, with each page,
+        the start of the next one. An interrupted export resumes from the last stored page.
 
-            if content["success"] is False:
-                msg = f'{content["error"]}! {content["error_info"]}'
-                raise Exception(msg)
+        :param CheckpointedJob job: job storing the contacts, read them back with its outputs method.
+        :param int page_size: The number of contacts requested per page.
 
-        except Exception as e:
-            logger.error(f'Failed to get company contacts with the params {params}. Error: {str(e)}.')
-            raise
+        :return: dict with the number of "processed" contacts, "duplicates" and "pages" requested, see
+         CheckpointedJob.run_pages.
+        """
+        if not page_size > 0:
+            raise ValueError(f"page_size must be a integer greater than 0.")
+        return job.run_pages(lambda start: self.get_persons(start=start, limit=page_size))
 
-        next_start = None
+    def sync_persons(self, state: StateStore, page_size: int = DEFAULT_PAGE_SIZE, state_key: str = None):
+        """
+        Iterates over the contacts changed since the previous sync, as a stream of PersonChange.
 
-        if start is not None:
-            more_items = content['additional_data']['pagination']['more_items_in_collection']
-            if more_items:
-                next_start = content['additional_data']['pagination']['next_start']
+        The first sync has no high-water mark, so it scans every contact and yields them as upserts. The next ones
+        request only the contacts changed since the latest update_time seen, but not after the server time when the
+        first scan started, using the 'recents' endpoint, which also reports deleted contacts. The high-water mark is saved in the state store after each page is consumed,
+        so an interrupted sync resumes from the last complete page and may yield some changes again.
 
-        data = content['data']
+        :param StateStore state: store of the high-water mark.
+        :param int page_size: The number of contacts requested per page.
+        :param str state_key: key of the high-water mark in the store, by default it is derived from the token.
 
-        if isinstance(data, type(None)):
-            logger.warning(f'List of contacts for company domain {company_domain} is empty.')
-        else:
-            logger.info((f'Retrieving list of contacts for company domain {company_domain} was successful.'
-                         f' {len(data)} contacts retrieved.'))
+        :return: generator with one PersonChange per changed contact.
+        """
+        if not page_size > 0:
+            raise ValueError(f"page_size must be a integer greater than 0.")
+        if state_key is None:
+            state_key = 'pipedrive.persons.' + hashlib.sha256(self.token.encode('utf-8')).hexdigest()[:16]
+
+        cursor = state.get(state_key)
+        if cursor is None:
+            return self._full_sync(state, state_key, page_size)
+        return self._incremental_sync(state, state_key, cursor, page_size)
+
+    def _full_sync(self, state: StateStore, state_key: str, page_size: int):
+        stats = RequestStats()
+        data, start = self.get_persons(start=0, limit=page_size, stats=stats)
+        # a contact changed during the scan may be on a page already read, so the mark is not later than the server
+        # time of the first page, the changes after it are requested by the next sync
+        started_at = _server_time(stats.date)
+        cursor = None
+        for page in itertools.chain([data or ()], self._iter_pages(page_size, start)):
+            yield from (PersonChange(PersonChange.UPSERT, person['id'], person) for person in page)
+            cursor = _max_update_time(cursor, page)
+        if cursor is not None and started_at is not None:
+            cursor = min(cursor, started_at)
+        # the mark is saved only at the end, an interrupted full scan starts over
+        if cursor is not None:
+            state.set(state_key, cursor)
+        logger.info('Full contacts sync finished, high-water mark %s.', cursor)
+
+    def _incremental_sync(self, state: StateStore, state_key: str, since: str, page_size: int):
+        # the pages are offsets of the same query, so since_timestamp stays fixed while the mark moves forward
+        cursor = since
+        start = 0
+        changes = 0
+        while start is not None:
+            params = {'api_token': self.token, 'since_timestamp': since, 'items': 'person',
+                      'start': start, 'limit': page_size}
+            try:
+                content = _check_content(self.get(endpoint_key='recents', params=params)["response"])
+            except Exception as e:
+                logger.error('Failed to get contacts changed since %s. Error: %s.', since, e)
+                raise
+
+            items, start = _parse_persons(content, start)
+            items = [item for item in items or () if item.get('item', 'person') == 'person']
+            for item in items:
+                yield _person_change(item)
+            changes += len(items)
+
+            new_cursor = content.get('additional_data', {}).get('last_timestamp_on_page')
+            new_cursor = _max_update_time(new_cursor or cursor, (item.get('data') for item in items))
+            if new_cursor != cursor:
+                cursor = new_cursor
+                state.set(state_key, cursor)
+        logger.info('Incremental contacts sync finished, %s changes, high-water mark %s.', changes, cursor)
+
+    def iter_person_records(self, fields: tuple = DEFAULT_PERSON_FIELDS, page_size: int = DEFAULT_PAGE_SIZE,
+                            prefetch: int = 0):
+        """
+        Iterates over every contact of the company as compact records, see compact_persons.
 
-        return data, next_start
+        Only the page being converted is held as dictionaries, which makes keeping a whole account in memory several
+        times cheaper.
+
+        :param tuple fields: fields kept by the records.
+        :param int page_size: The number of contacts requested per page.
+        :param int prefetch: Number of pages fetched in background ahead of the one being consumed.
+
+        :return: generator of PersonRecord.
+        """
+        record_class('PersonRecord', fields)
+        return compact_persons(self.iter_persons(page_size=page_size, prefetch=prefetch), fields)
+
+    def load_persons_batch(self, fields: tuple = DEFAULT_PERSON_FIELDS, page_size: int = DEFAULT_PAGE_SIZE,
+                           prefetch: int = 0) -> ColumnBatch:
+        """
+        Loads every contact of the company column by column, the most compact form to scan or dedupe a whole account.
+
+        :param tuple fields: fields kept, one column per field.
+        :param int page_size: The number of contacts requested per page.
+        :param int prefetch: Number of pages fetched in background ahead of the one being consumed.
+
+        :return: ColumnBatch with the contacts, its items are converted to dictionaries on access.
+        """
+        batch = ColumnBatch(fields)
+        for record in self.iter_person_records(fields, page_size=page_size, prefetch=prefetch):
+            batch.append(record)
+        return batch
 
     def update_person(self, id: int, person: dict) -> dict:
         """
-        Class that updates some contact by id.
+        Updates some contact by id.
+
+        The URL is resolved from the 'person' template for the call, so concurrent updates from the same instance do
+        not interfere.
 
         :param id: ID of contact that will be updated.
         :param person: Dictionary with updated contact information.
         :type id: int
         :type person: dict
 
-        :return: The content of the POST response as dictionary.
+        :return: The content of the PUT response as dictionary.
         """
-        put_url = f'{PERSONS}{id}'
-        self.api_source["endpoints"][UPDATE_KEY] = put_url
-
         params = {'api_token': self.token}
-        headers = {'content-type': 'application/json'}
 
         try:
-            content = self.post(endpoint_key=UPDATE_KEY, params=params, headers=headers, data=person)["response"]
+            content = _check_content(self.put('person', params=params, path_params={'id': id}, json=person)["response"])
+        except Exception as e:
+            logger.error(f'Failed update contact with id:{id} and params:{params}. Error: {str(e)}.')
+            raise
+
+        return content
+
+    def bulk_update_persons(self, updates, max_workers: int = DEFAULT_BULK_WORKERS) -> dict:
+        """
+        Updates many contacts, making up to max_workers requests at the same time.
+
+        :param updates: iterable of (id, person) tuples, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight, it should not exceed the pool_maxsize.
+
+        :return: Dictionary with the "updated" list of ids and the "failed" dictionary mapping each id that
+         could not be updated to its error message.
+        """
+        summary = {"updated": [], "failed": {}}
+        for result in run_bulk(lambda update: self.update_person(*update), updates, max_workers):
+            id = result.item[0]
+            if result.ok:
+                summary["updated"].append(id)
+            else:
+                summary["failed"][id] = str(result.error)
+
+        logger.info(f'Bulk update finished: {len(summary["updated"])} contacts updated,'
+                    f' {len(summary["failed"])} failed.')
+        return summary
+
+
+class AsyncPipedrive(AsyncAPI):
+    """
+    Asyncio counterpart of Pipedrive, responsible for all interactions with the Pipedrive API.
+    """
+
+    def __init__(self, token: str = None, domain_ttl: float = DEFAULT_DOMAIN_TTL, **kwargs) -> None:
+        """
+        :param token:  Pipedrive personal token for request authentication, it may be omitted when a key_pool of
+         tokens is provided, whose first token is then used where a single one is needed, e.g. as the state key.
+        :param domain_ttl: Seconds the 'users/me' result is cached, None caches it until invalidate_domain is called
+         and 0 disables the cache.
+        :param kwargs: connection options forwarded to AsyncAPI, e.g. concurrency and pool_maxsize.
+        """
+
+        self.token = resolve_key(token, kwargs.get('key_pool'))
+        self._users_me = _TTLValue(domain_ttl)
+
+        super(AsyncPipedrive, self).__init__(api_source=_api_source(), **kwargs)
+
+    def _with_key(self, key: str, params: dict, kwargs: dict) -> tuple:
+        return dict(params or {}, api_token=key), kwargs
+
+    async def get_domain(self, refresh: bool = False) -> str:
+        """
+        Gets the company domain the user's token is linked to.
+
+        The 'users/me' result is cached for domain_ttl seconds.
+
+        :param bool refresh: if True, ignores the cached result and requests it again.
+
+        :return: Company domain.
+        """
+        users_me = None if refresh else self._users_me.get()
+
+        if users_me is None:
+            try:
+                params = {
+                    'api_token': self.token
+                }
+                content = (await self.get(endpoint_key='users_me', params=params))["response"]
+                users_me = _check_content(content)["data"]
+                self._users_me.set(users_me)
+
+            except Exception as e:
+                logger.error(f'Failed to get company domain with provided api token. Error: {str(e)}.')
+                raise
+
+        return users_me["company_domain"]
+
+    def invalidate_domain(self) -> None:
+        """
+        Discards the cached 'users/me' result, the next get_domain call requests it again.
+        """
+        self._users_me.invalidate()
+
+    async def get_persons(self, start: int = None, limit: int = None) -> list or None:
+        """
+        Gets the contacts a company has in Pipedrive using the 'people' Pipedrive API endpoint.
+
+        :param start: Pagination start, the default value is 0. Check Pipedrive API pagination documentation
+        for more information.
+        :param limit: The number of contacts per page, if not provided, 100 items will be returned.
+
+        :return: List of Pipedrive contacts formatted as dictionaries and next page number,
+         if there are no more contacts None will be returned as next page.
+        """
+        params = _persons_params(self.token, start, limit)
+
+        try:
+            content = _check_content((await self.get(endpoint_key='persons', params=params))["response"])
+        except Exception as e:
+            logger.error(f'Failed to get company contacts with the params {params}. Error: {str(e)}.')
+            raise
+
+        data, next_start = _parse_persons(content, start)
 
-            if content["success"] is False:
-                msg = f'{content["error"]}! {content["error_info"]}'
-                raise Exception(msg)
+        # the company domain is only needed by the log line, so it is not resolved when the line is not emitted
+        if logger.isEnabledFor(_persons_log_level(data)):
+            _log_persons(data, await self.get_domain())
 
+        return data, next_start
+
+    async def update_person(self, id: int, person: dict) -> dict:
+        """
+        Updates some contact by id.
+
+        :param id: ID of contact that will be updated.
+        :param person: Dictionary with updated contact information.
+        :type id: int
+        :type person: dict
+
+        :return: The content of the PUT response as dictionary.
+        """
+        params = {'api_token': self.token}
+
+        try:
+            content = _check_content((await self.put('person', params=params, path_params={'id': id},
+                                                     json=person))["response"])
         except Exception as e:
-            logger.error(f'Failed update contact with id:{id}, params:{params} and headers:{headers}. Error: {str(e)}.')
+            logger.error(f'Failed update contact with id:{id} and params:{params}. Error: {str(e)}.')
             raise
 
         return content
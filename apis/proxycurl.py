@@ -1,6 +1,10 @@
 import logging
 
-from apis.api import API
+from apis.api import API, RequestStats, SUCCESS_HTTP_CODES
+from apis.async_api import AsyncAPI
+from apis.bulk import run_bulk, run_bulk_async, DEFAULT_BULK_WORKERS
+from apis.jobs import CheckpointedJob
+from apis.keypool import resolve_key
 
 logger = logging.getLogger('APIs.Proxycurl')
 
@@ -9,36 +13,65 @@ DATA_FROM_PROFILE = '/proxycurl/api/v2/linkedin'
 URL_FROM_EMAIL = '/proxycurl/api/linkedin/profile/resolve/email'
 
 
+def _check_response(item: str, response: dict, stats: RequestStats) -> dict:
+    """
+    Raises if a Proxycurl lookup did not succeed, so bulk operations report it as a failed item.
+
+    :param str item: profile URL or work email looked up.
+    :param dict response: response returned by the lookup.
+    :param RequestStats stats: statistics of the lookup call.
+
+    :return: the same response when the lookup was successful.
+    """
+    if stats.status_code not in SUCCESS_HTTP_CODES:
+        raise Exception(f'Proxycurl lookup of "{item}" failed -> ({stats.status_code}) {response}')
+    return response
+
+
+def _api_source() -> dict:
+    """
+    :return: api_source dict shared by the sync and async Proxycurl clients.
+    """
+    return {
+        "endpoints": {
+            "base_url": BASE_URL,
+            "data_from_profile": DATA_FROM_PROFILE,
+            "url_from_email": URL_FROM_EMAIL
+        }
+    }
+
+
 class Proxycurl(API):
     """
     Class responsible for all interactions with the Proxycurl API for LinkedIn.
     """
 
-    def __init__(self, api_key: str) -> None:
-        self.api_key = api_key
+    def __init__(self, api_key: str = None, **kwargs) -> None:
+        """
+        :param api_key: Proxycurl API key for request authentication, it may be omitted when a key_pool of API keys
+         is provided.
+        :param kwargs: connection options forwarded to API, e.g. pool_maxsize and keep_alive.
+        """
+        self.api_key = resolve_key(api_key, kwargs.get('key_pool'))
 
-        api_source = {
-            "endpoints": {
-                "base_url": BASE_URL,
-                "data_from_profile": DATA_FROM_PROFILE,
-                "url_from_email": URL_FROM_EMAIL
-            }
-        }
+        super(Proxycurl, self).__init__(api_source=_api_source(), **kwargs)
 
-        super(Proxycurl, self).__init__(api_source=api_source)
+    def _with_key(self, key: str, params: dict, kwargs: dict) -> tuple:
+        return params, dict(kwargs, headers=dict(kwargs.get('headers') or {}, Authorization='Bearer ' + key))
 
-    def get_linkedin_profile(self, profile_url: str) -> dict:
+    def get_linkedin_profile(self, profile_url: str, stats: RequestStats = None) -> dict:
         """
         Gets data from a LinkedIn profile.
 
         :param str profile_url: URL that defines the profile where the data will be extracted.
+        :param RequestStats stats: statistics of the call, filled by the request.
         :return: Dictionary with the data extracted from user profile.
         """
         params = {'url': profile_url}
         header = {'Authorization': 'Bearer ' + self.api_key}
 
         try:
-            response = self.get("data_from_profile", params=params, headers=header)
+            response = self.get("data_from_profile", params=params, headers=header, stats=stats)
         except Exception as e:
             logger.error(f"Failed to get data from url with params ({str(params)}) and headers ({str(header)})."
                          f" Error: {str(e)}")
@@ -46,21 +79,170 @@ class Proxycurl(API):
 
         return response
 
-    def get_url_from_work_email(self, work_email: str) -> dict:
+    def get_url_from_work_email(self, work_email: str, stats: RequestStats = None) -> dict:
         """
         Gets user's profile URl searching it by the user work email.
 
         :param str work_email: User's work email.
+        :param RequestStats stats: statistics of the call, filled by the request.
         :return: Dictionary with user's LinkedIn profile URL.
         """
         params = {'work_email': work_email}
         header = {'Authorization': 'Bearer ' + self.api_key}
 
         try:
-            response = self.get("data_from_profile", params=params, headers=header)
+            response = self.get("url_from_email", params=params, headers=header, stats=stats)
         except Exception as e:
             logger.error(f"Failed to get data from url with params ({str(params)}) and headers ({str(header)})."
                          f" Error: {str(e)}")
             raise
 
         return response
+
+    def _checked_lookup(self, lookup, item: str) -> dict:
+        stats = RequestStats()
+        return _check_response(item, lookup(item, stats=stats), stats)
+
+    def bulk_get_linkedin_profiles(self, profile_urls, max_workers: int = DEFAULT_BULK_WORKERS):
+        """
+        Gets data from many LinkedIn profiles, making up to max_workers requests at the same time.
+
+        :param profile_urls: iterable with the profile URLs, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight, it should not exceed the pool_maxsize.
+
+        :return: generator of BulkResult in completion order, each one with the profile URL as item and the
+         get_linkedin_profile response as value, or the error if the lookup failed.
+        """
+        return run_bulk(lambda url: self._checked_lookup(self.get_linkedin_profile, url), profile_urls, max_workers)
+
+    def bulk_resolve_emails(self, work_emails, max_workers: int = DEFAULT_BULK_WORKERS):
+        """
+        Gets the LinkedIn profile URL of many work emails, making up to max_workers requests at the same time.
+
+        :param work_emails: iterable with the work emails, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight, it should not exceed the pool_maxsize.
+
+        :return: generator of BulkResult in completion order, each one with the work email as item and the
+         get_url_from_work_email response as value, or the error if the lookup failed.
+        """
+        return run_bulk(lambda email: self._checked_lookup(self.get_url_from_work_email, email), work_emails,
+                        max_workers)
+
+    def checkpointed_get_linkedin_profiles(self, job: CheckpointedJob, profile_urls,
+                                           max_workers: int = DEFAULT_BULK_WORKERS) -> dict:
+        """
+        Gets data from many LinkedIn profiles in a resumable job, the profiles completed by a previous run of the job
+        are not requested again.
+
+        :param CheckpointedJob job: job storing the get_linkedin_profile responses by profile URL.
+        :param profile_urls: iterable with the profile URLs, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight, it should not exceed the pool_maxsize.
+
+        :return: dict with the number of "processed", "skipped" and "failed" profiles, see CheckpointedJob.run.
+        """
+        return job.run(lambda url: self._checked_lookup(self.get_linkedin_profile, url), profile_urls,
+                       max_workers=max_workers)
+
+    def checkpointed_resolve_emails(self, job: CheckpointedJob, work_emails,
+                                    max_workers: int = DEFAULT_BULK_WORKERS) -> dict:
+        """
+        Gets the LinkedIn profile URL of many work emails in a resumable job, the emails completed by a previous run
+        of the job are not requested again.
+
+        :param CheckpointedJob job: job storing the get_url_from_work_email responses by work email.
+        :param work_emails: iterable with the work emails, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight, it should not exceed the pool_maxsize.
+
+        :return: dict with the number of "processed", "skipped" and "failed" emails, see CheckpointedJob.run.
+        """
+        return job.run(lambda email: self._checked_lookup(self.get_url_from_work_email, email), work_emails,
+                       max_workers=max_workers)
+
+
+class AsyncProxycurl(AsyncAPI):
+    """
+    Asyncio counterpart of Proxycurl, responsible for all interactions with the Proxycurl API for LinkedIn.
+    """
+
+    def __init__(self, api_key: str = None, **kwargs) -> None:
+        """
+        :param api_key: Proxycurl API key for request authentication, it may be omitted when a key_pool of API keys
+         is provided.
+        :param kwargs: connection options forwarded to AsyncAPI, e.g. concurrency and pool_maxsize.
+        """
+        self.api_key = resolve_key(api_key, kwargs.get('key_pool'))
+
+        super(AsyncProxycurl, self).__init__(api_source=_api_source(), **kwargs)
+
+    def _with_key(self, key: str, params: dict, kwargs: dict) -> tuple:
+        return params, dict(kwargs, headers=dict(kwargs.get('headers') or {}, Authorization='Bearer ' + key))
+
+    async def get_linkedin_profile(self, profile_url: str, stats: RequestStats = None) -> dict:
+        """
+        Gets data from a LinkedIn profile.
+
+        :param str profile_url: URL that defines the profile where the data will be extracted.
+        :param RequestStats stats: statistics of the call, filled by the request.
+        :return: Dictionary with the data extracted from user profile.
+        """
+        params = {'url': profile_url}
+        header = {'Authorization': 'Bearer ' + self.api_key}
+
+        try:
+            response = await self.get("data_from_profile", params=params, headers=header, stats=stats)
+        except Exception as e:
+            logger.error(f"Failed to get data from url with params ({str(params)}) and headers ({str(header)})."
+                         f" Error: {str(e)}")
+            raise
+
+        return response
+
+    async def get_url_from_work_email(self, work_email: str, stats: RequestStats = None) -> dict:
+        """
+        Gets user's profile URl searching it by the user work email.
+
+        :param str work_email: User's work email.
+        :param RequestStats stats: statistics of the call, filled by the request.
+        :return: Dictionary with user's LinkedIn profile URL.
+        """
+        params = {'work_email': work_email}
+        header = {'Authorization': 'Bearer ' + self.api_key}
+
+        try:
+            response = await self.get("url_from_email", params=params, headers=header, stats=stats)
+        except Exception as e:
+            logger.error(f"Failed to get data from url with params ({str(params)}) and headers ({str(header)})."
+                         f" Error: {str(e)}")
+            raise
+
+        return response
+
+    async def _checked_lookup(self, lookup, item: str) -> dict:
+        stats = RequestStats()
+        return _check_response(item, await lookup(item, stats=stats), stats)
+
+    def bulk_get_linkedin_profiles(self, profile_urls, max_workers: int = DEFAULT_BULK_WORKERS):
+        """
+        Gets data from many LinkedIn profiles, awaiting up to max_workers requests at the same time.
+
+        :param profile_urls: iterable with the profile URLs, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight.
+
+        :return: async generator of BulkResult in completion order, each one with the profile URL as item and the
+         get_linkedin_profile response as value, or the error if the lookup failed.
+        """
+        return run_bulk_async(lambda url: self._checked_lookup(self.get_linkedin_profile, url), profile_urls,
+                              max_workers)
+
+    def bulk_resolve_emails(self, work_emails, max_workers: int = DEFAULT_BULK_WORKERS):
+        """
+        Gets the LinkedIn profile URL of many work emails, awaiting up to max_workers requests at the same time.
+
+        :param work_emails: iterable with the work emails, it may be a stream of any length.
+        :param int max_workers: maximum number of requests in flight.
+
+        :return: async generator of BulkResult in completion order, each one with the work email as item and the
+         get_url_from_work_email response as value, or the error if the lookup failed.
+        """
+        return run_bulk_async(lambda email: self._checked_lookup(self.get_url_from_work_email, email), work_emails,
+                              max_workers)
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger('APIs.RateLimit')
+
+REMAINING_HEADER = 'X-RateLimit-Remaining'
+RESET_HEADER = 'X-RateLimit-Reset'
+
+
+class TokenBucket:
+    """
+    Class responsible for pacing requests with a token bucket.
+
+    The bucket holds up to capacity tokens and is refilled at rate tokens per second, each request takes one token.
+    Acquiring reserves the token right away and waits for it outside the lock, so waiting requests are served in
+    arrival order and the bucket can be shared by threads and asyncio tasks alike.
+    """
+
+    # buckets shared by key, the keys are stored hashed so the registry never holds raw credentials
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate: float, capacity: int = None, adaptive: bool = True) -> None:
+        """
+        :param float rate: tokens added per second, i.e. the sustained requests per second.
+        :param int capacity: maximum number of tokens, i.e. the burst size. Defaults to one second of requests.
+        :param bool adaptive: if True, the X-RateLimit-Remaining and X-RateLimit-Reset response headers
+            lower the available tokens when the API reports less quota than the bucket.
+        """
+        if not rate > 0:
+            raise ValueError("rate must be a number greater than 0.")
+        capacity = max(1, int(rate)) if capacity is None else capacity
+        if not capacity > 0:
+            raise ValueError("capacity must be a integer greater than 0.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self.adaptive = adaptive
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key: str, rate: float, capacity: int = None, adaptive: bool = True) -> 'TokenBucket':
+        """
+        Gets the bucket shared by every instance using the same key, e.g. the same API token.
+
+        :param str key: key identifying the quota.
+        :param float rate: tokens added per second, only used when the bucket is created.
+        :param int capacity: maximum number of tokens, only used when the bucket is created.
+        :param bool adaptive: if True, response headers lower the available tokens.
+
+        :return: the TokenBucket of the key.
+        """
+        digest = _hash_key(key)
+        with cls._shared_lock:
+            if digest not in cls._shared:
+                cls._shared[digest] = cls(rate, capacity, adaptive)
+            return cls._shared[digest]
+
+    @classmethod
+    def release_shared(cls, key: str) -> None:
+        """
+        Removes the bucket shared by the key, the next shared call with the same key creates a new one.
+
+        :param str key: key identifying the quota.
+        """
+        with cls._shared_lock:
+            cls._shared.pop(_hash_key(key), None)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self, tokens: int = 1) -> float:
+        """
+        Takes tokens from the bucket, even if they are not available yet.
+
+        :param int tokens: number of tokens to take.
+
+        :return: seconds to wait until the reserved tokens are available.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, tokens: int = 1) -> None:
+        """
+        Takes tokens from the bucket, blocking the thread until they are available.
+
+        :param int tokens: number of tokens to take.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int = 1) -> None:
+        """
+        Takes tokens from the bucket, suspending the task until they are available.
+
+        :param int tokens: number of tokens to take.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def update_from_headers(self, headers) -> None:
+        """
+        Lowers the available tokens to the quota reported by the API. When the quota is exhausted, the next tokens
+        are only available after the reset time reported by the API.
+
+        :param headers: response headers.
+        """
+        if not self.adaptive or headers is None:
+            return
+        try:
+            remaining = headers.get(REMAINING_HEADER)
+            if remaining is None:
+                return
+            remaining = float(remaining)
+            reset = float(headers.get(RESET_HEADER) or 0)
+        except ValueError:
+            return
+
+        with self._lock:
+            self._refill()
+            if remaining <= 0 and reset > 0:
+                # offset by the token the next request reserves, so that request waits exactly until the reset
+                self._tokens = min(self._tokens, 1 - reset * self.rate)
+                logger.warning(f'API rate limit exhausted, pausing requests for {reset}s')
+            else:
+                self._tokens = min(self._tokens, remaining)
+
+    @property
+    def available(self) -> float:
+        """
+        :return: tokens currently available, negative when requests are waiting.
+        """
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+def _hash_key(key: str) -> str:
+    """
+    :return: SHA-256 hex digest of the key.
+    """
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
@@ -0,0 +1,97 @@
+import sys
+
+_record_classes = {}
+
+
+class Record:
+    """
+    Class responsible for holding a selected set of fields of an API item in __slots__, instead of the full dict.
+
+    Subclasses are built by record_class, one per field set.
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, *values) -> None:
+        for field, value in zip(self.fields, values):
+            setattr(self, field, value)
+
+    def to_dict(self) -> dict:
+        """
+        :return: dict with the fields of the record, built on each call.
+        """
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __eq__(self, other) -> bool:
+        return (type(other) is type(self) and
+                all(getattr(self, field) == getattr(other, field) for field in self.fields))
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.fields)
+        return f'{type(self).__name__}({values})'
+
+
+def record_class(name: str, fields: tuple) -> type:
+    """
+    :param str name: name of the class, e.g. "PersonRecord".
+    :param tuple fields: names of the fields kept by the records.
+
+    :return: the Record subclass with the fields as __slots__, the same class is returned for the same arguments.
+    """
+    fields = tuple(fields)
+    if not fields or len(set(fields)) != len(fields) or not all(field.isidentifier() for field in fields):
+        raise ValueError("fields must be a non empty tuple of unique identifiers.")
+    key = (name, fields)
+    cls = _record_classes.get(key)
+    if cls is None:
+        cls = _record_classes[key] = type(name, (Record,), {'__slots__': fields, 'fields': fields})
+    return cls
+
+
+def intern_value(value):
+    """
+    :return: the value, interned if it is a str, so equal strings repeated across many records are stored once.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class ColumnBatch:
+    """
+    Class responsible for holding many items column by column, one list per field, which is more compact than a
+    record per item when the items are only scanned or aggregated.
+    """
+
+    def __init__(self, fields: tuple) -> None:
+        """
+        :param tuple fields: names of the columns.
+        """
+        self.fields = tuple(fields)
+        self.columns = {field: [] for field in self.fields}
+
+    def append(self, values) -> None:
+        """
+        :param values: values of one item, in the order of the fields, e.g. a Record.
+        """
+        if isinstance(values, Record):
+            values = [getattr(values, field) for field in self.fields]
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+
+    def column(self, field: str) -> list:
+        return self.columns[field]
+
+    def __len__(self) -> int:
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+    def __getitem__(self, index: int) -> dict:
+        """
+        :return: dict with the fields of the item at index, built on each call.
+        """
+        return {field: column[index] for field, column in self.columns.items()}
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def to_dicts(self) -> list:
+        return list(self)
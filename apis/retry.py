@@ -0,0 +1,110 @@
+import email.utils
+import random
+import time
+
+import requests
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'get', 'head', 'put', 'delete', 'options'})
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_CAP = 30
+DEFAULT_RETRY_AFTER_CAP = 120
+
+
+class RetryPolicy:
+    """
+    Class responsible for deciding if and when a failed request is retried.
+
+    Idempotent requests (GET, HEAD, PUT, DELETE) are retried on any retryable status code, timeout or connection
+    error. Non idempotent requests (POST, PATCH) are only retried when the API surely did not process them: a 429
+    response or a timeout while connecting. The delay between attempts is an exponential backoff with full jitter,
+    unless the API sends a Retry-After header.
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_cap: float = DEFAULT_BACKOFF_CAP, retry_statuses: frozenset = RETRYABLE_STATUS_CODES,
+                 respect_retry_after: bool = True, retry_after_cap: float = DEFAULT_RETRY_AFTER_CAP,
+                 retry_non_idempotent: bool = False) -> None:
+        """
+        :param int max_attempts: maximum number of attempts of a request, including the first one.
+        :param float backoff_base: delay in seconds of the first retry, doubled on each following one.
+        :param float backoff_cap: maximum backoff delay in seconds.
+        :param frozenset retry_statuses: response status codes that trigger a retry.
+        :param bool respect_retry_after: if True, the Retry-After header replaces the backoff delay.
+        :param float retry_after_cap: maximum delay in seconds taken from a Retry-After header.
+        :param bool retry_non_idempotent: if True, POST and PATCH requests are retried as idempotent ones.
+        """
+        if not max_attempts > 0:
+            raise ValueError("max_attempts must be a integer greater than 0.")
+        if not backoff_base >= 0 or not backoff_cap >= 0:
+            raise ValueError("backoff_base and backoff_cap must be numbers equal or greater than 0.")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.retry_after_cap = retry_after_cap
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def _is_idempotent(self, method: str) -> bool:
+        return self.retry_non_idempotent or method.lower() in IDEMPOTENT_METHODS
+
+    def should_retry_status(self, method: str, status_code: int, attempt: int) -> bool:
+        """
+        :param str method: HTTP method of the request.
+        :param int status_code: status code of the response.
+        :param int attempt: number of the attempt that returned the response, starting at 1.
+
+        :return: True if the request must be retried.
+        """
+        if attempt >= self.max_attempts or status_code not in self.retry_statuses:
+            return False
+        return status_code == 429 or self._is_idempotent(method)
+
+    def should_retry_exception(self, method: str, exception: Exception, attempt: int) -> bool:
+        """
+        :param str method: HTTP method of the request.
+        :param Exception exception: exception raised by the request.
+        :param int attempt: number of the attempt that raised the exception, starting at 1.
+
+        :return: True if the request must be retried.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(exception, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return self._is_idempotent(method)
+        return False
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        """
+        :param int attempt: number of the attempt that failed, starting at 1.
+        :param str retry_after: value of the Retry-After response header, in seconds or as an HTTP date.
+
+        :return: seconds to wait before the next attempt.
+        """
+        if self.respect_retry_after and retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.retry_after_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+
+def parse_retry_after(retry_after: str) -> float or None:
+    """
+    :param str retry_after: value of the Retry-After header.
+
+    :return: seconds to wait or None if the value is invalid.
+    """
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import threading
+
+
+def flight_key(url: str, params: dict = None, headers: dict = None) -> str:
+    """
+    Builds the key identifying identical requests. Unlike the cache key, the credentials in the headers are part of it,
+    so callers never receive a response requested with someone else's credentials.
+
+    :param str url: requested url.
+    :param dict params: dictionary with the request parameters.
+    :param dict headers: dictionary with the request headers.
+
+    :return: key of the request.
+    """
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+    return json.dumps([url, params or {}, headers], sort_keys=True, default=str)
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Class responsible for coalescing identical calls made by concurrent threads: the first caller of a key runs the
+    function and the ones arriving while it runs wait for it and receive the same value, or exception.
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func) -> tuple:
+        """
+        :param str key: key identifying the call, e.g. built by flight_key.
+        :param func: callable without arguments making the call.
+
+        :return: the value returned by func and True if it was shared with a call already in flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    def in_flight(self) -> int:
+        """
+        :return: number of keys being called.
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of SingleFlight, coalescing identical calls made by concurrent tasks of the same event loop.
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+
+    async def do(self, key: str, func) -> tuple:
+        """
+        :param str key: key identifying the call, e.g. built by flight_key.
+        :param func: coroutine function without arguments making the call.
+
+        :return: the value returned by func and True if it was shared with a call already in flight.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # a waiter being cancelled must not cancel the call shared with the others
+            return await asyncio.shield(future), True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # marks the exception as retrieved, there may be no other waiter
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        """
+        :return: number of keys being called.
+        """
+        return len(self._calls)
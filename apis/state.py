@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import threading
+
+
+class StateStore:
+    """
+    Class responsible for persisting small pieces of state, e.g. sync cursors, in a local JSON file.
+
+    Every change rewrites the file atomically, so a crash leaves either the previous or the new state on disk.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param str path: path of the JSON file, it is created on the first change.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as file:
+                self._state = json.load(file)
+        except FileNotFoundError:
+            self._state = {}
+
+    def get(self, key: str, default=None):
+        """
+        :param str key: key of the value.
+        :param default: value returned when the key is not stored.
+
+        :return: the stored value.
+        """
+        with self._lock:
+            return self._state.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        """
+        :param str key: key of the value.
+        :param value: JSON serializable value.
+        """
+        with self._lock:
+            self._write(dict(self._state, **{key: value}))
+
+    def delete(self, key: str) -> None:
+        """
+        :param str key: key of the value, nothing is written when it is not stored.
+        """
+        with self._lock:
+            if key in self._state:
+                state = dict(self._state)
+                del state[key]
+                self._write(state)
+
+    def _write(self, state: dict) -> None:
+        """
+        Replaces the file with the given state, which becomes the current one only if it is written.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.state-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(state, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._state = state
@@ -0,0 +1,224 @@
+import codecs
+import json
+import logging
+import re
+
+logger = logging.getLogger('APIs.Stream')
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'\s*')
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[\s,\]}]')
+
+
+class _JSONReader:
+    """
+    Class responsible for scanning a JSON document received in chunks.
+
+    Only the text of the value being read is kept in memory, values that are skipped are discarded as they are scanned.
+    """
+
+    def __init__(self, chunks, loads=json.loads) -> None:
+        """
+        :param chunks: iterable of bytes chunks with the UTF-8 encoded document.
+        :param loads: function decoding the text of a value.
+        """
+        self._chunks = iter(chunks)
+        self._loads = loads
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        # start of the value being read, the buffer is kept from it while the value is scanned
+        self._mark = None
+
+    def _fill(self) -> bool:
+        """
+        Discards the consumed text and appends the next chunk to the buffer.
+
+        :return: False if the document has ended.
+        """
+        keep = self._pos if self._mark is None else self._mark
+        self._buffer = self._buffer[keep:]
+        self._pos -= keep
+        if self._mark is not None:
+            self._mark = 0
+
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        text = self._decoder.decode(b'', final=True)
+        self._buffer += text
+        return bool(text)
+
+    def peek(self) -> str:
+        """
+        :return: the next character that is not a whitespace, without consuming it.
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of the JSON document.")
+
+    def consume(self, char: str) -> bool:
+        """
+        :return: True if the next character is char, which is then consumed.
+        """
+        if self.peek() != char:
+            return False
+        self._pos += 1
+        return True
+
+    def expect(self, char: str) -> None:
+        if not self.consume(char):
+            raise ValueError(f'Invalid JSON document, expected "{char}" but found "{self.peek()}".')
+
+    def _skip_string(self) -> None:
+        self._pos += 1
+        while True:
+            match = _STRING_END.search(self._buffer, self._pos)
+            if match is None or (match.group() == '\\' and match.end() >= len(self._buffer)):
+                # the string, or the escape sequence, continues in the next chunk
+                self._pos = len(self._buffer) if match is None else match.start()
+                if not self._fill():
+                    raise ValueError("Unexpected end of the JSON document.")
+            elif match.group() == '"':
+                self._pos = match.end()
+                return
+            else:
+                self._pos = match.end() + 1
+
+    def skip(self) -> None:
+        """
+        Consumes the next value.
+        """
+        char = self.peek()
+        if char == '"':
+            self._skip_string()
+            return
+        if char not in '{[':
+            while True:
+                match = _SCALAR_END.search(self._buffer, self._pos)
+                if match is not None:
+                    self._pos = match.start()
+                    return
+                self._pos = len(self._buffer)
+                if not self._fill():
+                    return
+
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._fill():
+                    raise ValueError("Unexpected end of the JSON document.")
+                continue
+            self._pos = match.start()
+            if match.group() == '"':
+                self._skip_string()
+                continue
+            self._pos += 1
+            depth += 1 if match.group() in '{[' else -1
+            if depth == 0:
+                return
+
+    def read(self):
+        """
+        Consumes and decodes the next value.
+
+        :return: the decoded value.
+        """
+        self.peek()
+        self._mark = self._pos
+        try:
+            self.skip()
+            return self._loads(self._buffer[self._mark:self._pos])
+        finally:
+            self._mark = None
+
+
+def _walk(reader: _JSONReader, segments: list):
+    """
+    Consumes the next value, yielding the values found in the path defined by segments.
+    """
+    if reader.peek() == 'n':
+        # null, e.g. the "data" of an empty Pipedrive page
+        reader.skip()
+        return
+
+    segment, segments = segments[0], segments[1:]
+    if segment == '*':
+        reader.expect('[')
+        if reader.consume(']'):
+            return
+        while True:
+            if segments:
+                yield from _walk(reader, segments)
+            else:
+                yield reader.read()
+            if reader.consume(']'):
+                return
+            reader.expect(',')
+
+    reader.expect('{')
+    if reader.consume('}'):
+        return
+    while True:
+        key = reader.read()
+        reader.expect(':')
+        if key != segment:
+            reader.skip()
+        elif segments:
+            yield from _walk(reader, segments)
+        else:
+            yield reader.read()
+        if reader.consume('}'):
+            return
+        reader.expect(',')
+
+
+def iter_json_items(chunks, path: str = '*', loads=json.loads):
+    """
+    Decodes a JSON document received in chunks, yielding the values found in path as soon as each one is complete.
+
+    The path is a sequence of keys separated by dots, where "*" stands for every item of an array, e.g. "data.*"
+    yields the items of the "data" array. Only one item is held in memory at a time. Null values along the path yield
+    nothing.
+
+    :param chunks: iterable of bytes chunks with the UTF-8 encoded document.
+    :param str path: path of the values to be yielded.
+    :param loads: function decoding the text of each value, e.g. the loads of a JSONCodec.
+
+    :return: generator of the decoded values.
+    """
+    if not path:
+        raise ValueError("path must be a non empty string.")
+    return _walk(_JSONReader(chunks, loads), path.split('.'))
+
+
+def iter_response(response, path: str or bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE, loads=json.loads):
+    """
+    Reads the body of a streamed requests response, closing the response once the body is consumed or the generator
+    is closed.
+
+    :param requests.Response response: response of a request made with stream=True.
+    :param path: True to yield the raw bytes chunks, or the path of the JSON values to be yielded, see iter_json_items.
+    :param int chunk_size: maximum number of bytes read at a time.
+    :param loads: function decoding the text of each value.
+
+    :return: generator of bytes chunks or decoded values.
+    """
+    try:
+        chunks = response.iter_content(chunk_size=chunk_size)
+        if path is True:
+            yield from chunks
+        else:
+            yield from iter_json_items(chunks, path, loads)
+    finally:
+        response.close()
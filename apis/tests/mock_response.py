@@ -1,13 +1,23 @@
+import datetime
+import json
+
+from requests import PreparedRequest
 from requests.exceptions import JSONDecodeError
 
 
 class MockResponse:
     """Class responsible for simulating a response to request.get method"""
 
-    def __init__(self, data, status_code, reason=""):
+    def __init__(self, data, status_code, reason="", headers=None):
         self.data = data
         self.status_code = status_code
         self.reason = reason
+        self.headers = headers or {}
+        self.elapsed = datetime.timedelta(0)
+        self.request = PreparedRequest()
+
+    def close(self):
+        pass
 
     def json(self):
         if self.data == "Non JSON response":
@@ -15,5 +25,8 @@ class MockResponse:
         else:
             return self.data
 
+    @property
     def content(self):
-        return bytes(self.data, 'utf-8')
+        if isinstance(self.data, str):
+            return bytes(self.data, 'utf-8')
+        return json.dumps(self.data).encode('utf-8')
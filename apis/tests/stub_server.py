@@ -0,0 +1,100 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+
+class StubServer:
+    """Class responsible for serving canned responses from a local HTTP server running in a thread"""
+
+    def __init__(self, routes: dict = None):
+        """
+        :param dict routes: maps a path to a (status, body) tuple or to a callable receiving
+            (method, query, body) and returning a (status, body) or (status, body, headers) tuple.
+        """
+        self.routes = routes or {}
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super(Handler, self).setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def _respond(self):
+                parsed = urlparse(self.path)
+                query = dict(parse_qsl(parsed.query))
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                with stub._lock:
+                    stub.requests.append((self.command, parsed.path, query))
+
+                route = stub.routes.get(parsed.path, (404, {"error": "Not found"}))
+                result = route(self.command, query, body) if callable(route) else route
+                status, payload = result[0], result[1]
+                headers = result[2] if len(result) > 2 else {}
+
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode('utf-8')
+                elif isinstance(payload, str):
+                    payload = payload.encode('utf-8')
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _respond
+
+        return Handler
+
+
+def paginated_persons_route(persons: list, max_limit: int = None):
+    """
+    Builds a route serving the contacts as the offset pages of the Pipedrive 'persons' endpoint.
+
+    :param list persons: contacts served, the list is read on every request, so changes to it are served.
+    :param int max_limit: largest limit served, a bigger requested limit is lowered as the server does.
+
+    :return: callable route for StubServer.
+    """
+    def route(method, query, body):
+        start, limit = int(query['start']), int(query['limit'])
+        if max_limit is not None:
+            limit = min(limit, max_limit)
+        return 200, {"success": True, "data": persons[start:start + limit] or None,
+                     "additional_data": {"pagination": {"more_items_in_collection": start + limit < len(persons),
+                                                        "next_start": start + limit}}}
+
+    return route
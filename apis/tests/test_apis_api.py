@@ -1,10 +1,22 @@
+import gc
+import json
+import threading
+import time
 import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, Mock
 
 import requests.exceptions
 
-from apis.api import API
+from apis.api import API, EndpointTemplates, RequestStats
+from apis.circuitbreaker import CircuitBreaker, CircuitOpenError
+from apis.deadline import Deadline, DeadlineExceeded
+from apis.metrics import RequestHooks, MetricsCollector
+from apis.ratelimit import TokenBucket
+from apis.retry import RetryPolicy
 from apis.tests.mock_response import MockResponse
+from apis.tests.stub_server import StubServer
 
 HEALTHY_API_SOURCE = {
     "endpoints": {
@@ -48,12 +60,31 @@ class TestAPIClass(unittest.TestCase):
         self.assertRaises(KeyError, API, api_source={"endpoints": {"healthcheck": "foo"}})
         self.assertRaises(KeyError, API, api_source={"endpoints": {"base_url": "foo"}}, enforce_healthcheck=True)
 
+    def test_session(self) -> None:
+        """
+        Asserts the API owns a connection-pooled session configured from the constructor.
+        """
+        self.assertRaises(ValueError, API, api_source=HEALTHY_API_SOURCE, pool_maxsize=0)
+        self.assertRaises(ValueError, API, api_source=HEALTHY_API_SOURCE, pool_connections=0)
+
+        api = API(api_source=HEALTHY_API_SOURCE, pool_connections=2, pool_maxsize=20, keep_alive=False)
+        adapter = api.session.get_adapter('https://path')
+        self.assertEqual(20, adapter._pool_maxsize)
+        self.assertEqual(2, adapter._pool_connections)
+        self.assertEqual('close', api.session.headers['Connection'])
+        self.assertIsNot(api.session, API(api_source=HEALTHY_API_SOURCE).session)
+
+        with patch('requests.Session.close') as mock_close:
+            with API(api_source=HEALTHY_API_SOURCE) as api:
+                self.assertIsInstance(api, API)
+            mock_close.assert_called_once()
+
     def test_api_healthcheck(self) -> None:
         """
         Asserts the API health check works correctly
         """
         api = API(api_source=HEALTHY_API_SOURCE, enforce_healthcheck=True)
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             # mocked_requests_get method will return a different responses for different urls and headers
             self.assertEqual(200, api._api_health_check("http://path//healthcheck"))
             self.assertEqual(
@@ -63,14 +94,117 @@ class TestAPIClass(unittest.TestCase):
                 {"error": f"Failed to validate API HealthCheck, please check the logs for more information."},
                 api._api_health_check(""))
 
+    def test_cached_healthcheck(self) -> None:
+        """
+        Asserts the healthcheck result is cached between requests and only an unhealthy API blocks them.
+        """
+        hc_return_error = {"error": f"API healthcheck not OK -> (500) error"}
+
+        api = API(api_source=HEALTHY_API_SOURCE, enforce_healthcheck=True)
+        api._api_health_check = Mock(return_value=200)
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
+            for _ in range(5):
+                self.assertEqual({"response": {"key2": "value2"}}, api.get('data_key'))
+            api._api_health_check.assert_called_once_with("http://path//healthcheck")
+
+            # one failed probe only degrades the status
+            api.health.checked_at = None
+            api._api_health_check.return_value = hc_return_error
+            self.assertEqual({"response": {"key2": "value2"}}, api.get('data_key'))
+            self.assertEqual('degraded', api.health.state)
+
+        no_cache_api = API(api_source=HEALTHY_API_SOURCE, enforce_healthcheck=True, healthcheck_interval=0)
+        no_cache_api._api_health_check = Mock(return_value=200)
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
+            no_cache_api.get('data_key')
+            no_cache_api.get('data_key')
+        self.assertEqual(2, no_cache_api._api_health_check.call_count)
+
+    def test_background_healthcheck(self) -> None:
+        """
+        Asserts the background healthcheck is started with the API and stopped when it is closed.
+        """
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
+            with API(api_source=HEALTHY_API_SOURCE, enforce_healthcheck=True, healthcheck_background=True) as api:
+                self.assertTrue(api._health_monitor.running)
+                self.assertEqual({"response": {"key2": "value2"}}, api.get('data_key'))
+            self.assertFalse(api._health_monitor.running)
+            self.assertEqual('healthy', api.health.state)
+
+        self.assertFalse(API(api_source=HEALTHY_API_SOURCE, healthcheck_background=True)._health_monitor.running)
+
+        # the probe has a timeout and the monitor does not keep an API that was never closed alive
+        with patch('requests.Session.get', side_effect=mocked_requests_get) as mock_get:
+            api = API(api_source=HEALTHY_API_SOURCE, enforce_healthcheck=True, healthcheck_background=True,
+                      healthcheck_interval=0.01, healthcheck_timeout=2)
+            monitor = api._health_monitor
+            api_ref = weakref.ref(api)
+            del api
+            gc.collect()
+            self.assertIsNone(api_ref())
+            monitor._thread.join(5)
+            self.assertFalse(monitor.running)
+        self.assertEqual(2, mock_get.call_args.kwargs['timeout'])
+
+    @patch('apis.api.time.sleep')
+    def test_request_retry(self, mock_sleep) -> None:
+        """
+        Asserts the API _request retries failed requests as defined by the retry policy.
+        """
+        api = API(api_source=HEALTHY_API_SOURCE, retry_policy=RetryPolicy(max_attempts=3))
+        throttled = MockResponse({}, 429, reason='Too Many Requests', headers={'Retry-After': '2'})
+        ok = MockResponse({"key": "value"}, 200)
+
+        stats = RequestStats()
+        with patch('requests.Session.get', side_effect=[throttled, requests.exceptions.ConnectionError(), ok]):
+            self.assertEqual({"response": {"key": "value"}}, api.get('data_key', stats=stats))
+        self.assertEqual(2, stats.retries)
+        self.assertEqual(3, stats.attempts)
+        self.assertEqual(2, mock_sleep.call_args_list[0].args[0])
+
+        with patch('requests.Session.get', side_effect=requests.exceptions.Timeout) as mock_get:
+            self.assertRaises(requests.exceptions.Timeout, api._request, request_type='get', url='http://path')
+        self.assertEqual(3, mock_get.call_count)
+
+        # non idempotent requests are not retried on server errors
+        stats = RequestStats()
+        with patch('requests.Session.post', return_value=MockResponse({}, 503, reason='error')) as mock_post:
+            self.assertEqual({"response": {}}, api._request(request_type='post', url='http://path', stats=stats))
+        self.assertEqual(1, mock_post.call_count)
+        self.assertEqual(0, stats.retries)
+        self.assertNotIn('stats', mock_post.call_args.kwargs)
+
+        # requests are not retried without a policy
+        with patch('requests.Session.get', return_value=throttled) as mock_get:
+            API(api_source=HEALTHY_API_SOURCE)._request(request_type='get', url='http://path')
+        self.assertEqual(1, mock_get.call_count)
+
+    def test_request_rate_limiter(self) -> None:
+        """
+        Asserts every request takes a token from the rate limiter, which adapts to the rate limit headers.
+        """
+        limited = MockResponse({}, 200, headers={'X-RateLimit-Remaining': '3', 'X-RateLimit-Reset': '2'})
+
+        with patch('apis.ratelimit.time.monotonic', return_value=100):
+            bucket = TokenBucket(rate=1000, capacity=10)
+            api = API(api_source=HEALTHY_API_SOURCE, rate_limiter=bucket)
+            with patch('requests.Session.get', side_effect=mocked_requests_get):
+                api.get('data_key')
+                api.get('data_key')
+            self.assertEqual(8, bucket.available)
+
+            with patch('requests.Session.get', return_value=limited):
+                api.get('data_key')
+            self.assertEqual(3, bucket.available)
+
     def test_request_raise_exceptions(self) -> None:
         """
         Asserts the API _request raise exceptions correctly
         """
         api = API(api_source=HEALTHY_API_SOURCE)
-        self.assertRaises(Exception, api._request, request_type='put', url='')
+        self.assertRaises(Exception, api._request, request_type='connect', url='')
         # test get requests cases
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             self.assertRaises(Exception, api._request, request_type='get', url='')
             self.assertRaises(requests.exceptions.Timeout, api._request,
                               request_type='get',
@@ -78,7 +212,7 @@ class TestAPIClass(unittest.TestCase):
                               headers={"header_1": "exception_Timeout"})
 
         # test post requests cases
-        with patch('requests.post', side_effect=mocked_requests_get):
+        with patch('requests.Session.post', side_effect=mocked_requests_get):
             self.assertRaises(Exception, api._request, request_type='post', url='')
             self.assertRaises(requests.exceptions.Timeout, api._request,
                               request_type='post',
@@ -96,7 +230,7 @@ class TestAPIClass(unittest.TestCase):
 
         api = API(api_source=HEALTHY_API_SOURCE)
 
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             self.assertEqual({"response": {"key2": "value2"}},
                              api._request(request_type='get', url='http://path//data'))
             self.assertEqual({"response": {}},
@@ -111,7 +245,7 @@ class TestAPIClass(unittest.TestCase):
             self.assertEqual(hc_return_error,
                              api_hc._request(request_type='get', url='http://path//data'))
 
-        with patch('requests.post', side_effect=mocked_requests_get):
+        with patch('requests.Session.post', side_effect=mocked_requests_get):
             self.assertEqual({"response": {"key2": "value2"}},
                              api._request(request_type='post', url='http://path//data'))
             self.assertEqual({"response": {}},
@@ -151,3 +285,175 @@ class TestAPIClass(unittest.TestCase):
         healthy_api._request.return_value = ok_response
 
         self.assertEqual(ok_response, healthy_api.post('data_key'))
+
+    def test_verbs(self) -> None:
+        """
+        Asserts every verb is dispatched to the resolved endpoint template.
+        """
+        def route(method, query, body):
+            return 200, {"method": method, "body": json.loads(body) if body else None}, {"X-Method": method}
+
+        routes = {"/items/1%2F2": route}
+        with StubServer(routes) as server:
+            with API(api_source={"endpoints": {"base_url": server.url, "item": "/items/{id}"}}) as api:
+                path_params = {"id": "1/2"}
+                self.assertEqual({"method": "PUT", "body": {"a": 1}},
+                                 api.put('item', path_params=path_params, json={"a": 1})["response"])
+                self.assertEqual({"method": "PATCH", "body": {"a": 2}},
+                                 api.patch('item', path_params=path_params, json={"a": 2})["response"])
+                self.assertEqual("DELETE", api.delete('item', path_params=path_params)["response"]["method"])
+                self.assertEqual("HEAD", api.head('item', path_params=path_params)["response"]["X-Method"])
+                self.assertRaises(KeyError, api.patch, 'item')
+
+        self.assertEqual(['PUT', 'PATCH', 'DELETE', 'HEAD'], [method for method, _, _ in server.requests])
+
+
+    def test_stream(self) -> None:
+        """
+        Asserts successful responses are streamed as bytes or JSON items, and errors are returned as usual.
+        """
+        page = {"data": [{"id": id} for id in range(100)], "additional_data": {}}
+        routes = {"/page": (200, page), "/error": (401, {"error": "unauthorized"})}
+        source = {"endpoints": {"base_url": "", "page": "/page", "error": "/error"}}
+        with StubServer(routes) as server:
+            source["endpoints"]["base_url"] = server.url
+            with API(api_source=source) as api:
+                self.assertEqual(page["data"], list(api.get('page', stream='data.*')["response"]))
+                self.assertEqual(page, json.loads(b''.join(api.get('page', stream=True)["response"])))
+                self.assertEqual({"id": 0}, next(api.post('page', stream='data.*')["response"]))
+                self.assertEqual({"response": {"error": "unauthorized"}}, api.get('error', stream='data.*'))
+
+    @patch('apis.api.time.sleep')
+    def test_hooks(self, mock_sleep) -> None:
+        """
+        Asserts the hooks receive the events of every attempt, with the phase durations and sizes.
+        """
+        attempts = []
+
+        def route(method, query, body):
+            attempts.append(method)
+            return (503, {}) if len(attempts) == 1 else (200, {"data": [1, 2, 3]})
+
+        hooks = Mock(spec=RequestHooks)
+        collector = MetricsCollector()
+        with StubServer({"/data": route}) as server:
+            source = {"endpoints": {"base_url": server.url, "data_key": "/data"}}
+            with API(api_source=source, retry_policy=RetryPolicy(), hooks=[hooks, collector]) as api:
+                api.get('data_key')
+                api.post('data_key', json={"a": 1})
+
+        self.assertEqual(['before_request', 'after_response', 'on_retry', 'before_request', 'after_response',
+                          'before_request', 'after_response'], [name for name, _, _ in hooks.method_calls])
+        first, retried, posted = (call.args[0] for call in hooks.after_response.call_args_list)
+        self.assertEqual(('API', 'data_key', 'get', 503, 1), (first.api, first.endpoint_key, first.method,
+                                                              first.status_code, first.attempt))
+        self.assertEqual((200, 2), (retried.status_code, retried.attempt))
+        self.assertGreater(first.connect, 0)
+        self.assertEqual(0, retried.connect)
+        self.assertAlmostEqual(retried.elapsed, retried.connect + retried.ttfb + retried.read)
+        self.assertEqual(len(b'{"data": [1, 2, 3]}'), retried.bytes_in)
+        self.assertEqual(len(b'{"a":1}'), posted.bytes_out)
+        self.assertEqual(1, collector.retries[('API', 'data_key', 'GET')])
+
+        with patch('requests.Session.get', side_effect=requests.exceptions.ConnectionError()):
+            self.assertRaises(requests.exceptions.ConnectionError, API(api_source=HEALTHY_API_SOURCE,
+                                                                       hooks=[hooks]).get, 'data_key')
+        self.assertIsInstance(hooks.on_error.call_args.args[1], requests.exceptions.ConnectionError)
+    def test_single_flight(self) -> None:
+        """
+        Asserts identical GETs made by concurrent threads share one request, and different ones do not.
+        """
+        release = threading.Event()
+
+        def route(method, query, body):
+            release.wait(5)
+            return 200, {"query": query}
+
+        with StubServer({"/data": route}) as server:
+            source = {"endpoints": {"base_url": server.url, "data_key": "/data"}}
+            with API(api_source=source, single_flight=True, pool_maxsize=20) as api:
+                stats = [RequestStats() for _ in range(10)]
+                with ThreadPoolExecutor(max_workers=10) as executor:
+                    futures = [executor.submit(api.get, 'data_key', params={"i": str(i % 2)}, stats=stats[i])
+                               for i in range(10)]
+                    while len(server.requests) < 2:
+                        time.sleep(0.001)
+                    # gives the remaining threads time to join the requests in flight
+                    time.sleep(0.05)
+                    release.set()
+                    responses = [future.result() for future in futures]
+
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual([{"query": {"i": str(i % 2)}} for i in range(10)], [r["response"] for r in responses])
+        self.assertEqual([200] * 10, [s.status_code for s in stats])
+        self.assertEqual(8, sum(s.coalesced for s in stats))
+        self.assertEqual(0, api.single_flight.in_flight())
+
+    def test_circuit_breaker(self) -> None:
+        """
+        Asserts the requests of an endpoint fail fast while its circuit is open, and the hooks see the changes.
+        """
+        hooks = Mock(spec=RequestHooks)
+        breaker = CircuitBreaker(window_size=4, min_calls=4, cooldown=60)
+        routes = {"/data": (503, {"error": "unavailable"}), "/other": (200, {"ok": True})}
+        with StubServer(routes) as server:
+            source = {"endpoints": {"base_url": server.url, "data_key": "/data", "other_key": "/other"}}
+            with API(api_source=source, circuit_breaker=breaker, hooks=[hooks]) as api:
+                for _ in range(4):
+                    api.get('data_key')
+                self.assertRaises(CircuitOpenError, api.get, 'data_key')
+                self.assertEqual({"ok": True}, api.get('other_key')["response"])
+
+        self.assertEqual(5, len(server.requests))
+        event, old_state, new_state = hooks.on_circuit_change.call_args.args
+        self.assertEqual(('data_key', 503, 'closed', 'open'), (event.endpoint_key, event.status_code, old_state,
+                                                               new_state))
+        self.assertIsInstance(hooks.on_error.call_args.args[1], CircuitOpenError)
+
+    @patch('apis.api.time.sleep')
+    def test_timeouts(self, mock_sleep) -> None:
+        """
+        Asserts the instance, endpoint and request timeouts are applied, bounded by the active deadline.
+        """
+        def slow_route(method, query, body):
+            # time.sleep is patched
+            threading.Event().wait(0.3)
+            return 200, {}
+
+        with StubServer({"/slow": slow_route, "/data": (503, {}, {"Retry-After": "1"})}) as server:
+            source = {"endpoints": {"base_url": server.url, "slow_key": "/slow", "data_key": "/data"}}
+            with API(api_source=source, timeouts={"slow_key": (1, 0.05)}) as api:
+                self.assertEqual((10, 60), api.timeout)
+                self.assertRaises(requests.exceptions.Timeout, api.get, 'slow_key')
+                self.assertEqual({}, api.get('slow_key', timeout=5)["response"])
+
+            with API(api_source=source, retry_policy=RetryPolicy(backoff_base=1), timeout=5) as api:
+                with Deadline(0.05):
+                    self.assertRaises(requests.exceptions.Timeout, api.get, 'slow_key')
+                    threading.Event().wait(0.05)
+                    requests_before = len(server.requests)
+                    self.assertRaises(DeadlineExceeded, api.get, 'slow_key')
+                    self.assertEqual(requests_before, len(server.requests))
+
+                # the retry does not fit in the deadline, so the first response is returned
+                with Deadline(0.5):
+                    stats = RequestStats()
+                    api.get('data_key', stats=stats)
+                self.assertEqual((1, 503), (stats.attempts, stats.status_code))
+        mock_sleep.assert_not_called()
+
+        self.assertRaises(ValueError, API, api_source=HEALTHY_API_SOURCE, timeout=0)
+
+
+class TestEndpointTemplatesClass(unittest.TestCase):
+
+    def test_url(self) -> None:
+        """
+        Asserts the endpoint urls are resolved from the compiled templates.
+        """
+        endpoints = EndpointTemplates("http://path", {"data_key": "/data", "item": "/items/{id}/notes/{note}"})
+
+        self.assertEqual("http://path/data", endpoints.url("data_key"))
+        self.assertEqual("http://path/items/7/notes/a%20b", endpoints.url("item", {"id": 7, "note": "a b"}))
+        self.assertRaises(KeyError, endpoints.url, "item", {"id": 7})
+        self.assertRaises(KeyError, endpoints.url, "missing_key")
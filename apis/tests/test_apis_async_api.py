@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from apis.async_api import AsyncAPI
+from apis.circuitbreaker import CircuitBreaker, CircuitOpenError, OPEN
+from apis.deadline import Deadline, DeadlineExceeded
+from apis.metrics import RequestHooks
+from apis.ratelimit import TokenBucket
+from apis.tests.stub_server import StubServer
+
+
+def api_source(base_url: str) -> dict:
+    return {
+        "endpoints": {
+            "base_url": base_url,
+            "healthcheck": "/healthcheck",
+            "data_key": "/data",
+            "error_key": "/error",
+            "bytes_key": "/bytes",
+            "item_key": "/items/{id}"
+        }
+    }
+
+
+ROUTES = {
+    "/healthcheck": (200, {"status": "ok"}),
+    "/data": lambda method, query, body: (200, {"method": method, "query": query}),
+    "/error": (401, {"error": "unauthorized"}),
+    "/bytes": (200, "Non JSON response"),
+    "/items/1": lambda method, query, body: (200, {"method": method}, {"X-Method": method}),
+}
+
+
+class TestAsyncAPIClass(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.server = StubServer(dict(ROUTES))
+        self.server.__enter__()
+
+    def tearDown(self) -> None:
+        self.server.__exit__(None, None, None)
+
+    def test_constructor(self) -> None:
+        """
+        Asserts that api_source has the correct attributes.
+        """
+        self.assertRaises(KeyError, AsyncAPI, api_source={})
+        self.assertRaises(KeyError, AsyncAPI, api_source={"endpoints": {"base_url": "foo"}}, enforce_healthcheck=True)
+        self.assertRaises(ValueError, AsyncAPI, api_source={"endpoints": {"base_url": "foo"}}, concurrency=0)
+
+    async def test_api_healthcheck(self) -> None:
+        """
+        Asserts the API health check works correctly.
+        """
+        async with AsyncAPI(api_source(self.server.url), enforce_healthcheck=True) as api:
+            self.assertEqual(200, await api._api_health_check(self.server.url + "/healthcheck"))
+            self.assertEqual({"error": "API healthcheck not OK -> (404) Not Found"},
+                             await api._api_health_check(self.server.url + "/bad/healthcheck"))
+            self.assertEqual(
+                {"error": f"Failed to validate API HealthCheck, please check the logs for more information."},
+                await api._api_health_check("http://127.0.0.1:1/healthcheck"))
+
+    async def test_cached_healthcheck(self) -> None:
+        """
+        Asserts the healthcheck result is cached between requests and can be refreshed by a background task.
+        """
+        async with AsyncAPI(api_source(self.server.url), enforce_healthcheck=True) as api:
+            for _ in range(5):
+                await api.get('data_key')
+        self.assertEqual(1, len([r for r in self.server.requests if r[1] == "/healthcheck"]))
+
+        self.server.requests.clear()
+        async with AsyncAPI(api_source(self.server.url), enforce_healthcheck=True, healthcheck_interval=0.01,
+                            healthcheck_background=True) as api:
+            await api.get('data_key')
+            await asyncio.sleep(0.2)
+            self.assertIsNotNone(api._health_task)
+        self.assertIsNone(api._health_task)
+        self.assertGreater(len([r for r in self.server.requests if r[1] == "/healthcheck"]), 2)
+        self.assertEqual('healthy', api.health.state)
+
+        self.assertRaises(ValueError, AsyncAPI, api_source(self.server.url), healthcheck_interval=0,
+                          healthcheck_background=True)
+
+    async def test_request(self) -> None:
+        """
+        Asserts the API _request works correctly.
+        """
+        async with AsyncAPI(api_source(self.server.url)) as api:
+            with self.assertRaises(Exception):
+                await api._request('connect', self.server.url + "/data")
+
+            self.assertEqual({"response": {"method": "GET", "query": {"a": "1"}}},
+                             await api.get('data_key', params={"a": "1"}))
+            self.assertEqual({"response": {"method": "POST", "query": {}}}, await api.post('data_key'))
+            self.assertEqual({"response": {"error": "unauthorized"}}, await api.get('error_key'))
+            self.assertEqual({"response": b"Non JSON response"}, await api.get('bytes_key'))
+
+            with self.assertRaises(KeyError):
+                await api.get('missing_key')
+
+            for verb in ('put', 'patch', 'delete'):
+                self.assertEqual({"response": {"method": verb.upper()}},
+                                 await getattr(api, verb)('item_key', path_params={"id": 1}))
+            self.assertEqual("HEAD", (await api.head('item_key', path_params={"id": 1}))["response"]["X-Method"])
+
+        self.server.routes["/healthcheck"] = (500, {})
+        async with AsyncAPI(api_source(self.server.url), enforce_healthcheck=True) as api_hc:
+            self.assertEqual({"error": "API healthcheck not OK -> (500) Internal Server Error"},
+                             await api_hc.get('data_key'))
+
+    async def test_hooks(self) -> None:
+        """
+        Asserts the hooks receive the events of every request.
+        """
+        hooks = Mock(spec=RequestHooks)
+        async with AsyncAPI(api_source(self.server.url), hooks=[hooks]) as api:
+            await api.get('data_key')
+            await api.post('data_key', json={"a": 1})
+
+        self.assertEqual(['before_request', 'after_response'] * 2, [name for name, _, _ in hooks.method_calls])
+        first, second = (call.args[0] for call in hooks.after_response.call_args_list)
+        self.assertEqual(('AsyncAPI', 'data_key', 'get', 200), (first.api, first.endpoint_key, first.method,
+                                                                first.status_code))
+        self.assertGreater(first.connect, 0)
+        self.assertEqual(0, second.connect)
+        self.assertEqual(len(b'{"a":1}'), second.bytes_out)
+
+    async def test_rate_limiter(self) -> None:
+        """
+        Asserts every request takes a token from the rate limiter, which adapts to the rate limit headers.
+        """
+        self.server.routes["/data"] = (200, {}, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0.2"})
+        bucket = TokenBucket(rate=10, capacity=10)
+
+        async with AsyncAPI(api_source(self.server.url), rate_limiter=bucket) as api:
+            await api.get('data_key')
+            start = time.monotonic()
+            await api.get('data_key')
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    async def test_concurrency(self) -> None:
+        """
+        Asserts many concurrent requests share one event loop without exceeding the concurrency bound.
+        """
+        lock = threading.Lock()
+        counters = {"in_flight": 0, "peak": 0}
+
+        def slow_route(method, query, body):
+            with lock:
+                counters["in_flight"] += 1
+                counters["peak"] = max(counters["peak"], counters["in_flight"])
+            time.sleep(0.01)
+            with lock:
+                counters["in_flight"] -= 1
+            return 200, {"query": query}
+
+        self.server.routes["/data"] = slow_route
+
+        async with AsyncAPI(api_source(self.server.url), concurrency=5) as api:
+            responses = await asyncio.gather(*[api.get('data_key', params={"i": str(i)}) for i in range(200)])
+
+        self.assertEqual([str(i) for i in range(200)], [r["response"]["query"]["i"] for r in responses])
+        self.assertLessEqual(counters["peak"], 5)
+        self.assertGreater(counters["peak"], 1)
+
+    async def test_single_flight(self) -> None:
+        """
+        Asserts identical GETs made by concurrent tasks share one request.
+        """
+        async with AsyncAPI(api_source(self.server.url), single_flight=True) as api:
+            responses = await asyncio.gather(*[api.get('data_key', params={"i": "1"}) for _ in range(20)])
+
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual([{"method": "GET", "query": {"i": "1"}}] * 20, [r["response"] for r in responses])
+
+    async def test_circuit_breaker(self) -> None:
+        """
+        Asserts failed requests open the circuit of their endpoint, which then fails fast.
+        """
+        self.server.routes["/data"] = (500, {"error": "internal"})
+        breaker = CircuitBreaker(window_size=3, min_calls=3, cooldown=60)
+        async with AsyncAPI(api_source(self.server.url), circuit_breaker=breaker) as api:
+            for _ in range(3):
+                await api.get('data_key')
+            with self.assertRaises(CircuitOpenError):
+                await api.get('data_key')
+            self.assertEqual(OPEN, breaker.state('data_key'))
+            self.assertEqual({"status": "ok"}, (await api.get('healthcheck'))["response"])
+
+        self.assertEqual(4, len(self.server.requests))
+
+    async def test_timeouts(self) -> None:
+        """
+        Asserts the endpoint timeouts are applied and bounded by the active deadline.
+        """
+        def slow_route(method, query, body):
+            time.sleep(0.3)
+            return 200, {}
+
+        self.server.routes["/data"] = slow_route
+        async with AsyncAPI(api_source(self.server.url), timeouts={"data_key": (1, 0.05)}) as api:
+            with self.assertRaises(asyncio.TimeoutError):
+                await api.get('data_key')
+            self.assertEqual({}, (await api.get('data_key', timeout=5))["response"])
+
+            with Deadline(0.05):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await api.get('data_key', timeout=5)
+                await asyncio.sleep(0.05)
+                with self.assertRaises(DeadlineExceeded):
+                    await api.get('data_key')
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import unittest
+
+from apis.bulk import run_bulk, run_bulk_async, BulkResult
+
+
+def square(item: int) -> int:
+    if item == 3:
+        raise ValueError("Any Exception")
+    return item * item
+
+
+class TestBulkFunctions(unittest.TestCase):
+
+    def test_run_bulk(self) -> None:
+        """
+        Asserts every item is processed, keeping its correlation, and failures do not abort the batch.
+        """
+        self.assertRaises(ValueError, run_bulk, square, [], max_workers=0)
+
+        results = {result.item: result for result in run_bulk(square, range(20), max_workers=4)}
+        self.assertEqual(set(range(20)), set(results))
+        self.assertEqual(16, results[4].value)
+        self.assertFalse(results[3].ok)
+        self.assertIsInstance(results[3].error, ValueError)
+        self.assertTrue(all(result.ok for item, result in results.items() if item != 3))
+
+    def test_run_bulk_bounded(self) -> None:
+        """
+        Asserts the input is read on demand and never more than max_workers items run at once.
+        """
+        lock = threading.Lock()
+        counters = {"read": 0, "running": 0, "peak": 0}
+
+        def items():
+            for item in range(1000):
+                counters["read"] += 1
+                yield item
+
+        def work(item):
+            with lock:
+                counters["running"] += 1
+                counters["peak"] = max(counters["peak"], counters["running"])
+            with lock:
+                counters["running"] -= 1
+            return item
+
+        results = run_bulk(work, items(), max_workers=3)
+        self.assertIsInstance(next(results), BulkResult)
+        self.assertLessEqual(counters["read"], 9)
+        results.close()
+
+        self.assertEqual(1000, len(list(run_bulk(work, items(), max_workers=3))))
+        self.assertLessEqual(counters["peak"], 3)
+
+    def test_run_bulk_async(self) -> None:
+        """
+        Asserts the asyncio variant processes every item, keeping its correlation and reporting failures.
+        """
+        running = {"now": 0, "peak": 0}
+
+        async def work(item):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.001)
+            running["now"] -= 1
+            return square(item)
+
+        async def collect():
+            return [result async for result in run_bulk_async(work, range(50), max_workers=5)]
+
+        results = {result.item: result for result in asyncio.run(collect())}
+        self.assertEqual(set(range(50)), set(results))
+        self.assertEqual(49, results[7].value)
+        self.assertFalse(results[3].ok)
+        self.assertLessEqual(running["peak"], 5)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from apis.cache import ResponseCache
+
+
+class TestResponseCacheClass(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.db')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_constructor(self) -> None:
+        """
+        Asserts the ResponseCache parameters are validated.
+        """
+        self.assertRaises(ValueError, ResponseCache, max_entries=0)
+        self.assertRaises(ValueError, ResponseCache, max_disk_entries=0)
+
+    def test_key(self) -> None:
+        """
+        Asserts the key depends on endpoint, params and headers, but not on authentication headers.
+        """
+        key = ResponseCache.key('data_from_profile', {'url': 'a', 'b': 1}, {'Authorization': 'Bearer key_1'})
+        self.assertEqual(key, ResponseCache.key('data_from_profile', {'b': 1, 'url': 'a'},
+                                                {'authorization': 'Bearer key_2'}))
+        self.assertNotEqual(key, ResponseCache.key('url_from_email', {'url': 'a', 'b': 1}))
+        self.assertNotEqual(key, ResponseCache.key('data_from_profile', {'url': 'b', 'b': 1}))
+        self.assertNotEqual(key, ResponseCache.key('data_from_profile', {'url': 'a', 'b': 1}, {'Accept': 'json'}))
+        self.assertNotIn('key_1', key)
+
+    def test_memory_lru(self) -> None:
+        """
+        Asserts the memory tier evicts the least recently used responses.
+        """
+        cache = ResponseCache(max_entries=2)
+        cache.set('a', {"response": 1}, ttl=60)
+        cache.set('b', {"response": 2}, ttl=60)
+        self.assertEqual({"response": 1}, cache.get('a'))
+        cache.set('c', {"response": 3}, ttl=60)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({"response": 1}, cache.get('a'))
+        self.assertEqual({"response": 3}, cache.get('c'))
+        self.assertEqual({"hits": 3, "disk_hits": 0, "misses": 1, "expirations": 0, "evictions": 1,
+                          "disk_evictions": 0}, cache.stats.as_dict())
+
+        cache.set('d', {"response": 4}, ttl=0)
+        self.assertIsNone(cache.get('d'))
+
+    def test_ttl(self) -> None:
+        """
+        Asserts responses expire after the TTL of their endpoint.
+        """
+        cache = ResponseCache(path=self.path, default_ttl=10, ttls={'url_from_email': 100})
+        self.assertEqual(10, cache.ttl('data_from_profile'))
+        self.assertEqual(100, cache.ttl('url_from_email'))
+
+        with patch('apis.cache.time.time', return_value=1000):
+            cache.set('a', {"response": 1}, ttl=10)
+        with patch('apis.cache.time.time', return_value=1009):
+            self.assertEqual({"response": 1}, cache.get('a'))
+        with patch('apis.cache.time.time', return_value=1010):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(2, cache.stats.expirations)
+        cache.close()
+
+    def test_disk_tier(self) -> None:
+        """
+        Asserts responses survive in the disk tier, which has its own size cap.
+        """
+        cache = ResponseCache(max_entries=1, path=self.path, max_disk_entries=2)
+        cache.set('a', {"response": 1}, ttl=60)
+        cache.set('b', {"response": 2}, ttl=60)
+        cache.set('b', {"response": 2}, ttl=60)
+        cache.set('bytes', {"response": b"bytes"}, ttl=60)
+        cache.close()
+
+        reopened = ResponseCache(path=self.path, max_disk_entries=2)
+        self.assertEqual({"response": 1}, reopened.get('a'))
+        self.assertEqual({"response": 1}, reopened.get('a'))
+        self.assertEqual(1, reopened.stats.disk_hits)
+        self.assertEqual(1, reopened.stats.hits)
+        self.assertIsNone(reopened.get('bytes'))
+
+        reopened.set('c', {"response": 3}, ttl=60)
+        self.assertEqual(1, reopened.stats.disk_evictions)
+        self.assertIsNone(ResponseCache(path=self.path).get('b'))
+
+        reopened.clear()
+        self.assertIsNone(reopened.get('a'))
+        reopened.close()
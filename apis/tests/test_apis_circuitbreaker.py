@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+from apis.circuitbreaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+class TestCircuitBreakerClass(unittest.TestCase):
+
+    def test_constructor(self) -> None:
+        """
+        Asserts the CircuitBreaker parameters are validated.
+        """
+        self.assertRaises(ValueError, CircuitBreaker, failure_rate=0)
+        self.assertRaises(ValueError, CircuitBreaker, failure_rate=1.5)
+        self.assertRaises(ValueError, CircuitBreaker, window_size=0)
+        self.assertRaises(ValueError, CircuitBreaker, half_open_calls=0)
+        self.assertRaises(ValueError, CircuitBreaker, window_size=5, min_calls=6)
+        self.assertRaises(ValueError, CircuitBreaker, cooldown=-1)
+
+    @patch('apis.circuitbreaker.time.monotonic')
+    def test_states(self, mock_monotonic) -> None:
+        """
+        Asserts the circuit opens at the failure rate, fails fast during the cooldown, and closes or opens again
+        after the trial requests.
+        """
+        mock_monotonic.return_value = 100.0
+        breaker = CircuitBreaker(failure_rate=0.5, window_size=4, min_calls=4, cooldown=10, half_open_calls=2)
+
+        for failed in (True, False, True):
+            self.assertIsNone(breaker.allow('key'))
+            self.assertIsNone(breaker.record('key', failed))
+        self.assertEqual(CLOSED, breaker.state('key'))
+        breaker.allow('key')
+        self.assertEqual((CLOSED, OPEN), breaker.record('key', True))
+        self.assertEqual(CLOSED, breaker.state('other'))
+
+        mock_monotonic.return_value = 105.0
+        with self.assertRaises(CircuitOpenError) as context:
+            breaker.allow('key')
+        self.assertEqual(('key', 5.0), (context.exception.key, context.exception.retry_in))
+
+        mock_monotonic.return_value = 110.0
+        self.assertEqual(HALF_OPEN, breaker.state('key'))
+        self.assertEqual((OPEN, HALF_OPEN), breaker.allow('key'))
+        self.assertIsNone(breaker.allow('key'))
+        self.assertRaises(CircuitOpenError, breaker.allow, 'key')
+        self.assertIsNone(breaker.record('key', False))
+        self.assertEqual((HALF_OPEN, CLOSED), breaker.record('key', False))
+
+        # a failed trial opens the circuit again
+        for _ in range(4):
+            breaker.allow('key')
+            breaker.record('key', True)
+        self.assertEqual(OPEN, breaker.state('key'))
+        mock_monotonic.return_value = 120.0
+        breaker.allow('key')
+        self.assertEqual((HALF_OPEN, OPEN), breaker.record('key', True))
+        self.assertRaises(CircuitOpenError, breaker.allow, 'key')
+
+    @patch('apis.circuitbreaker.time.monotonic')
+    def test_sliding_window(self, mock_monotonic) -> None:
+        """
+        Asserts only the latest window_size outcomes count, and trials never reported are given up after the cooldown.
+        """
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker(failure_rate=0.5, window_size=4, min_calls=2, cooldown=1)
+        for failed in (True, False, False, False, False, True):
+            breaker.allow('key')
+            self.assertIsNone(breaker.record('key', failed))
+        breaker.allow('key')
+        self.assertEqual((CLOSED, OPEN), breaker.record('key', True))
+
+        mock_monotonic.return_value = 1.0
+        breaker.allow('key')
+        self.assertRaises(CircuitOpenError, breaker.allow, 'key')
+        mock_monotonic.return_value = 2.0
+        self.assertIsNone(breaker.allow('key'))
+        self.assertEqual((HALF_OPEN, CLOSED), breaker.record('key', False))
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+
+from apis import codec
+from apis.codec import JSONCodec, OrjsonCodec, get_codec, encode_json_body
+
+DOCUMENT = {"success": True, "data": [{"id": 1, "name": "Zoë", "email": [{"value": "a@b.c"}], "org": None}]}
+
+
+class TestJSONCodec(unittest.TestCase):
+
+    def test_codecs(self) -> None:
+        """
+        Asserts every installed codec encodes to bytes and decodes bytes and str.
+        """
+        for name, (_, module) in codec.CODECS.items():
+            if module is None:
+                continue
+            json_codec = get_codec(name)
+            encoded = json_codec.dumps(DOCUMENT)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(DOCUMENT, json_codec.loads(encoded))
+            self.assertEqual(DOCUMENT, json_codec.loads(encoded.decode('utf-8')))
+            self.assertRaises(ValueError, json_codec.loads, b'Non JSON response')
+
+    def test_get_codec(self) -> None:
+        """
+        Asserts the fastest installed codec is the default and unavailable codecs are rejected.
+        """
+        self.assertRaises(ValueError, get_codec, 'simplejson')
+
+        with patch.dict(codec.CODECS, {'orjson': (OrjsonCodec, None), 'ujson': (codec.UjsonCodec, None)}):
+            self.assertIs(JSONCodec, type(get_codec()))
+            self.assertRaises(ValueError, get_codec, 'orjson')
+
+        if codec.orjson is not None:
+            self.assertIs(OrjsonCodec, type(get_codec()))
+
+    def test_encode_json_body(self) -> None:
+        """
+        Asserts the json argument is replaced by the encoded body, keeping the caller headers.
+        """
+        kwargs = encode_json_body(JSONCodec(), {"json": {"a": 1}, "headers": {"Accept": "json"}})
+        self.assertEqual({"data": b'{"a":1}', "headers": {"Content-Type": "application/json", "Accept": "json"}},
+                         kwargs)
+        self.assertEqual({"params": {}}, encode_json_body(JSONCodec(), {"params": {}}))
@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from apis.deadline import Deadline, DeadlineExceeded, current_deadline, normalize_timeout
+
+
+class TestDeadlineClass(unittest.TestCase):
+
+    def test_normalize_timeout(self) -> None:
+        """
+        Asserts timeouts are normalized to (connect, read) tuples.
+        """
+        self.assertEqual((5, 5), normalize_timeout(5))
+        self.assertEqual((1, 30), normalize_timeout((1, 30)))
+        self.assertEqual((None, None), normalize_timeout(None))
+        self.assertRaises(ValueError, normalize_timeout, 0)
+        self.assertRaises(ValueError, normalize_timeout, (1, -1))
+
+    @patch('apis.deadline.time.monotonic')
+    def test_clamp(self, mock_monotonic) -> None:
+        """
+        Asserts the timeouts are shrunk to the time left and an expired deadline raises.
+        """
+        mock_monotonic.return_value = 10.0
+        deadline = Deadline(5)
+        self.assertEqual((3, 5.0), deadline.clamp((3, 30)))
+        self.assertEqual((5.0, 5.0), deadline.clamp((None, None)))
+
+        mock_monotonic.return_value = 15.0
+        self.assertTrue(deadline.expired)
+        self.assertRaises(DeadlineExceeded, deadline.clamp, (3, 30))
+        self.assertRaises(ValueError, Deadline, 0)
+
+    def test_context(self) -> None:
+        """
+        Asserts deadlines are active only inside their block and nested ones never extend the outer ones.
+        """
+        self.assertIsNone(current_deadline())
+        with Deadline(1) as outer:
+            self.assertIs(outer, current_deadline())
+            with Deadline(60) as inner:
+                self.assertIs(inner, current_deadline())
+                self.assertEqual(outer.expires_at, inner.expires_at)
+            with Deadline(0.5) as shorter:
+                self.assertLess(shorter.expires_at, outer.expires_at)
+            self.assertIs(outer, current_deadline())
+        self.assertIsNone(current_deadline())
+
+    def test_tasks(self) -> None:
+        """
+        Asserts the tasks created under a deadline inherit it, and the others do not.
+        """
+        async def run() -> tuple:
+            with Deadline(1) as deadline:
+                task = asyncio.create_task(_current())
+            outside = asyncio.create_task(_current())
+            return deadline, await task, await outside
+
+        deadline, inherited, outside = asyncio.run(run())
+        self.assertIs(deadline, inherited)
+        self.assertIsNone(outside)
+
+
+async def _current() -> Deadline or None:
+    return current_deadline()
@@ -0,0 +1,103 @@
+import threading
+import unittest
+from unittest.mock import patch, Mock
+
+from apis.healthcheck import HealthStatus, HealthMonitor, HEALTHY, DEGRADED, UNHEALTHY
+
+HC_ERROR = {"error": "API healthcheck not OK -> (500) error"}
+
+
+class TestHealthStatusClass(unittest.TestCase):
+
+    def test_constructor(self) -> None:
+        """
+        Asserts the HealthStatus parameters are validated.
+        """
+        self.assertRaises(ValueError, HealthStatus, interval=-1)
+        self.assertRaises(ValueError, HealthStatus, failure_threshold=0)
+        self.assertRaises(ValueError, HealthStatus, recovery_threshold=0)
+
+    def test_first_probe(self) -> None:
+        """
+        Asserts the first probe result is taken as is.
+        """
+        self.assertEqual(HEALTHY, HealthStatus().record(200))
+
+        status = HealthStatus()
+        self.assertEqual(UNHEALTHY, status.record(HC_ERROR))
+        self.assertEqual(HC_ERROR, status.result)
+
+    def test_hysteresis(self) -> None:
+        """
+        Asserts one failed probe does not mark a healthy API as unhealthy, and the recovery needs several probes.
+        """
+        status = HealthStatus(failure_threshold=3, recovery_threshold=2)
+        status.record(200)
+
+        self.assertEqual(DEGRADED, status.record(HC_ERROR))
+        self.assertEqual(200, status.result)
+        self.assertEqual(HEALTHY, status.record(200))
+
+        status.record(HC_ERROR)
+        status.record(HC_ERROR)
+        self.assertEqual(UNHEALTHY, status.record(HC_ERROR))
+        self.assertEqual(HC_ERROR, status.result)
+
+        self.assertEqual(UNHEALTHY, status.record(200))
+        self.assertEqual(HEALTHY, status.record(200))
+        self.assertEqual(200, status.result)
+
+    def test_is_stale(self) -> None:
+        """
+        Asserts the probe result expires after the interval.
+        """
+        status = HealthStatus(interval=30)
+        self.assertTrue(status.is_stale())
+
+        with patch('apis.healthcheck.time.monotonic', return_value=100):
+            status.record(200)
+        with patch('apis.healthcheck.time.monotonic', return_value=129):
+            self.assertFalse(status.is_stale())
+        with patch('apis.healthcheck.time.monotonic', return_value=130):
+            self.assertTrue(status.is_stale())
+
+        self.assertTrue(HealthStatus(interval=0).is_stale())
+
+
+class TestHealthMonitorClass(unittest.TestCase):
+
+    def test_monitor(self) -> None:
+        """
+        Asserts the monitor probes the API in background until stopped.
+        """
+        probed = threading.Event()
+        probe = Mock(side_effect=lambda: probed.set() or 200)
+
+        self.assertRaises(ValueError, HealthMonitor(HealthStatus(interval=0), probe).start)
+
+        monitor = HealthMonitor(HealthStatus(interval=60), probe)
+        monitor.start()
+        self.assertTrue(probed.wait(5))
+        self.assertTrue(monitor.running)
+        monitor.stop()
+
+        self.assertFalse(monitor.running)
+        self.assertEqual(HEALTHY, monitor.status.state)
+        probe.assert_called_once()
+
+    def test_monitor_stop(self) -> None:
+        """
+        Asserts the monitor stops when the probe returns None and stop does not wait longer than its timeout.
+        """
+        monitor = HealthMonitor(HealthStatus(interval=60), Mock(return_value=None))
+        monitor.start()
+        monitor._thread.join(5)
+        self.assertFalse(monitor.running)
+        self.assertIsNone(monitor.status.state)
+
+        release = threading.Event()
+        slow_monitor = HealthMonitor(HealthStatus(interval=60), lambda: release.wait(5) and 200)
+        slow_monitor.start()
+        slow_monitor.stop(timeout=0.05)
+        self.assertFalse(slow_monitor.running)
+        release.set()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+
+from apis.jobs import CheckpointedJob, JobStore
+
+
+class TestCheckpointedJobClass(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'jobs.db')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_run_resume(self) -> None:
+        """
+        Asserts an interrupted run keeps its completed items and the next run processes only the remaining ones.
+        """
+        calls = Counter()
+        lock = threading.Lock()
+
+        def lookup(item: str) -> dict:
+            with lock:
+                calls[item] += 1
+            if item == 'item_7' and calls[item] == 1:
+                raise Exception('Any Exception')
+            return {"value": item.upper()}
+
+        def interrupted(items: list):
+            for index, item in enumerate(items):
+                if index == 250:
+                    raise KeyboardInterrupt
+                yield item
+
+        items = [f'item_{i}' for i in range(500)]
+        with JobStore(self.path) as store:
+            job = CheckpointedJob(store, 'lookups', checkpoint_every=20)
+            self.assertRaises(KeyboardInterrupt, job.run, lookup, interrupted(items), max_workers=4)
+            # the input is read a chunk at a time, so the items of the chunk interrupted were never started
+            completed = store.count('lookups')
+            self.assertGreaterEqual(completed, 240 - 1 - 2 * 4)
+
+        with JobStore(self.path) as store:
+            job = CheckpointedJob(store, 'lookups', checkpoint_every=20)
+            summary = job.run(lookup, items + ['item_1'], max_workers=4)
+            self.assertEqual({"processed": 500 - completed, "skipped": completed + 1, "failed": 0}, summary)
+            self.assertEqual({"processed": 0, "skipped": 500, "failed": 0}, job.run(lookup, items))
+
+            outputs = dict(job.outputs())
+            self.assertEqual(500, len(outputs))
+            self.assertEqual({"value": 'ITEM_7'}, outputs['item_7'])
+            self.assertEqual(2, calls['item_7'])
+            # only the items in flight when the run was interrupted are requested twice
+            self.assertLessEqual(sum(count - 1 for item, count in calls.items() if item != 'item_7'), 2 * 4)
+
+            job.reset()
+            self.assertEqual(0, store.count('lookups'))
+        self.assertRaises(ValueError, CheckpointedJob, None, 'lookups', checkpoint_every=0)
+
+    def test_run_pages_resume(self) -> None:
+        """
+        Asserts a paginated job resumes from the cursor of the last stored page and stores repeated items once.
+        """
+        persons = [{"id": i} for i in range(25)]
+        requested = []
+
+        def fetch_page(start: int) -> tuple:
+            requested.append(start)
+            if start == 20 and requested.count(20) == 1:
+                raise Exception('Any Exception')
+            page = persons[start:start + 10] + ([persons[0]] if start == 10 else [])
+            return page, start + 10 if start + 10 < 25 else None
+
+        with JobStore(self.path) as store:
+            job = CheckpointedJob(store, 'export')
+            self.assertRaises(Exception, job.run_pages, fetch_page)
+            self.assertEqual(20, store.get_state('export', 'cursor'))
+
+            self.assertEqual({"processed": 5, "duplicates": 0, "pages": 1}, job.run_pages(fetch_page))
+            self.assertEqual([0, 10, 20, 20], requested)
+            self.assertEqual(persons, [output for id, output in job.outputs()])
+            self.assertEqual({"processed": 0, "duplicates": 0, "pages": 0}, job.run_pages(fetch_page))
+
+            store.reset('export')
+            self.assertEqual({"processed": 25, "duplicates": 1, "pages": 3}, job.run_pages(fetch_page))
@@ -0,0 +1,69 @@
+import unittest
+
+from apis.keypool import KeyPool, NoKeyAvailableError, WEIGHTED, mask_key, resolve_key
+
+
+class TestKeyPoolClass(unittest.TestCase):
+
+    def test_least_throttled(self) -> None:
+        """
+        Asserts the keys are spread by load and a throttled key leaves the rotation for its Retry-After.
+        """
+        pool = KeyPool(['key_a_123456', 'key_b_123456', 'key_c_123456'])
+        self.assertEqual({'key_a_123456', 'key_b_123456', 'key_c_123456'}, {pool.acquire() for _ in range(3)})
+        for key in pool.keys:
+            self.assertFalse(pool.report(key, 200))
+
+        self.assertTrue(pool.report(pool.acquire(), 429, '60'))
+        self.assertEqual(2, pool.available())
+        acquired = [pool.acquire() for _ in range(4)]
+        self.assertNotIn('key_a_123456', acquired)
+        self.assertEqual(2, acquired.count('key_b_123456'))
+
+        # the key throttled the longest ago is preferred once every key is back
+        pool = KeyPool(['key_a_123456', 'key_b_123456'], cooldown=0)
+        pool.report(pool.acquire(), 429)
+        pool.report(pool.acquire(), 429)
+        self.assertEqual(['key_a_123456', 'key_a_123456'], [pool.acquire(), pool.acquire()])
+
+        pool = KeyPool(['key_a_123456', 'key_b_123456'], cooldown=60)
+        pool.report(pool.acquire(), 429)
+        pool.report(pool.acquire(), 429, '0.5')
+        key, wait = pool.reserve()
+        self.assertEqual('key_b_123456', key)
+        self.assertGreater(wait, 0.3)
+
+    def test_weighted(self) -> None:
+        """
+        Asserts the weighted strategy gives each key a share of the requests proportional to its weight.
+        """
+        pool = KeyPool(['key_a_123456', 'key_b_123456'], weights=[3, 1], strategy=WEIGHTED)
+        acquired = [pool.acquire() for _ in range(8)]
+        self.assertEqual(6, acquired.count('key_a_123456'))
+        self.assertNotEqual(['key_a_123456'] * 3, acquired[:3])
+
+    def test_rejected_keys(self) -> None:
+        """
+        Asserts a rejected key leaves the pool for good and the usage counters follow the requests.
+        """
+        pool = KeyPool(['key_a_123456', 'key_b_123456'])
+        self.assertTrue(pool.report(pool.acquire(), 401))
+        self.assertEqual(['key_b_123456'] * 2, [pool.acquire(), pool.acquire()])
+        self.assertEqual([{"key": '...3456', "requests": 1, "in_flight": 0, "throttled": 0, "state": 'rejected'},
+                          {"key": '...3456', "requests": 2, "in_flight": 2, "throttled": 0, "state": 'active'}],
+                         pool.usage())
+        pool.report('key_b_123456', 403)
+        self.assertRaises(NoKeyAvailableError, pool.acquire)
+
+    def test_validation(self) -> None:
+        self.assertRaises(ValueError, KeyPool, [])
+        self.assertRaises(ValueError, KeyPool, ['key', 'key'])
+        self.assertRaises(ValueError, KeyPool, ['key'], weights=[0])
+        self.assertRaises(ValueError, KeyPool, ['key'], weights=[1, 1])
+        self.assertRaises(ValueError, KeyPool, ['key'], strategy='random')
+        self.assertRaises(ValueError, KeyPool, ['key'], cooldown=-1)
+
+        self.assertEqual('...', mask_key('short'))
+        self.assertEqual('key', resolve_key('key', None))
+        self.assertEqual('key_a', resolve_key(None, KeyPool(['key_a', 'key_b'])))
+        self.assertRaises(ValueError, resolve_key, None, None)
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import Mock
+
+from apis.metrics import RequestEvent, RequestHooks, Histogram, MetricsCollector, emit
+
+
+def response_event(status_code: int = 200, elapsed: float = 0.03) -> RequestEvent:
+    event = RequestEvent('Pipedrive', 'persons', 'get', 'http://path/persons')
+    event.status_code = status_code
+    event.elapsed = elapsed
+    event.connect, event.ttfb, event.read = 0.01, 0.015, 0.005
+    event.bytes_in, event.bytes_out = 100, 0
+    return event
+
+
+class TestHistogramClass(unittest.TestCase):
+
+    def test_histogram(self) -> None:
+        """
+        Asserts the observations are counted in cumulative buckets.
+        """
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        self.assertEqual([(0.1, 2), (1.0, 3), (float('inf'), 4)], histogram.cumulative())
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(2.65, histogram.sum)
+        self.assertEqual(0.1, histogram.quantile(0.5))
+        self.assertEqual(float('inf'), histogram.quantile(0.99))
+
+
+class TestMetricsCollectorClass(unittest.TestCase):
+
+    def test_collector(self) -> None:
+        """
+        Asserts the events are aggregated by their labels.
+        """
+        collector = MetricsCollector(buckets=(0.01, 0.1))
+        collector.after_response(response_event())
+        collector.after_response(response_event(elapsed=0.005))
+        collector.after_response(response_event(status_code=429))
+        collector.on_retry(response_event(status_code=429), 1)
+        collector.on_error(response_event(), TimeoutError())
+
+        snapshot = collector.snapshot()
+        self.assertEqual(2, snapshot[('Pipedrive', 'persons', 'GET', '200')]["count"])
+        self.assertEqual(1, snapshot[('Pipedrive', 'persons', 'GET', '429')]["count"])
+        self.assertEqual(200, collector.bytes_in[('Pipedrive', 'persons', 'GET', '200')])
+        self.assertEqual({('Pipedrive', 'persons', 'GET'): 1}, collector.retries)
+        self.assertEqual({('Pipedrive', 'persons', 'GET', 'TimeoutError'): 1}, collector.errors)
+
+    def test_to_prometheus(self) -> None:
+        """
+        Asserts the metrics are exported in the Prometheus text format.
+        """
+        collector = MetricsCollector(buckets=(0.01, 0.1))
+        collector.after_response(response_event())
+        event = response_event()
+        event.endpoint_key = 'say "hi"'
+        collector.on_error(event, TimeoutError())
+        collector.on_circuit_change(response_event(), 'closed', 'open')
+
+        lines = collector.to_prometheus().splitlines()
+        labels = 'api="Pipedrive",endpoint="persons",method="GET",status="200"'
+        self.assertIn('# TYPE apis_request_duration_seconds histogram', lines)
+        self.assertIn(f'apis_request_duration_seconds_bucket{{{labels},le="0.01"}} 0', lines)
+        self.assertIn(f'apis_request_duration_seconds_bucket{{{labels},le="0.1"}} 1', lines)
+        self.assertIn(f'apis_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', lines)
+        self.assertIn(f'apis_request_duration_seconds_count{{{labels}}} 1', lines)
+        self.assertIn(f'apis_request_phase_seconds_count{{{labels},phase="connect"}} 1', lines)
+        self.assertIn(f'apis_response_bytes_total{{{labels}}} 100', lines)
+        self.assertIn('apis_request_errors_total{api="Pipedrive",endpoint="say \\"hi\\"",method="GET",'
+                      'error="TimeoutError"} 1', lines)
+        self.assertIn('apis_circuit_changes_total{api="Pipedrive",endpoint="persons",state="open"} 1', lines)
+
+
+class TestEmit(unittest.TestCase):
+
+    def test_emit(self) -> None:
+        """
+        Asserts a failing hook does not stop the other hooks.
+        """
+        failing = Mock(spec=RequestHooks)
+        failing.after_response.side_effect = Exception("Any Exception")
+        hook = Mock(spec=RequestHooks)
+        event = response_event()
+
+        with self.assertLogs('APIs.Metrics', level='ERROR'):
+            emit([failing, hook], 'after_response', event)
+        hook.after_response.assert_called_once_with(event)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from apis.mirror import PersonMirror, normalize_email, normalize_phone
+from apis.pipedrive import Pipedrive, USERS_ME, PERSONS, RECENTS
+from apis.tests.stub_server import StubServer
+
+
+def contact(id: int, email: str = None, phone: str = None, update_time: str = '2024-01-01 10:00:00') -> dict:
+    return {"id": id, "name": f'contact_{id}', "update_time": update_time,
+            "email": [{"value": email or f'Contact_{id}@Test.com ', "primary": True}],
+            "phone": [{"value": phone or f'+55 (11) 9000-{id:04d}', "primary": True}, {"value": '', "primary": False}]}
+
+
+class TestPersonMirrorClass(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'mirror.db')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_normalize(self) -> None:
+        self.assertEqual('contact@test.com', normalize_email(' Contact@Test.COM'))
+        self.assertEqual('551190000001', normalize_phone('+55 (11) 9000-0001'))
+
+    def test_lookups(self) -> None:
+        """
+        Asserts the contacts are found by id, email and phone, and the indexes follow upserts and deletes.
+        """
+        with PersonMirror(self.path) as mirror:
+            self.assertEqual(3, mirror.upsert([contact(1), contact(2, email='shared@test.com'),
+                                               contact(3, email='SHARED@test.com', phone='5511 90000001')]))
+            self.assertEqual(3, len(mirror))
+            self.assertEqual(contact(1), mirror.get(1))
+            self.assertIsNone(mirror.get(4))
+            self.assertEqual([contact(1)], mirror.find_by_email('contact_1@test.com'))
+            self.assertEqual([2, 3], [person["id"] for person in mirror.find_by_email(' Shared@Test.com')])
+            self.assertEqual([1, 3], [person["id"] for person in mirror.find_by_phone('551190000001')])
+            self.assertEqual([], mirror.find_by_phone(''))
+
+            mirror.upsert([contact(3, email='other@test.com')])
+            self.assertEqual([2], [person["id"] for person in mirror.find_by_email('shared@test.com')])
+            self.assertEqual(1, mirror.delete([2, 5]))
+            self.assertEqual([], mirror.find_by_email('shared@test.com'))
+
+        with PersonMirror(self.path) as mirror:
+            self.assertEqual([1, 3], sorted(person["id"] for person in mirror.find_by_phone('+55 11 9000 0001')
+                                            + mirror.find_by_phone('55 11 9000-0003')))
+            self.assertEqual(2, len(mirror))
+
+    def test_refresh(self) -> None:
+        """
+        Asserts the first refresh copies every contact and the next one applies only the recent changes.
+        """
+        persons = [contact(i, update_time=f'2024-01-0{1 + i % 3} 10:00:00') for i in range(25)]
+
+        def persons_route(method, query, body):
+            start, limit = int(query['start']), int(query['limit'])
+            return 200, {"success": True, "data": persons[start:start + limit],
+                         "additional_data": {"pagination": {"more_items_in_collection": start + limit < 25,
+                                                            "next_start": start + limit}}}
+
+        recents = [{"item": "person", "id": 3, "data": contact(3, email='new@test.com',
+                                                             update_time='2024-01-04 09:00:00')},
+                   {"item": "person", "id": 4, "data": None},
+                   {"item": "person", "id": 30, "data": contact(30, update_time='2024-01-04 10:00:00')}]
+
+        def recents_route(method, query, body):
+            start, limit = int(query['start']), int(query['limit'])
+            return 200, {"success": True, "data": recents[start:start + limit],
+                         "additional_data": {"pagination": {"more_items_in_collection": start + limit < 3,
+                                                            "next_start": start + limit}}}
+
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: persons_route, RECENTS: recents_route}
+
+        with StubServer(routes) as server, PersonMirror(self.path) as mirror:
+            pipe = Pipedrive('token')
+            pipe.base_url = server.url
+
+            self.assertEqual({"upserted": 25, "deleted": 0}, mirror.refresh(pipe, page_size=10))
+            self.assertEqual(25, len(mirror))
+            self.assertEqual(persons[7], mirror.get(7))
+
+            server.requests.clear()
+            self.assertEqual({"upserted": 2, "deleted": 1}, mirror.refresh(pipe, page_size=2))
+            self.assertNotIn(PERSONS, [request[1] for request in server.requests])
+            self.assertEqual({'2024-01-03 10:00:00'},
+                             {request[2]['since_timestamp'] for request in server.requests if request[1] == RECENTS})
+            self.assertEqual(25, len(mirror))
+            self.assertIsNone(mirror.get(4))
+            self.assertEqual([3], [person["id"] for person in mirror.find_by_email('new@test.com')])
+            self.assertEqual([], mirror.find_by_email('contact_3@test.com'))
+            self.assertEqual([30], [person["id"] for person in mirror.find_by_email('contact_30@test.com')])
@@ -1,8 +1,22 @@
+import asyncio
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
 import unittest
-from unittest.mock import patch
-
-from apis.pipedrive import Pipedrive
+from unittest.mock import patch, AsyncMock
+
+from apis.api import RequestStats
+from apis.keypool import KeyPool
+from apis.pipedrive import Pipedrive, AsyncPipedrive, PersonChange, compact_persons, MAX_PAGE_SIZE, USERS_ME, PERSONS, \
+    RECENTS
+from apis.bulk import JSONLSink
+from apis.jobs import CheckpointedJob, JobStore
+from apis.state import StateStore
 from apis.tests.mock_response import MockResponse
+from apis.tests.stub_server import StubServer, paginated_persons_route
 
 
 def mocked_requests_get(url, **kwargs):
@@ -76,11 +90,55 @@ class TestePipedriveClass(unittest.TestCase):
         pipe = Pipedrive('correct_api_token_domain')
         except_pipe = Pipedrive('except_api_token')
         error_pipe = Pipedrive('error_api_token')
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             self.assertEqual('test_domain', pipe.get_domain())
             self.assertRaises(Exception, except_pipe.get_domain)
             self.assertRaises(Exception, error_pipe.get_domain)
 
+    def test_get_domain_cache(self) -> None:
+        """Asserts the users/me result is cached per instance and can be refreshed or invalidated."""
+
+        pipe = Pipedrive('correct_api_token_domain')
+        with patch('requests.Session.get', side_effect=mocked_requests_get) as mock_get:
+            self.assertEqual('test_domain', pipe.get_domain())
+            self.assertEqual('test_domain', pipe.get_domain())
+            self.assertEqual(1, mock_get.call_count)
+
+            self.assertEqual('test_domain', pipe.get_domain(refresh=True))
+            self.assertEqual(2, mock_get.call_count)
+
+            pipe.invalidate_domain()
+            pipe.get_domain()
+            self.assertEqual(3, mock_get.call_count)
+
+            with patch('apis.pipedrive.time.monotonic', return_value=10 ** 9):
+                pipe.get_domain()
+            self.assertEqual(4, mock_get.call_count)
+
+            no_cache_pipe = Pipedrive('correct_api_token_domain', domain_ttl=0)
+            no_cache_pipe.get_domain()
+            no_cache_pipe.get_domain()
+            self.assertEqual(6, mock_get.call_count)
+
+        self.assertRaises(ValueError, Pipedrive, 'token', domain_ttl=-1)
+
+    def test_get_persons_request_count(self) -> None:
+        """Asserts paging through N pages costs N persons requests and at most one users/me request."""
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: paginated_persons_route([f'contact_{i}' for i in range(50)])}
+
+        with StubServer(routes) as server:
+            pipe = Pipedrive('token')
+            pipe.base_url = server.url
+            self.assertEqual(50, len(list(pipe.iter_persons(page_size=10))))
+            self.assertEqual([PERSONS] * 5, [request[1] for request in server.requests])
+
+            server.requests.clear()
+            with self.assertLogs('APIs.Pipedrive', level='INFO') as logs:
+                self.assertEqual(50, len(list(pipe.iter_persons(page_size=10))))
+            self.assertEqual(sorted([USERS_ME] + [PERSONS] * 5), sorted(request[1] for request in server.requests))
+            self.assertIn('test_domain', logs.output[0])
+
     @patch('apis.pipedrive.Pipedrive.get_domain')
     def test_get_persons_exceptions(self, mock_getdomain) -> None:
         """Asserts the get_persons method catch the raised exceptions."""
@@ -91,7 +149,7 @@ class TestePipedriveClass(unittest.TestCase):
         self.assertRaises(ValueError, pipe.get_persons, start=-1, limit=0)
         self.assertRaises(ValueError, pipe.get_persons, start=0, limit=0)
 
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             # get method raises exception
             self.assertRaises(Exception, pipe.get_persons)
 
@@ -105,7 +163,7 @@ class TestePipedriveClass(unittest.TestCase):
         """Asserts the get_persons method works correctly with default arguments."""
 
         mock_getdomain.return_value = 'company'
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             pipe = Pipedrive('correct_api_token_persons')
             r_data, r_next_start = pipe.get_persons()
             self.assertEqual(['contact_1', 'contact_2', 'contact_3'], r_data)
@@ -121,7 +179,7 @@ class TestePipedriveClass(unittest.TestCase):
         """Asserts the get_persons method works correctly when arguments are provided."""
 
         mock_getdomain.return_value = 'company'
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             pipe = Pipedrive('correct_api_token_persons')
             r_data, r_next_start = pipe.get_persons(start=0, limit=3)
             self.assertEqual(['contact_1', 'contact_2', 'contact_3'], r_data)
@@ -132,7 +190,44 @@ class TestePipedriveClass(unittest.TestCase):
             self.assertEqual(None, r_data)
             self.assertEqual(None, r_next_start)
 
-    @patch('apis.api.API.post')
+    @patch('apis.pipedrive.Pipedrive.get_persons')
+    def test_iter_persons(self, mock_get_persons) -> None:
+        """Asserts the iter_persons method follows the pagination cursor across every page."""
+
+        pages = {0: (['contact_1', 'contact_2'], 2), 2: (['contact_3', 'contact_4'], 4), 4: (['contact_5'], None)}
+        mock_get_persons.side_effect = lambda start, limit: pages[start]
+
+        pipe = Pipedrive('correct_api_token_persons')
+        self.assertRaises(ValueError, pipe.iter_persons, page_size=0)
+        self.assertRaises(ValueError, pipe.iter_persons, prefetch=-1)
+
+        expected = ['contact_1', 'contact_2', 'contact_3', 'contact_4', 'contact_5']
+        self.assertEqual(expected, list(pipe.iter_persons(page_size=2)))
+        mock_get_persons.assert_called_with(start=4, limit=2)
+        self.assertEqual(expected, list(pipe.iter_persons(page_size=2, prefetch=2)))
+
+        # pages are requested on demand
+        mock_get_persons.reset_mock()
+        persons = pipe.iter_persons(page_size=2)
+        self.assertEqual('contact_1', next(persons))
+        self.assertEqual(1, mock_get_persons.call_count)
+
+        # empty collection
+        mock_get_persons.side_effect = lambda start, limit: (None, None)
+        self.assertEqual([], list(pipe.iter_persons(prefetch=1)))
+
+    @patch('apis.pipedrive.Pipedrive.get_persons')
+    def test_iter_persons_prefetch_exceptions(self, mock_get_persons) -> None:
+        """Asserts the iter_persons method re-raises the errors of prefetched pages."""
+
+        mock_get_persons.side_effect = [(['contact_1'], 1), Exception("Any Exception")]
+        pipe = Pipedrive('error_api_token')
+
+        persons = pipe.iter_persons(page_size=1, prefetch=1)
+        self.assertEqual('contact_1', next(persons))
+        self.assertRaises(Exception, next, persons)
+
+    @patch('apis.api.API._request')
     def test_update_person_exceptions(self, mock_post) -> None:
         """Asserts the update_person method catch the raised exceptions."""
 
@@ -152,7 +247,7 @@ class TestePipedriveClass(unittest.TestCase):
         # catch post raised exceptions
         self.assertRaises(Exception, pipe.update_person, id=1, person={"person": "name"})
 
-    @patch('apis.api.API.post')
+    @patch('apis.api.API._request')
     def test_update_person(self, mock_post) -> None:
         """Asserts the update_person method works correctly."""
 
@@ -167,3 +262,316 @@ class TestePipedriveClass(unittest.TestCase):
 
         pipe = Pipedrive('healthy_token')
         self.assertEqual(expected, pipe.update_person(1, {"person": "name"}))
+        mock_post.assert_called_once_with('put', url=f'{pipe.base_url}{PERSONS}1',
+                                          params={'api_token': 'healthy_token'}, stats=None, endpoint_key='person',
+                                          json={"person": "name"})
+        self.assertNotIn('contact_update', pipe.api_source["endpoints"])
+
+    def test_bulk_update_persons(self) -> None:
+        """Asserts the bulk_update_persons method sends every update to its own contact and summarizes them."""
+
+        def update_route(id):
+            def route(method, query, body):
+                person = json.loads(body)
+                if method != 'PUT' or person["id"] != id:
+                    return 400, {"success": False, "error": "Wrong contact", "error_info": "Wrong contact"}
+                return 200, {"success": True, "data": person}
+            return route
+
+        routes = {f'{PERSONS}{id}': update_route(id) for id in range(50)}
+        routes[f'{PERSONS}7'] = (404, {"success": False, "error": "Not found", "error_info": "Not found"})
+
+        with StubServer(routes) as server:
+            pipe = Pipedrive('healthy_token')
+            pipe.base_url = server.url
+            summary = pipe.bulk_update_persons(((id, {"id": id}) for id in range(50)), max_workers=8)
+
+        self.assertEqual(sorted(set(range(50)) - {7}), sorted(summary["updated"]))
+        self.assertEqual([7], list(summary["failed"]))
+        self.assertIn('Not found', summary["failed"][7])
+
+    def test_export_persons(self) -> None:
+        """
+        Asserts export_persons writes every contact once and in order, whatever order the pages complete in.
+        """
+        persons = [{"id": i, "name": f'contact_{i}'} for i in range(95)]
+        # the second page repeats the last contact of the first
+        paginated = paginated_persons_route(persons[:10] + persons[9:])
+
+        def persons_route(method, query, body):
+            # the earlier pages are the slower ones
+            time.sleep(0.002 * max(0, 5 - int(query['start']) // int(query['limit'])))
+            return paginated(method, query, body)
+
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: persons_route}
+
+        with StubServer(routes) as server:
+            pipe = Pipedrive('token')
+            pipe.base_url = server.url
+            output = io.BytesIO()
+            sink = JSONLSink(output)
+            summary = pipe.export_persons(sink, page_size=10, max_workers=4)
+
+            starts = [int(request[2]['start']) for request in server.requests if request[1] == PERSONS]
+            self.assertEqual(list(range(0, 100, 10)), sorted(starts)[:10])
+            self.assertEqual(len(starts), len(set(starts)))
+            self.assertLessEqual(len(starts), 10 + 2 * 4)
+
+        self.assertEqual(persons, [json.loads(line) for line in output.getvalue().splitlines()])
+        self.assertEqual(95, sink.count)
+        self.assertEqual({"exported": 95, "duplicates": 1, "pages": len(starts)}, summary)
+
+        collected = []
+        with StubServer({PERSONS: (500, {"success": False, "error": "Down", "error_info": "Down"})}) as server:
+            pipe.base_url = server.url
+            self.assertRaises(Exception, pipe.export_persons, collected.append, max_workers=2)
+        self.assertEqual([], collected)
+        self.assertRaises(ValueError, pipe.export_persons, collected.append, page_size=0)
+        self.assertRaises(ValueError, pipe.export_persons, collected.append, page_size=MAX_PAGE_SIZE + 1)
+
+        # the server lowers the limit, so the computed starts would skip contacts
+        with StubServer({PERSONS: paginated_persons_route(persons, max_limit=5)}) as server:
+            pipe.base_url = server.url
+            with self.assertRaisesRegex(Exception, 'continues at [0-9]+ instead of'):
+                pipe.export_persons(collected.append, page_size=10, max_workers=2)
+        self.assertEqual([], collected)
+
+    def test_sync_persons(self) -> None:
+        """
+        Asserts the first sync scans every contact and the next ones only request the changes since the high-water mark.
+        """
+        persons = [{"id": i, "name": f'contact_{i}', "update_time": f'2024-01-0{1 + i % 3} 10:00:00'}
+                   for i in range(25)]
+
+        recents = [{"item": "person", "id": 3, "data": {"id": 3, "update_time": '2024-01-04 09:00:00'}},
+                   {"item": "person", "id": 4, "data": None},
+                   {"item": "person", "id": 5, "data": {"id": 5, "active_flag": False,
+                                                        "update_time": '2024-01-04 10:00:00'}}]
+
+        def recents_route(method, query, body):
+            start, limit = int(query['start']), int(query['limit'])
+            last = '2024-01-04 09:00:00' if start == 0 else '2024-01-04 10:00:00'
+            return 200, {"success": True, "data": recents[start:start + limit],
+                         "additional_data": {"last_timestamp_on_page": last,
+                                             "pagination": {"more_items_in_collection": start + limit < 3,
+                                                            "next_start": start + limit}}}
+
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: paginated_persons_route(persons), RECENTS: recents_route}
+
+        with tempfile.TemporaryDirectory() as directory, StubServer(routes) as server:
+            state = StateStore(os.path.join(directory, 'state.json'))
+            pipe = Pipedrive('token')
+            pipe.base_url = server.url
+
+            changes = list(pipe.sync_persons(state, page_size=10))
+            self.assertEqual([PersonChange(PersonChange.UPSERT, person["id"], person) for person in persons], changes)
+            self.assertNotIn(RECENTS, [request[1] for request in server.requests])
+            self.assertEqual(['2024-01-03 10:00:00'], list(state._state.values()))
+            self.assertNotIn('token', list(state._state)[0])
+
+            server.requests.clear()
+            changes = list(pipe.sync_persons(state, page_size=2))
+            self.assertEqual([(PersonChange.UPSERT, 3), (PersonChange.DELETE, 4), (PersonChange.DELETE, 5)],
+                             [(change.action, change.id) for change in changes])
+            recents_requests = [request[2] for request in server.requests if request[1] == RECENTS]
+            self.assertEqual(2, len(recents_requests))
+            self.assertEqual({'2024-01-03 10:00:00'}, {query['since_timestamp'] for query in recents_requests})
+            self.assertEqual({'person'}, {query['items'] for query in recents_requests})
+            self.assertNotIn(PERSONS, [request[1] for request in server.requests])
+            self.assertEqual(['2024-01-04 10:00:00'], list(state._state.values()))
+
+            # an interrupted sync keeps the mark of the last consumed page
+            state.set('partial', '2024-01-03 10:00:00')
+            changes = pipe.sync_persons(state, state_key='partial', page_size=2)
+            next(changes)
+            next(changes)
+            next(changes)
+            changes.close()
+            self.assertEqual('2024-01-04 09:00:00', state.get('partial'))
+
+            # a contact changed during the scan may be on a page already read, the mark is the time the scan started
+            persons[-1] = dict(persons[-1], update_time='2999-01-01 10:00:00')
+            scan_started = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0, tzinfo=None)
+            list(pipe.sync_persons(state, state_key='edited', page_size=10))
+            mark = datetime.datetime.strptime(state.get('edited'), '%Y-%m-%d %H:%M:%S')
+            self.assertLessEqual(scan_started, mark)
+            self.assertLessEqual(mark, datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None))
+
+        self.assertRaises(ValueError, pipe.sync_persons, state, page_size=0)
+
+    def test_compact_persons(self) -> None:
+        """
+        Asserts the contacts are loaded as compact records and column batches with the nested objects reduced.
+        """
+        persons = [{"id": i, "name": f'contact_{i}', "update_time": '2024-01-01 00:00:00',
+                    "email": [{"value": f'other_{i}@test.com', "primary": False},
+                              {"value": f'contact_{i}@test.com', "primary": True}],
+                    "phone": [{"value": '', "primary": True}],
+                    "owner_id": {"value": 7, "name": 'Owner'}, "owner_name": 'Owner',
+                    "org_id": {"value": 3, "name": 'Org'} if i % 2 else None, "org_name": None}
+                   for i in range(25)]
+
+        record = next(compact_persons(persons[1:]))
+        self.assertEqual({"id": 1, "name": 'contact_1', "email": ('contact_1@test.com', 'other_1@test.com'),
+                          "phone": (), "owner_name": 'Owner', "org_name": 'Org',
+                          "update_time": '2024-01-01 00:00:00'}, record.to_dict())
+        record = next(compact_persons(persons, ('id', 'owner_id', 'org_id', 'org_name')))
+        self.assertEqual({"id": 0, "owner_id": 7, "org_id": None, "org_name": None}, record.to_dict())
+
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: paginated_persons_route(persons)}
+        with StubServer(routes) as server:
+            pipe = Pipedrive('token')
+            pipe.base_url = server.url
+            records = list(pipe.iter_person_records(('id', 'owner_name'), page_size=10))
+            batch = pipe.load_persons_batch(('id', 'org_id'), page_size=10, prefetch=1)
+
+        self.assertEqual(list(range(25)), [record.id for record in records])
+        self.assertIs(records[0].owner_name, records[-1].owner_name)
+        self.assertEqual(25, len(batch))
+        self.assertEqual([3 if i % 2 else None for i in range(25)], batch.column('org_id'))
+        self.assertEqual({"id": 1, "org_id": 3}, batch[1])
+        self.assertRaises(ValueError, pipe.iter_person_records, ('id', 'id'))
+
+    def test_key_pool(self) -> None:
+        """
+        Asserts the requests are spread over the tokens of the pool and a throttled or rejected token is replaced
+        right away by another one.
+        """
+        def persons_route(method, query, body):
+            if query['api_token'] == 'token_throttled':
+                return 429, {"success": False, "error": "Too many requests"}, {"Retry-After": '60'}
+            if query['api_token'] == 'token_revoked':
+                return 401, {"success": False, "error": "Unauthorized"}
+            return 200, {"success": True, "data": [{"id": 1}],
+                         "additional_data": {"pagination": {"more_items_in_collection": False}}}
+
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: persons_route}
+        pool = KeyPool(['token_throttled', 'token_revoked', 'token_1', 'token_2'])
+        with StubServer(routes) as server:
+            pipe = Pipedrive(key_pool=pool)
+            pipe.base_url = server.url
+            self.assertEqual('token_throttled', pipe.token)
+            pipe.get_domain()
+
+            server.requests.clear()
+            stats = RequestStats()
+            self.assertEqual([{"id": 1}], pipe.get("persons", params={'api_token': pipe.token},
+                                                   stats=stats)["response"]["data"])
+            self.assertEqual(['token_revoked', 'token_1'], [request[2]['api_token'] for request in server.requests])
+            self.assertEqual(2, stats.attempts)
+
+            for _ in range(10):
+                pipe.get_persons()
+
+        usage = {key: counters for key, counters in zip(pool.keys, pool.usage())}
+        self.assertEqual('throttled', usage['token_throttled']["state"])
+        self.assertEqual('rejected', usage['token_revoked']["state"])
+        self.assertEqual(1, usage['token_throttled']["throttled"])
+        self.assertEqual([5, 6], sorted([usage['token_1']["requests"], usage['token_2']["requests"]]))
+        self.assertEqual(0, sum(counters["in_flight"] for counters in pool.usage()))
+        self.assertRaises(ValueError, Pipedrive)
+
+    def test_checkpointed_export_persons(self) -> None:
+        """
+        Asserts an interrupted checkpointed export resumes from the page it stopped at.
+        """
+        persons = [{"id": i, "name": f'contact_{i}'} for i in range(25)]
+        failures = []
+        paginated = paginated_persons_route(persons)
+
+        def persons_route(method, query, body):
+            if query['start'] == '10' and not failures:
+                failures.append(10)
+                return 500, {"success": False, "error": "Down", "error_info": "Down"}
+            return paginated(method, query, body)
+
+        routes = {USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+                  PERSONS: persons_route}
+        with tempfile.TemporaryDirectory() as directory, JobStore(os.path.join(directory, 'jobs.db')) as store, \
+                StubServer(routes) as server:
+            pipe = Pipedrive('token')
+            pipe.base_url = server.url
+            job = CheckpointedJob(store, 'persons')
+
+            self.assertRaises(Exception, pipe.checkpointed_export_persons, job, page_size=10)
+            server.requests.clear()
+            self.assertEqual({"processed": 15, "duplicates": 0, "pages": 2},
+                             pipe.checkpointed_export_persons(job, page_size=10))
+            self.assertEqual(['10', '20'], [request[2]['start'] for request in server.requests
+                                            if request[1] == PERSONS])
+            self.assertEqual(persons, [person for id, person in job.outputs()])
+        self.assertRaises(ValueError, pipe.checkpointed_export_persons, job, page_size=0)
+
+
+def stub_routes(method, query, body):
+    """
+    Method responsible for simulating the Pipedrive API on the local stub server.
+    """
+    response = mocked_requests_get('', params=query)
+    return response.status_code, response.data
+
+
+class TestAsyncPipedriveClass(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.server = StubServer({USERS_ME: stub_routes, PERSONS: stub_routes,
+                                  f'{PERSONS}1': (200, {"success": True, "data": {"id": 1}})})
+        self.server.__enter__()
+
+    def tearDown(self) -> None:
+        self.server.__exit__(None, None, None)
+
+    def pipedrive(self, token: str) -> AsyncPipedrive:
+        pipe = AsyncPipedrive(token)
+        pipe.base_url = self.server.url
+        return pipe
+
+    async def test_get_domain(self) -> None:
+        """Asserts the get_domain method works correctly."""
+
+        async with self.pipedrive('correct_api_token_domain') as pipe:
+            self.assertEqual('test_domain', await pipe.get_domain())
+        async with self.pipedrive('error_api_token') as error_pipe:
+            with self.assertRaises(Exception):
+                await error_pipe.get_domain()
+
+    async def test_get_persons(self) -> None:
+        """Asserts the get_persons method works correctly."""
+
+        async with self.pipedrive('correct_api_token_persons') as pipe:
+            pipe.get_domain = AsyncMock(return_value='company')
+            self.assertEqual((['contact_1', 'contact_2', 'contact_3'], 4), await pipe.get_persons(start=0, limit=3))
+            self.assertEqual((['contact_1', 'contact_2', 'contact_3'], None), await pipe.get_persons())
+            with self.assertRaises(ValueError):
+                await pipe.get_persons(start=0, limit=0)
+
+        async with self.pipedrive('error_api_token') as error_pipe:
+            error_pipe.get_domain = AsyncMock(return_value='company')
+            with self.assertRaises(Exception):
+                await error_pipe.get_persons()
+
+    async def test_update_person(self) -> None:
+        """Asserts the update_person method works correctly."""
+
+        async with self.pipedrive('healthy_token') as pipe:
+            self.assertEqual({"success": True, "data": {"id": 1}}, await pipe.update_person(1, {"name": "name"}))
+            self.assertEqual('PUT', self.server.requests[-1][0])
+            with self.assertRaises(Exception):
+                await pipe.update_person(2, {"name": "name"})
+
+    async def test_key_pool(self) -> None:
+        """Asserts the concurrent requests are spread over the tokens of the pool."""
+
+        pool = KeyPool(['correct_api_token_persons', 'correct_api_token_persons_empty'])
+        async with AsyncPipedrive(key_pool=pool, concurrency=4) as pipe:
+            pipe.base_url = self.server.url
+            pipe.get_domain = AsyncMock(return_value='company')
+            await asyncio.gather(*(pipe.get_persons(start=0, limit=3) for _ in range(4)))
+
+        tokens = [request[2]['api_token'] for request in self.server.requests]
+        self.assertEqual(2, tokens.count('correct_api_token_persons_empty'))
+        self.assertEqual([0, 0], [counters["in_flight"] for counters in pool.usage()])
@@ -1,9 +1,16 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
 from requests.exceptions import Timeout
 
-from apis.proxycurl import Proxycurl
+from apis.api import RequestStats
+from apis.cache import ResponseCache
+from apis.jobs import CheckpointedJob, JobStore
+from apis.keypool import KeyPool
+from apis.proxycurl import Proxycurl, AsyncProxycurl, DATA_FROM_PROFILE, URL_FROM_EMAIL
 from apis.tests.mock_response import MockResponse
+from apis.tests.stub_server import StubServer
 
 
 def mocked_requests_get(url, **kwargs):
@@ -38,7 +45,7 @@ class TesteProxycurlClass(unittest.TestCase):
         Asserts "get_linkedin_profile" method catch raised exceptions.
         """
         problem_api = Proxycurl('invalid_api_key')
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             self.assertRaises(Exception, problem_api.get_linkedin_profile, 'linkedin.com/in/exception')
             self.assertRaises(Timeout, problem_api.get_linkedin_profile, 'linkedin.com/in/timeout')
 
@@ -47,7 +54,7 @@ class TesteProxycurlClass(unittest.TestCase):
         Asserts "get_linkedin_profile" returns correct values.
         """
         problem_api = Proxycurl('invalid_api_key')
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             bad_response = problem_api.get_linkedin_profile('linkedin.com/in/nope')
             self.assertEqual({"error": "Invalid API Key"}, bad_response["response"])
             healthy_api = Proxycurl('api_key')
@@ -59,7 +66,7 @@ class TesteProxycurlClass(unittest.TestCase):
         Asserts "get_url_from_work_email" method catch raised exceptions.
         """
         problem_api = Proxycurl('invalid_api_key')
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get):
             self.assertRaises(Exception, problem_api.get_url_from_work_email, 'exception@email.com')
             self.assertRaises(Timeout, problem_api.get_url_from_work_email, 'timeout@email.com')
 
@@ -68,9 +75,159 @@ class TesteProxycurlClass(unittest.TestCase):
         Asserts "get_url_from_work_email" returns correct values.
         """
         problem_api = Proxycurl("invalid_api_key")
-        with patch('requests.get', side_effect=mocked_requests_get):
+        with patch('requests.Session.get', side_effect=mocked_requests_get) as mock_get:
             bad_response = problem_api.get_url_from_work_email('bad@email.com')
             self.assertEqual({"error": "Invalid API Key"}, bad_response["response"])
             healthy_api = Proxycurl('api_key')
             response = healthy_api.get_url_from_work_email('user@email.com')
             self.assertEqual({"key": "url"}, response["response"])
+            self.assertTrue(mock_get.call_args.args[0].endswith(URL_FROM_EMAIL))
+
+
+    def test_bulk_lookups(self) -> None:
+        """
+        Asserts the bulk lookups stream every result with its input and report failed items.
+        """
+        with StubServer({DATA_FROM_PROFILE: stub_routes, URL_FROM_EMAIL: stub_routes}) as server:
+            proxycurl = Proxycurl('api_key')
+            proxycurl.base_url = server.url
+
+            urls = ['linkedin.com/in/profile', 'linkedin.com/in/nope'] * 5
+            results = list(proxycurl.bulk_get_linkedin_profiles(urls, max_workers=3))
+            self.assertEqual(sorted(urls), sorted(result.item for result in results))
+            for result in results:
+                if result.item == 'linkedin.com/in/profile':
+                    self.assertEqual({"key": "data"}, result.value["response"])
+                else:
+                    self.assertFalse(result.ok)
+                    self.assertIn('401', str(result.error))
+
+            server.requests.clear()
+            results = {result.item: result for result in proxycurl.bulk_resolve_emails(['user@email.com'])}
+            self.assertEqual({"key": "url"}, results['user@email.com'].value["response"])
+            self.assertEqual([URL_FROM_EMAIL], [request[1] for request in server.requests])
+
+
+    def test_response_cache(self) -> None:
+        """
+        Asserts cached lookups are answered without requests, even with another API key.
+        """
+        cache = ResponseCache()
+        with StubServer({DATA_FROM_PROFILE: stub_routes}) as server:
+            proxycurl = Proxycurl('api_key', response_cache=cache)
+            proxycurl.base_url = server.url
+            other_key = Proxycurl('other_api_key', response_cache=cache)
+            other_key.base_url = server.url
+
+            first = proxycurl.get_linkedin_profile('linkedin.com/in/profile')
+            stats = RequestStats()
+            self.assertEqual(first, other_key.get_linkedin_profile('linkedin.com/in/profile', stats=stats))
+            self.assertTrue(stats.from_cache)
+            self.assertEqual(200, stats.status_code)
+            self.assertEqual(1, len(server.requests))
+
+            # the bulk lookups answered by the cache are successful items
+            results = list(proxycurl.bulk_get_linkedin_profiles(['linkedin.com/in/profile'] * 2, max_workers=2))
+            self.assertEqual([True, True], [result.ok for result in results])
+            self.assertEqual(1, len(server.requests))
+
+            # error responses are not cached
+            proxycurl.get_linkedin_profile('linkedin.com/in/nope')
+            proxycurl.get_linkedin_profile('linkedin.com/in/nope')
+            self.assertEqual(3, len(server.requests))
+
+    def test_key_pool(self) -> None:
+        """
+        Asserts each lookup is authenticated with a key of the pool and a throttled key is replaced right away.
+        """
+        def throttled_key(url, headers=None, **kwargs):
+            if headers['Authorization'] == 'Bearer key_a':
+                return MockResponse({"error": "Too many requests"}, 429, headers={"Retry-After": '60'})
+            return MockResponse({"key": "data"}, 200)
+
+        pool = KeyPool(['key_a', 'key_b'])
+        proxycurl = Proxycurl(key_pool=pool)
+        with patch('requests.Session.get', side_effect=throttled_key) as mock_get:
+            self.assertEqual({"key": "data"}, proxycurl.get_linkedin_profile('linkedin.com/in/profile')["response"])
+            self.assertEqual({"key": "data"}, proxycurl.get_linkedin_profile('linkedin.com/in/other')["response"])
+        self.assertEqual(['Bearer key_a', 'Bearer key_b', 'Bearer key_b'],
+                         [call.kwargs['headers']['Authorization'] for call in mock_get.call_args_list])
+        self.assertEqual(['throttled', 'active'], [counters["state"] for counters in pool.usage()])
+
+    def test_checkpointed_lookups(self) -> None:
+        """
+        Asserts a checkpointed job requests only the profiles not completed by its previous runs.
+        """
+        with tempfile.TemporaryDirectory() as directory, JobStore(os.path.join(directory, 'jobs.db')) as store, \
+                StubServer({DATA_FROM_PROFILE: stub_routes, URL_FROM_EMAIL: stub_routes}) as server:
+            proxycurl = Proxycurl('api_key')
+            proxycurl.base_url = server.url
+            job = CheckpointedJob(store, 'profiles')
+
+            urls = ['linkedin.com/in/profile', 'linkedin.com/in/nope']
+            self.assertEqual({"processed": 1, "skipped": 0, "failed": 1},
+                             proxycurl.checkpointed_get_linkedin_profiles(job, urls, max_workers=2))
+            server.requests.clear()
+            self.assertEqual({"processed": 0, "skipped": 1, "failed": 1},
+                             proxycurl.checkpointed_get_linkedin_profiles(job, urls, max_workers=2))
+            self.assertEqual([{"url": 'linkedin.com/in/nope'}], [request[2] for request in server.requests])
+            self.assertEqual([('linkedin.com/in/profile', {"response": {"key": "data"}})], list(job.outputs()))
+
+            emails_job = CheckpointedJob(store, 'emails')
+            self.assertEqual({"processed": 1, "skipped": 1, "failed": 0},
+                             proxycurl.checkpointed_resolve_emails(emails_job, ['user@email.com'] * 2))
+
+
+def stub_routes(method, query, body):
+    """
+    Method responsible for simulating the Proxycurl API on the local stub server.
+    """
+    response = mocked_requests_get('', params=query)
+    return response.status_code, response.data
+
+
+class TestAsyncProxycurlClass(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.server = StubServer({DATA_FROM_PROFILE: stub_routes, URL_FROM_EMAIL: stub_routes})
+        self.server.__enter__()
+
+    def tearDown(self) -> None:
+        self.server.__exit__(None, None, None)
+
+    def proxycurl(self, api_key: str) -> AsyncProxycurl:
+        proxycurl = AsyncProxycurl(api_key)
+        proxycurl.base_url = self.server.url
+        return proxycurl
+
+    async def test_get_linkedin_profile(self) -> None:
+        """
+        Asserts "get_linkedin_profile" returns correct values.
+        """
+        async with self.proxycurl('api_key') as proxycurl:
+            response = await proxycurl.get_linkedin_profile('linkedin.com/in/profile')
+            self.assertEqual({"key": "data"}, response["response"])
+            bad_response = await proxycurl.get_linkedin_profile('linkedin.com/in/nope')
+            self.assertEqual({"error": "Invalid API Key"}, bad_response["response"])
+
+    async def test_get_url_from_work_email(self) -> None:
+        """
+        Asserts "get_url_from_work_email" returns correct values from the email endpoint.
+        """
+        async with self.proxycurl('api_key') as proxycurl:
+            response = await proxycurl.get_url_from_work_email('user@email.com')
+            self.assertEqual({"key": "url"}, response["response"])
+            self.assertEqual(URL_FROM_EMAIL, self.server.requests[-1][1])
+
+    async def test_bulk_lookups(self) -> None:
+        """
+        Asserts the async bulk lookups stream every result with its input and report failed items.
+        """
+        async with self.proxycurl('api_key') as proxycurl:
+            results = {result.item: result async for result in
+                       proxycurl.bulk_resolve_emails(['user@email.com', 'bad@email.com'], max_workers=2)}
+            self.assertEqual({"key": "url"}, results['user@email.com'].value["response"])
+            self.assertFalse(results['bad@email.com'].ok)
+
+            results = [result async for result in proxycurl.bulk_get_linkedin_profiles(['linkedin.com/in/profile'])]
+            self.assertEqual({"key": "data"}, results[0].value["response"])
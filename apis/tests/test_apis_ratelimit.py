@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from apis.ratelimit import TokenBucket
+
+
+class TestTokenBucketClass(unittest.TestCase):
+
+    def test_constructor(self) -> None:
+        """
+        Asserts the TokenBucket parameters are validated.
+        """
+        self.assertRaises(ValueError, TokenBucket, rate=0)
+        self.assertRaises(ValueError, TokenBucket, rate=1, capacity=0)
+        self.assertEqual(5, TokenBucket(rate=5).capacity)
+        self.assertEqual(1, TokenBucket(rate=0.5).capacity)
+
+    def test_reserve(self) -> None:
+        """
+        Asserts the burst is served right away and the following requests wait for the refill.
+        """
+        with patch('apis.ratelimit.time.monotonic', return_value=100):
+            bucket = TokenBucket(rate=10, capacity=3)
+            self.assertEqual([0, 0, 0], [bucket.reserve() for _ in range(3)])
+            self.assertAlmostEqual(0.1, bucket.reserve())
+            self.assertAlmostEqual(0.2, bucket.reserve())
+
+        with patch('apis.ratelimit.time.monotonic', return_value=101):
+            # the bucket never holds more than its capacity
+            self.assertEqual(3, bucket.available)
+
+    def test_acquire_threads(self) -> None:
+        """
+        Asserts concurrent threads sharing a bucket do not go over its rate.
+        """
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_acquire_async(self) -> None:
+        """
+        Asserts concurrent tasks sharing a bucket do not go over its rate.
+        """
+        bucket = TokenBucket(rate=100, capacity=1)
+
+        async def run():
+            await asyncio.gather(*[bucket.acquire_async() for _ in range(20)])
+
+        start = time.monotonic()
+        asyncio.run(run())
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_update_from_headers(self) -> None:
+        """
+        Asserts the bucket adapts to the quota reported by the API.
+        """
+        with patch('apis.ratelimit.time.monotonic', return_value=100):
+            bucket = TokenBucket(rate=10, capacity=10)
+            bucket.update_from_headers({'X-RateLimit-Remaining': '2', 'X-RateLimit-Reset': '1'})
+            self.assertEqual(2, bucket.available)
+
+            bucket.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '2'})
+            self.assertAlmostEqual(2, bucket.reserve())
+
+            bucket.update_from_headers({'X-RateLimit-Remaining': 'invalid'})
+            bucket.update_from_headers({})
+            self.assertAlmostEqual(-20, bucket.available)
+
+            static_bucket = TokenBucket(rate=10, capacity=10, adaptive=False)
+            static_bucket.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '2'})
+            self.assertEqual(10, static_bucket.available)
+
+    def test_shared(self) -> None:
+        """
+        Asserts instances using the same key share the same bucket.
+        """
+        bucket = TokenBucket.shared('test_shared_token', rate=5)
+        self.assertIs(bucket, TokenBucket.shared('test_shared_token', rate=50))
+        self.assertIsNot(bucket, TokenBucket.shared('test_other_token', rate=5))
+        self.assertNotIn('test_shared_token', TokenBucket._shared)
+
+        TokenBucket.release_shared('test_shared_token')
+        TokenBucket.release_shared('test_other_token')
+        self.assertIsNot(bucket, TokenBucket.shared('test_shared_token', rate=5))
+        TokenBucket.release_shared('test_shared_token')
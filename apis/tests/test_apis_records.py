@@ -0,0 +1,41 @@
+import unittest
+
+from apis.records import ColumnBatch, record_class
+
+
+class TestRecordsModule(unittest.TestCase):
+
+    def test_record_class(self) -> None:
+        """
+        Asserts the record classes are cached per field set and their records hold no dict.
+        """
+        cls = record_class('Item', ('id', 'name'))
+        self.assertIs(cls, record_class('Item', ['id', 'name']))
+        self.assertIsNot(cls, record_class('Item', ('id',)))
+
+        record = cls(1, 'name_1')
+        self.assertEqual({"id": 1, "name": 'name_1'}, record.to_dict())
+        self.assertEqual(cls(1, 'name_1'), record)
+        self.assertNotEqual(cls(2, 'name_1'), record)
+        self.assertEqual("Item(id=1, name='name_1')", repr(record))
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertRaises(AttributeError, setattr, record, 'other', 1)
+
+        for fields in ((), ('id', 'id'), ('id', 'not valid')):
+            self.assertRaises(ValueError, record_class, 'Item', fields)
+
+    def test_column_batch(self) -> None:
+        """
+        Asserts a ColumnBatch stores records and sequences by column and rebuilds the items as dictionaries.
+        """
+        cls = record_class('Item', ('id', 'name'))
+        batch = ColumnBatch(('name', 'id'))
+        self.assertEqual(0, len(batch))
+
+        batch.append(cls(1, 'name_1'))
+        batch.append(('name_2', 2))
+        self.assertEqual(2, len(batch))
+        self.assertEqual([1, 2], batch.column('id'))
+        self.assertEqual(['name_1', 'name_2'], batch.column('name'))
+        self.assertEqual({"name": 'name_2', "id": 2}, batch[1])
+        self.assertEqual([{"name": 'name_1', "id": 1}, {"name": 'name_2', "id": 2}], batch.to_dicts())
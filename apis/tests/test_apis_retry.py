@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch
+
+import requests.exceptions
+
+from apis.retry import RetryPolicy
+
+
+class TestRetryPolicyClass(unittest.TestCase):
+
+    def test_constructor(self) -> None:
+        """
+        Asserts the RetryPolicy parameters are validated.
+        """
+        self.assertRaises(ValueError, RetryPolicy, max_attempts=0)
+        self.assertRaises(ValueError, RetryPolicy, backoff_base=-1)
+        self.assertRaises(ValueError, RetryPolicy, backoff_cap=-1)
+
+    def test_should_retry_status(self) -> None:
+        """
+        Asserts only retryable status codes are retried, and non idempotent requests only on 429.
+        """
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry_status('get', 503, attempt=1))
+        self.assertTrue(policy.should_retry_status('get', 429, attempt=2))
+        self.assertFalse(policy.should_retry_status('get', 429, attempt=3))
+        self.assertFalse(policy.should_retry_status('get', 404, attempt=1))
+
+        self.assertTrue(policy.should_retry_status('post', 429, attempt=1))
+        self.assertFalse(policy.should_retry_status('post', 503, attempt=1))
+        self.assertTrue(RetryPolicy(retry_non_idempotent=True).should_retry_status('post', 503, attempt=1))
+
+    def test_should_retry_exception(self) -> None:
+        """
+        Asserts timeouts and connection errors are retried, and non idempotent requests only on connect timeouts.
+        """
+        policy = RetryPolicy(max_attempts=2)
+        self.assertTrue(policy.should_retry_exception('get', requests.exceptions.ReadTimeout(), attempt=1))
+        self.assertTrue(policy.should_retry_exception('get', requests.exceptions.ConnectionError(), attempt=1))
+        self.assertFalse(policy.should_retry_exception('get', requests.exceptions.ReadTimeout(), attempt=2))
+        self.assertFalse(policy.should_retry_exception('get', requests.exceptions.TooManyRedirects(), attempt=1))
+
+        self.assertTrue(policy.should_retry_exception('post', requests.exceptions.ConnectTimeout(), attempt=1))
+        self.assertFalse(policy.should_retry_exception('post', requests.exceptions.ReadTimeout(), attempt=1))
+
+    def test_delay(self) -> None:
+        """
+        Asserts the delay is an exponential backoff with full jitter, replaced by the Retry-After header.
+        """
+        policy = RetryPolicy(backoff_base=1, backoff_cap=5, retry_after_cap=60)
+        with patch('apis.retry.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([1, 2, 4, 5, 5], [policy.delay(attempt) for attempt in range(1, 6)])
+        for attempt in range(1, 6):
+            self.assertTrue(0 <= policy.delay(attempt) <= 5)
+
+        self.assertEqual(7, policy.delay(1, retry_after='7'))
+        self.assertEqual(60, policy.delay(1, retry_after='3600'))
+        self.assertEqual(0, policy.delay(1, retry_after='Wed, 21 Oct 2015 07:28:00 GMT'))
+        self.assertTrue(0 <= policy.delay(1, retry_after='invalid') <= 1)
+        self.assertTrue(0 <= RetryPolicy(respect_retry_after=False).delay(1, retry_after='7') <= 0.5)
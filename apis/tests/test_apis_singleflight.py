@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from apis.singleflight import SingleFlight, AsyncSingleFlight, flight_key
+
+
+class TestSingleFlightClass(unittest.TestCase):
+
+    def test_do(self) -> None:
+        """
+        Asserts concurrent calls of the same key run the function once and all receive its value, or exception.
+        """
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            release.wait(5)
+            if len(calls) > 1:
+                raise ValueError('second call')
+            return {"value": 1}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(flight.do, 'key', func) for _ in range(5)]
+            while flight.in_flight() == 0:
+                pass
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual([{"value": 1}] * 5, [value for value, _ in results])
+        self.assertEqual(4, sum(shared for _, shared in results))
+        self.assertEqual(0, flight.in_flight())
+
+        # the call is over, so the next one runs the function again
+        self.assertRaises(ValueError, flight.do, 'key', func)
+        self.assertEqual(({"value": 2}, False), flight.do('other', lambda: {"value": 2}))
+
+    def test_flight_key(self) -> None:
+        """
+        Asserts the key depends on the url, params and every header, including the credentials.
+        """
+        self.assertEqual(flight_key('url', {"a": 1, "b": 2}), flight_key('url', {"b": 2, "a": 1}, {}))
+        self.assertNotEqual(flight_key('url', {"a": 1}), flight_key('url', {"a": 2}))
+        self.assertNotEqual(flight_key('url', headers={"Authorization": "Bearer a"}),
+                            flight_key('url', headers={"Authorization": "Bearer b"}))
+
+
+class TestAsyncSingleFlightClass(unittest.IsolatedAsyncioTestCase):
+
+    async def test_do(self) -> None:
+        """
+        Asserts concurrent tasks of the same key await the function once and share its value, or exception.
+        """
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        results = await asyncio.gather(*[flight.do('key', func) for _ in range(5)])
+        self.assertEqual([(1, False)] + [(1, True)] * 4, results)
+        self.assertEqual(0, flight.in_flight())
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+
+        results = await asyncio.gather(*[flight.do('key', fail) for _ in range(3)], return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+        # a cancelled waiter does not cancel the shared call
+        leader = asyncio.ensure_future(flight.do('key', func))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do('key', func))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        self.assertEqual((2, False), await leader)
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+from apis.state import StateStore
+
+
+class TestStateStoreClass(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'state.json')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_persistence(self) -> None:
+        """
+        Asserts the values survive a new StateStore and no temporary file is left behind.
+        """
+        store = StateStore(self.path)
+        self.assertIsNone(store.get('cursor'))
+        self.assertEqual('default', store.get('cursor', 'default'))
+        self.assertFalse(os.path.exists(self.path))
+
+        store.set('cursor', '2024-01-01 00:00:00')
+        store.set('other', {"start": 10})
+        self.assertEqual(['state.json'], os.listdir(self.directory.name))
+
+        reopened = StateStore(self.path)
+        self.assertEqual('2024-01-01 00:00:00', reopened.get('cursor'))
+        self.assertEqual({"start": 10}, reopened.get('other'))
+
+        reopened.delete('other')
+        reopened.delete('missing')
+        with open(self.path) as file:
+            self.assertEqual({"cursor": '2024-01-01 00:00:00'}, json.load(file))
+
+    def test_failed_write(self) -> None:
+        """
+        Asserts a value that can not be serialized leaves the previous state untouched.
+        """
+        store = StateStore(self.path)
+        store.set('cursor', 1)
+        self.assertRaises(TypeError, store.set, 'bad', object())
+        self.assertEqual(['state.json'], os.listdir(self.directory.name))
+        self.assertIsNone(store.get('bad'))
+        self.assertEqual({"cursor": 1}, StateStore(self.path)._state)
+
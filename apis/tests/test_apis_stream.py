@@ -0,0 +1,90 @@
+import json
+import unittest
+from unittest.mock import Mock
+
+from apis.stream import iter_json_items, iter_response
+
+PAGE = {
+    "success": True,
+    "data": [
+        {"id": 1, "name": "Zoë \"Z\" \\ O'Neil", "tags": ["a", {"b": [1, 2]}], "org": None},
+        {"id": 2, "name": "名前", "emails": [{"value": "a@b.c", "primary": True}], "score": -1.5e3},
+        {"id": 3, "name": "}]{[,:", "emails": []},
+    ],
+    "additional_data": {"pagination": {"start": 0, "limit": 3, "more_items_in_collection": False}}
+}
+
+
+def chunked(document, size: int):
+    raw = json.dumps(document, ensure_ascii=False, indent=1).encode('utf-8')
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestIterJsonItems(unittest.TestCase):
+
+    def test_items(self) -> None:
+        """
+        Asserts the items are decoded whatever the chunk boundaries are, including inside strings, escape sequences
+        and multi-byte characters.
+        """
+        for size in (1, 2, 3, 7, 64, 4096):
+            self.assertEqual(PAGE["data"], list(iter_json_items(chunked(PAGE, size), 'data.*')))
+            self.assertEqual([[{"value": "a@b.c", "primary": True}], []],
+                             list(iter_json_items(chunked(PAGE, size), 'data.*.emails')))
+            self.assertEqual([PAGE["additional_data"]["pagination"]],
+                             list(iter_json_items(chunked(PAGE, size), 'additional_data.pagination')))
+            self.assertEqual([1, 2, 3], list(iter_json_items(chunked([1, 2, 3], size))))
+
+    def test_empty(self) -> None:
+        """
+        Asserts empty arrays, null values and missing keys yield nothing.
+        """
+        self.assertEqual([], list(iter_json_items([b'{"data": null, "success": true}'], 'data.*')))
+        self.assertEqual([], list(iter_json_items([b'{"data": []}'], 'data.*')))
+        self.assertEqual([], list(iter_json_items([b'{}'], 'data.*')))
+        self.assertEqual([], list(iter_json_items([b'{"success": true}'], 'data.*')))
+
+    def test_invalid(self) -> None:
+        """
+        Asserts invalid paths and documents raise ValueError.
+        """
+        self.assertRaises(ValueError, iter_json_items, [b'[]'], '')
+        self.assertRaises(ValueError, list, iter_json_items([b'{"data": {"id": 1}}'], 'data.*'))
+        self.assertRaises(ValueError, list, iter_json_items([b'{"data": [{"id": 1}'], 'data.*'))
+        self.assertRaises(ValueError, list, iter_json_items([b'{"data": ["unterminated'], 'data.*'))
+
+    def test_incremental(self) -> None:
+        """
+        Asserts every item is yielded before the following chunks are read.
+        """
+        read = []
+
+        def chunks():
+            for chunk in (b'{"data": [{"id": 1},', b' {"id": 2},', b' {"id": 3}]}'):
+                read.append(chunk)
+                yield chunk
+
+        items = iter_json_items(chunks(), 'data.*')
+        self.assertEqual({"id": 1}, next(items))
+        self.assertEqual(1, len(read))
+        self.assertEqual({"id": 2}, next(items))
+        self.assertEqual(2, len(read))
+
+
+class TestIterResponse(unittest.TestCase):
+
+    def test_iter_response(self) -> None:
+        """
+        Asserts the response is closed once the body is consumed or the generator is closed.
+        """
+        response = Mock()
+        response.iter_content.return_value = iter([b'{"data": [1,', b' 2]}'])
+        self.assertEqual([b'{"data": [1,', b' 2]}'], list(iter_response(response)))
+        response.close.assert_called_once()
+
+        response = Mock()
+        response.iter_content.return_value = iter([b'{"data": [1,', b' 2]}'])
+        items = iter_response(response, 'data.*')
+        self.assertEqual(1, next(items))
+        items.close()
+        response.close.assert_called_once()
@@ -0,0 +1,72 @@
+import json
+import threading
+import unittest
+from unittest.mock import Mock
+
+import requests.exceptions
+
+from apis.api import API, RequestStats
+from apis.metrics import RequestHooks
+from apis.pipedrive import Pipedrive, USERS_ME, PERSONS
+from apis.tests.stub_server import StubServer, paginated_persons_route
+from apis.transport import HTTPXTransport, httpx
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class TestHTTPXTransportClass(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = StubServer({
+            "/data": lambda method, query, body: (200, {"method": method, "query": query,
+                                                        "body": json.loads(body) if body else None},
+                                                  {"X-Method": method}),
+            "/error": (401, {"error": "unauthorized"}),
+            "/slow": lambda method, query, body: threading.Event().wait(0.3) or (200, {}),
+            USERS_ME: (200, {"success": True, "data": {"company_domain": "test_domain"}}),
+            PERSONS: paginated_persons_route([{"id": i} for i in range(25)]),
+        })
+        self.server.__enter__()
+        self.source = {"endpoints": {"base_url": self.server.url, "data_key": "/data", "error_key": "/error",
+                                     "slow_key": "/slow"}}
+
+    def tearDown(self) -> None:
+        self.server.__exit__(None, None, None)
+
+    def test_requests(self) -> None:
+        """
+        Asserts the API works the same with the httpx transport.
+        """
+        hooks = Mock(spec=RequestHooks)
+        with API(api_source=self.source, transport=HTTPXTransport(), hooks=[hooks]) as api:
+            stats = RequestStats()
+            self.assertEqual({"method": "GET", "query": {"a": "1"}, "body": None},
+                             api.get('data_key', params={"a": 1}, stats=stats)["response"])
+            self.assertEqual(200, stats.status_code)
+            self.assertEqual({"a": 1}, api.post('data_key', json={"a": 1})["response"]["body"])
+            self.assertEqual("PUT", api.put('data_key', json={})["response"]["method"])
+            self.assertEqual("HEAD", api.head('data_key')["response"]["x-method"])
+            self.assertEqual({"error": "unauthorized"}, api.get('error_key')["response"])
+            self.assertEqual(["GET"], list(api.get('data_key', stream='method')["response"]))
+            self.assertRaises(requests.exceptions.Timeout, api.get, 'slow_key', timeout=0.05)
+
+        first, posted = (call.args[0] for call in hooks.after_response.call_args_list[:2])
+        self.assertGreater(first.connect, 0)
+        self.assertEqual(0, posted.connect)
+        self.assertEqual(len(b'{"a":1}'), posted.bytes_out)
+        self.assertIsInstance(hooks.on_error.call_args.args[1], requests.exceptions.ReadTimeout)
+
+    def test_pipedrive(self) -> None:
+        """
+        Asserts the Pipedrive client pages through the contacts over the httpx transport.
+        """
+        with Pipedrive('token', transport=HTTPXTransport(http2=False)) as pipe:
+            pipe.base_url = self.server.url
+            self.assertEqual(list(range(25)), [person["id"] for person in pipe.iter_persons(page_size=10)])
+
+    def test_connection_errors(self) -> None:
+        """
+        Asserts the connection errors are raised as requests exceptions.
+        """
+        self.source["endpoints"]["base_url"] = 'http://127.0.0.1:1'
+        with API(api_source=self.source, transport=HTTPXTransport()) as api:
+            self.assertRaises(requests.exceptions.ConnectionError, api.get, 'data_key')
@@ -0,0 +1,214 @@
+import asyncio
+import contextlib
+import datetime
+import threading
+import time
+
+import requests
+
+from apis.metrics import add_connect_time
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_HTTPX_POOL_MAXSIZE = 10
+
+
+class Transport:
+    """
+    Class responsible for sending the requests of an API, it is the interface the API relies on.
+
+    It mirrors the part of requests.Session the API uses, so a Session is the default transport: one method per HTTP
+    verb receiving the url, params and the requests keyword arguments, e.g. data, headers, timeout and stream, and
+    returning a requests.Response, or an object with the same attributes. Errors are raised as requests exceptions.
+    """
+
+    def request(self, method: str, url: str, params: dict = None, **kwargs):
+        raise NotImplementedError
+
+    def get(self, url: str, params: dict = None, **kwargs):
+        return self.request('get', url, params=params, **kwargs)
+
+    def post(self, url: str, params: dict = None, **kwargs):
+        return self.request('post', url, params=params, **kwargs)
+
+    def put(self, url: str, params: dict = None, **kwargs):
+        return self.request('put', url, params=params, **kwargs)
+
+    def patch(self, url: str, params: dict = None, **kwargs):
+        return self.request('patch', url, params=params, **kwargs)
+
+    def delete(self, url: str, params: dict = None, **kwargs):
+        return self.request('delete', url, params=params, **kwargs)
+
+    def head(self, url: str, params: dict = None, **kwargs):
+        return self.request('head', url, params=params, **kwargs)
+
+    def close(self) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def _mapped_errors():
+    """
+    Raises the httpx errors as the equivalent requests exceptions, which the API handles.
+    """
+    try:
+        yield
+    except httpx.ConnectTimeout as e:
+        raise requests.exceptions.ConnectTimeout(str(e)) from e
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.ReadTimeout(str(e)) from e
+    except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError) as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+    except httpx.TooManyRedirects as e:
+        raise requests.exceptions.TooManyRedirects(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.exceptions.RequestException(str(e)) from e
+
+
+class _SentRequest:
+    __slots__ = ('body',)
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+
+class HTTPXResponse:
+    """
+    Class responsible for exposing a httpx response with the attributes of a requests.Response read by the API.
+    """
+
+    def __init__(self, response, headers_at: float, transport) -> None:
+        """
+        :param httpx.Response response: response received.
+        :param float headers_at: seconds from sending the request to receiving the response headers.
+        :param HTTPXTransport transport: transport the response belongs to, its body is read in the transport loop.
+        """
+        self._response = response
+        self._transport = transport
+        self.status_code = response.status_code
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+        self.http_version = response.http_version
+        self.elapsed = datetime.timedelta(seconds=headers_at)
+        self.request = _SentRequest(response.request.content)
+
+    @property
+    def content(self) -> bytes:
+        with _mapped_errors():
+            return self._transport._call(self._response.aread())
+
+    def iter_content(self, chunk_size: int = None):
+        chunks = self._response.aiter_bytes(chunk_size)
+        with _mapped_errors():
+            while True:
+                try:
+                    yield self._transport._call(chunks.__anext__())
+                except StopAsyncIteration:
+                    return
+
+    def close(self) -> None:
+        self._transport._call(self._response.aclose())
+
+
+def _trace_connect(durations: list):
+    """
+    :return: httpcore trace callback appending the seconds spent opening connections to durations.
+    """
+    starts = {}
+
+    async def trace(name: str, info: dict) -> None:
+        if not name.startswith(('connection.connect_tcp.', 'connection.start_tls.')):
+            return
+        phase, _, stage = name.rpartition('.')
+        if stage == 'started':
+            starts[phase] = time.perf_counter()
+        elif phase in starts:
+            durations.append(time.perf_counter() - starts.pop(phase))
+    return trace
+
+
+class HTTPXTransport(Transport):
+    """
+    Class responsible for sending the requests with httpx, which multiplexes the concurrent requests to a host over a
+    single HTTP/2 connection when the server supports it, instead of using one connection per request in flight.
+
+    The requests are sent by a httpx AsyncClient running in a dedicated event loop thread, the calling threads wait
+    for them. The sync httpx client is not used because it can send the streams of a shared HTTP/2 connection out of
+    order when called from several threads.
+
+    HTTP/2 is negotiated through TLS, so plain http urls are requested with HTTP/1.1, unless http1 is False and the
+    server is known to speak HTTP/2 without TLS. It needs the httpx and h2 packages: pip install httpx[http2].
+    """
+
+    def __init__(self, http2: bool = True, pool_maxsize: int = DEFAULT_HTTPX_POOL_MAXSIZE, keep_alive: bool = True,
+                 verify: bool = True, http1: bool = True) -> None:
+        """
+        :param bool http2: if True, HTTP/2 is used with the servers supporting it.
+        :param int pool_maxsize: maximum number of connections kept alive, with HTTP/2 a single one serves a host.
+        :param bool keep_alive: if False, no connection is kept alive between requests.
+        :param bool verify: if False, the TLS certificates are not verified.
+        :param bool http1: if False, only HTTP/2 is spoken, also with plain http urls.
+        """
+        if httpx is None:
+            raise ValueError('The httpx transport is not installed, install it with: pip install httpx[http2].')
+        if not pool_maxsize > 0:
+            raise ValueError("pool_maxsize must be a integer greater than 0.")
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=pool_maxsize if keep_alive else 0)
+        self.client = httpx.AsyncClient(http1=http1, http2=http2, limits=limits, verify=verify, timeout=None)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='HTTPXTransport', daemon=True)
+        self._thread.start()
+
+    def _call(self, coroutine):
+        """
+        :return: the result of the coroutine, run in the transport loop.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _send(self, request, stream: bool, follow_redirects: bool) -> tuple:
+        started = time.perf_counter()
+        response = await self.client.send(request, stream=True, follow_redirects=follow_redirects)
+        headers_at = time.perf_counter() - started
+        if not stream:
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        return response, headers_at
+
+    def request(self, method: str, url: str, params: dict = None, data=None, headers: dict = None, timeout=None,
+                stream: bool = False, allow_redirects: bool = True, **kwargs) -> HTTPXResponse:
+        """
+        Sends a request, with the same parameters as requests.Session.request.
+
+        :return: the response, with the body already read unless stream is True.
+        """
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        if isinstance(data, (bytes, str)) or data is None:
+            kwargs['content'] = data
+        else:
+            kwargs['data'] = data
+        connect_durations = []
+        request = self.client.build_request(method.upper(), url, params=params, headers=headers, timeout=timeout,
+                                            extensions={"trace": _trace_connect(connect_durations)}, **kwargs)
+        try:
+            with _mapped_errors():
+                response, headers_at = self._call(self._send(request, stream, allow_redirects))
+        finally:
+            # the connection is opened in the loop thread, its time is reported to the calling one
+            add_connect_time(sum(connect_durations))
+        return HTTPXResponse(response, headers_at, self)
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        self._call(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
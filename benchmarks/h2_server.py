@@ -0,0 +1,118 @@
+"""
+Local HTTP/2 server, without TLS, answering the requests of the transport benchmark.
+"""
+import socket
+import threading
+import time
+from urllib.parse import urlparse, parse_qsl
+
+import h2.config
+import h2.connection
+import h2.events
+
+
+class H2Server:
+    """
+    Class responsible for serving a handler over HTTP/2 with prior knowledge, i.e. h2c, from a local thread.
+
+    Every stream is answered by its own thread, so slow responses are multiplexed over the same connection.
+    """
+
+    def __init__(self, handler, latency: float = 0.0) -> None:
+        """
+        :param handler: callable receiving (method, path, query) and returning a (status, body bytes) tuple.
+        :param float latency: seconds every response is delayed.
+        """
+        self.handler = handler
+        self.latency = latency
+        self.connections = 0
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._socket = socket.create_server(('127.0.0.1', 0))
+        self._closed = False
+
+    @property
+    def url(self) -> str:
+        host, port = self._socket.getsockname()
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._closed = True
+        self._socket.close()
+
+    def _accept(self) -> None:
+        while not self._closed:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=_Connection(self, client).serve, daemon=True).start()
+
+
+class _Connection:
+
+    def __init__(self, server: H2Server, client: socket.socket) -> None:
+        self.server = server
+        self.client = client
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        # guards the h2 state machine and the socket writes, notified when the flow control windows grow
+        self.window = threading.Condition()
+        self.headers = {}
+
+    def _flush(self) -> None:
+        data = self.conn.data_to_send()
+        if data:
+            self.client.sendall(data)
+
+    def serve(self) -> None:
+        with self.window:
+            self.conn.initiate_connection()
+            self._flush()
+        try:
+            while True:
+                data = self.client.recv(65535)
+                if not data:
+                    return
+                with self.window:
+                    for event in self.conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            self.headers[event.stream_id] = dict(event.headers)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            threading.Thread(target=self._respond, args=(event.stream_id,), daemon=True).start()
+                        elif isinstance(event, h2.events.WindowUpdated):
+                            self.window.notify_all()
+                        elif isinstance(event, h2.events.DataReceived):
+                            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    self._flush()
+        except OSError:
+            return
+        finally:
+            self.client.close()
+
+    def _respond(self, stream_id: int) -> None:
+        headers = self.headers.pop(stream_id)
+        parsed = urlparse(headers[':path'])
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        status, body = self.server.handler(headers[':method'], parsed.path, dict(parse_qsl(parsed.query)))
+        with self.server._lock:
+            self.server.request_count += 1
+
+        with self.window:
+            self.conn.send_headers(stream_id, [(':status', str(status)), ('content-type', 'application/json'),
+                                               ('content-length', str(len(body)))])
+            while body:
+                size = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                if size <= 0:
+                    self.window.wait(1)
+                    continue
+                self.conn.send_data(stream_id, body[:size])
+                body = body[size:]
+            self.conn.end_stream(stream_id)
+            self._flush()
@@ -0,0 +1,279 @@
+"""
+Measures the throughput, latency and memory of the API wrappers against a local mock server.
+
+Every scenario runs in the sequential, threaded and async modes, and the results are written as JSON, so runs of
+different versions can be compared.
+
+Usage: python -m benchmarks.harness [--scenarios api_get,pipedrive_paging,proxycurl_lookup]
+       [--modes sequential,threaded,async] [--latency 0.005] [--throttle-every 50] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from apis.api import API, RequestStats, SUCCESS_HTTP_CODES
+from apis.async_api import AsyncAPI
+from apis.bulk import run_bulk, run_bulk_async
+from apis.codec import get_codec
+from apis.metrics import RequestHooks
+from apis.pipedrive import Pipedrive, AsyncPipedrive, USERS_ME
+from apis.proxycurl import Proxycurl, AsyncProxycurl
+from apis.retry import RetryPolicy
+from benchmarks.server import MockAPIServer
+
+SCENARIOS = ('api_get', 'pipedrive_paging', 'proxycurl_lookup')
+MODES = ('sequential', 'threaded', 'async')
+
+
+class LatencyRecorder(RequestHooks):
+    """
+    Class responsible for recording the duration of every request attempt.
+    """
+
+    def __init__(self) -> None:
+        self.latencies = []
+        self.errors = 0
+
+    def after_response(self, event) -> None:
+        self.latencies.append(event.elapsed)
+
+    def on_error(self, event, error) -> None:
+        self.errors += 1
+
+
+def percentile(values: list, q: float) -> float or None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _client_kwargs(config: argparse.Namespace, recorder: LatencyRecorder, asynchronous: bool) -> dict:
+    kwargs = {"hooks": [recorder], "pool_maxsize": max(config.workers, 1)}
+    if not asynchronous:
+        kwargs["retry_policy"] = RetryPolicy(max_attempts=5, backoff_base=0.01)
+    return kwargs
+
+
+def _api_source(url: str) -> dict:
+    return {"endpoints": {"base_url": url, "users_me": USERS_ME}}
+
+
+def _check_status(stats: RequestStats) -> None:
+    if stats.status_code not in SUCCESS_HTTP_CODES:
+        raise Exception(f'Request failed -> ({stats.status_code})')
+
+
+def api_get(mode: str, url: str, config: argparse.Namespace, recorder: LatencyRecorder) -> tuple:
+    """
+    GETs the 'users/me' endpoint config.requests times.
+
+    :return: number of requests made and number of failed ones.
+    """
+    params = {'api_token': 'benchmark'}
+    if mode == 'async':
+        async def run() -> tuple:
+            async with AsyncAPI(_api_source(url), **_client_kwargs(config, recorder, True)) as api:
+                async def get(i) -> None:
+                    stats = RequestStats()
+                    await api.get('users_me', params=params, stats=stats)
+                    _check_status(stats)
+
+                return _count([result async for result in run_bulk_async(get, range(config.requests),
+                                                                         config.workers)])
+        return asyncio.run(run())
+
+    with API(_api_source(url), **_client_kwargs(config, recorder, False)) as api:
+        def get(i) -> None:
+            stats = RequestStats()
+            api.get('users_me', params=params, stats=stats)
+            _check_status(stats)
+
+        if mode == 'sequential':
+            return _run_sequential(get, range(config.requests))
+        return _count(run_bulk(get, range(config.requests), config.workers))
+
+
+def pipedrive_paging(mode: str, url: str, config: argparse.Namespace, recorder: LatencyRecorder) -> tuple:
+    """
+    Pages through every contact of the mock account, the threaded mode prefetches config.workers pages.
+
+    :return: number of contacts received and number of failed page requests.
+    """
+    if mode == 'async':
+        async def run() -> tuple:
+            async with AsyncPipedrive('benchmark', **_client_kwargs(config, recorder, True)) as client:
+                client.base_url = url
+                received, errors, start = 0, 0, 0
+                while start is not None:
+                    try:
+                        data, start = await client.get_persons(start=start, limit=config.page_size)
+                    except Exception:
+                        # AsyncAPI does not retry, throttled pages are requested again
+                        errors += 1
+                        continue
+                    received += len(data or [])
+                return received, errors
+        return asyncio.run(run())
+
+    with Pipedrive('benchmark', **_client_kwargs(config, recorder, False)) as client:
+        client.base_url = url
+        prefetch = config.workers if mode == 'threaded' else 0
+        return sum(1 for _ in client.iter_persons(page_size=config.page_size, prefetch=prefetch)), 0
+
+
+def proxycurl_lookup(mode: str, url: str, config: argparse.Namespace, recorder: LatencyRecorder) -> tuple:
+    """
+    Looks up config.requests LinkedIn profiles.
+
+    :return: number of profiles looked up and number of failed lookups.
+    """
+    profiles = [f'https://www.linkedin.com/in/profile-{i}' for i in range(config.requests)]
+    if mode == 'async':
+        async def run() -> tuple:
+            async with AsyncProxycurl('benchmark', **_client_kwargs(config, recorder, True)) as client:
+                client.base_url = url
+                return _count([result async for result in client.bulk_get_linkedin_profiles(profiles,
+                                                                                           config.workers)])
+        return asyncio.run(run())
+
+    with Proxycurl('benchmark', **_client_kwargs(config, recorder, False)) as client:
+        client.base_url = url
+        if mode == 'sequential':
+            return _run_sequential(lambda profile: client._checked_lookup(client.get_linkedin_profile, profile),
+                                   profiles)
+        return _count(client.bulk_get_linkedin_profiles(profiles, config.workers))
+
+
+def _run_sequential(func, items) -> tuple:
+    """
+    :return: number of items func was called with and number of calls that raised.
+    """
+    total = errors = 0
+    for item in items:
+        total += 1
+        try:
+            func(item)
+        except Exception:
+            errors += 1
+    return total, errors
+
+
+def _count(results) -> tuple:
+    """
+    :return: number of BulkResult and number of failed ones.
+    """
+    total = errors = 0
+    for result in results:
+        total += 1
+        errors += not result.ok
+    return total, errors
+
+
+def run_benchmark(scenario: str, mode: str, server: MockAPIServer, config: argparse.Namespace) -> dict:
+    """
+    Runs the scenario twice, the second run traces the allocations, which slows it down too much to be timed.
+
+    :return: dict with the measurements of the scenario in the mode.
+    """
+    recorder = LatencyRecorder()
+    requests_before, throttled_before = server.request_count, server.throttled
+    started = time.perf_counter()
+    items, errors = globals()[scenario](mode, server.url, config, recorder)
+    duration = time.perf_counter() - started
+    requests = server.request_count - requests_before
+    throttled = server.throttled - throttled_before
+
+    peak = None
+    if config.memory:
+        tracemalloc.start()
+        globals()[scenario](mode, server.url, config, LatencyRecorder())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "scenario": scenario,
+        "mode": mode,
+        "items": items,
+        "errors": errors + recorder.errors,
+        "requests": requests,
+        "throttled": throttled,
+        "duration_s": round(duration, 6),
+        "requests_per_s": round(requests / duration, 2),
+        "items_per_s": round(items / duration, 2),
+        "p50_ms": _ms(percentile(recorder.latencies, 0.5)),
+        "p99_ms": _ms(percentile(recorder.latencies, 0.99)),
+        "peak_memory_kb": None if peak is None else round(peak / 1024, 1),
+    }
+
+
+def _ms(seconds: float or None) -> float or None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _git_commit() -> str or None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma separated scenarios to run')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma separated modes to run')
+    parser.add_argument('--requests', type=int, default=500, help='requests of the api_get and proxycurl scenarios')
+    parser.add_argument('--persons', type=int, default=5000, help='contacts of the mock Pipedrive account')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--experiences', type=int, default=10, help='experiences per Proxycurl profile')
+    parser.add_argument('--workers', type=int, default=8, help='threads, or tasks, of the concurrent modes')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every response is delayed')
+    parser.add_argument('--throttle-every', type=int, default=0, help='answer every n-th request with 429')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the peak memory runs')
+    parser.add_argument('--output', help='file the JSON results are written to, defaults to stdout')
+    config = parser.parse_args(argv)
+
+    config.scenarios = config.scenarios.split(',')
+    config.modes = config.modes.split(',')
+    unknown = set(config.scenarios) - set(SCENARIOS) | set(config.modes) - set(MODES)
+    if unknown:
+        parser.error(f'unknown scenarios or modes: {", ".join(sorted(unknown))}')
+    return config
+
+
+def main(argv: list = None) -> dict:
+    config = parse_args(argv)
+    # 429s and failed items are expected and reported in the results
+    logging.getLogger('APIs').setLevel(logging.CRITICAL)
+    with MockAPIServer(total_persons=config.persons, experiences=config.experiences, latency=config.latency,
+                       throttle_every=config.throttle_every) as server:
+        server.warm(config.page_size)
+        results = [run_benchmark(scenario, mode, server, config)
+                   for scenario in config.scenarios for mode in config.modes]
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_codec": get_codec().name,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "config": {key: value for key, value in vars(config).items() if key != 'output'},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if config.output:
+        with open(config.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares the installed JSON codecs encoding and decoding Pipedrive persons pages.
+
+Usage: python -m benchmarks.json_codec [--pages N] [--page-size N] [--repeat N]
+"""
+import argparse
+import time
+
+from apis import codec
+from apis.codec import get_codec
+from benchmarks.payloads import persons_page
+
+
+def best_of(func, arg, repeat: int) -> float:
+    """
+    :return: the shortest time, in seconds, of repeat calls of func.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(pages: int = 20, page_size: int = 100, repeat: int = 5) -> list:
+    """
+    :return: list with the encoding and decoding throughput of every installed codec.
+    """
+    documents = [persons_page(start, page_size) for start in range(0, pages * page_size, page_size)]
+    encoded = get_codec('json').dumps(documents)
+    results = []
+    for name, (_, module) in codec.CODECS.items():
+        if module is None:
+            continue
+        json_codec = get_codec(name)
+        dumps = best_of(lambda docs: [json_codec.dumps(doc) for doc in docs], documents, repeat)
+        loads = best_of(json_codec.loads, encoded, repeat)
+        results.append({"codec": name, "bytes": len(encoded), "dumps_s": dumps, "loads_s": loads,
+                        "dumps_mb_s": len(encoded) / dumps / 1e6, "loads_mb_s": len(encoded) / loads / 1e6})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.pages, args.page_size, args.repeat)
+    baseline = next(result for result in results if result["codec"] == 'json')
+    print(f'{args.pages} pages of {args.page_size} persons, {baseline["bytes"] / 1e6:.1f} MB')
+    print(f'{"codec":<8} {"dumps MB/s":>11} {"loads MB/s":>11} {"dumps x":>8} {"loads x":>8}')
+    for result in results:
+        print(f'{result["codec"]:<8} {result["dumps_mb_s"]:>11.1f} {result["loads_mb_s"]:>11.1f}'
+              f' {baseline["dumps_s"] / result["dumps_s"]:>8.1f} {baseline["loads_s"] / result["loads_s"]:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Payloads shaped like the responses of the APIs consumed by the package, used by the benchmarks.
+"""
+
+
+def person(id: int) -> dict:
+    """
+    :return: a Pipedrive person with the fields returned by the persons endpoint.
+    """
+    return {
+        "id": id,
+        "company_id": 7421,
+        "owner_id": {"id": 1130, "name": "Sales Owner", "email": "owner@example.com", "has_pic": 0,
+                     "pic_hash": None, "active_flag": True, "value": 1130},
+        "org_id": {"name": f"Organization {id % 97}", "people_count": 12, "owner_id": 1130,
+                   "address": "Av. Paulista, 1000 - Bela Vista, São Paulo - SP", "active_flag": True,
+                   "cc_email": "org@pipedrivemail.com", "value": id % 97},
+        "name": f"Pessoa Número {id}",
+        "first_name": "Pessoa",
+        "last_name": f"Número {id}",
+        "open_deals_count": id % 5,
+        "closed_deals_count": id % 3,
+        "email_messages_count": id % 40,
+        "activities_count": id % 11,
+        "done_activities_count": id % 7,
+        "phone": [{"label": "work", "value": f"+55 11 9{id:08d}", "primary": True}],
+        "email": [{"label": "work", "value": f"person.{id}@example.com", "primary": True},
+                  {"label": "home", "value": f"person.{id}@mail.example.org", "primary": False}],
+        "first_char": "p",
+        "update_time": "2023-03-14 12:30:45",
+        "add_time": "2021-07-01 09:15:00",
+        "visible_to": "3",
+        "label": None,
+        "cc_email": "company@pipedrivemail.com",
+        "owner_name": "Sales Owner",
+        "notes": "Contato vindo do evento de março, prefere ligação à tarde. " * 3,
+    }
+
+
+def persons_page(start: int = 0, limit: int = 100, total: int = None) -> dict:
+    """
+    :return: a Pipedrive persons page, with more_items_in_collection set while start + limit is below total.
+    """
+    total = start + limit if total is None else total
+    end = min(start + limit, total)
+    return {
+        "success": True,
+        "data": [person(id) for id in range(start, end)] or None,
+        "additional_data": {"pagination": {"start": start, "limit": limit, "more_items_in_collection": end < total,
+                                           "next_start": end}},
+    }
@@ -0,0 +1,70 @@
+"""
+Compares the memory held by Pipedrive contacts kept as decoded dictionaries, compact records and a column batch.
+
+Usage: python -m benchmarks.person_records [--persons 20000] [--page-size 100]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from apis.pipedrive import DEFAULT_PERSON_FIELDS, compact_persons
+from apis.records import ColumnBatch
+from benchmarks.payloads import persons_page
+
+
+def traced(func) -> int:
+    """
+    :return: bytes still allocated by func once it returns, i.e. the size of its result.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(persons: int = 20000, page_size: int = 100) -> list:
+    """
+    :return: list with the bytes per contact of every representation.
+    """
+    pages = [json.dumps(persons_page(start, page_size, persons)) for start in range(0, persons, page_size)]
+
+    def dicts() -> list:
+        return [person for page in pages for person in json.loads(page)["data"]]
+
+    def records() -> list:
+        return [record for page in pages for record in compact_persons(json.loads(page)["data"])]
+
+    def batch() -> ColumnBatch:
+        result = ColumnBatch(DEFAULT_PERSON_FIELDS)
+        for page in pages:
+            for record in compact_persons(json.loads(page)["data"]):
+                result.append(record)
+        return result
+
+    baseline = None
+    results = []
+    for name, func in (('dicts', dicts), ('records', records), ('column_batch', batch)):
+        size = traced(func)
+        baseline = baseline or size
+        results.append({"representation": name, "bytes_per_person": round(size / persons, 1),
+                        "reduction": round(baseline / size, 2)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--persons', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    for result in run(args.persons, args.page_size):
+        print(f'{result["representation"]:>12}: {result["bytes_per_person"]:>8} bytes/person,'
+              f' {result["reduction"]}x smaller')
+
+
+if __name__ == '__main__':
+    main()
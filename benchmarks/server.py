@@ -0,0 +1,97 @@
+"""
+Local HTTP server emulating the Pipedrive and Proxycurl endpoints used by the benchmarks.
+"""
+import itertools
+import json
+import threading
+import time
+
+from apis import pipedrive, proxycurl
+from apis.tests.stub_server import StubServer
+from benchmarks.payloads import persons_page
+
+
+def profile(experiences: int) -> dict:
+    """
+    :return: a Proxycurl LinkedIn profile with the given number of experiences.
+    """
+    return {
+        "public_identifier": "benchmark-profile",
+        "full_name": "Pessoa Benchmark",
+        "headline": "Engenheira de Software",
+        "country": "BR",
+        "city": "São Paulo",
+        "experiences": [{"company": f"Empresa {i}", "title": "Engenheira de Software",
+                         "description": "Desenvolvimento de integrações com APIs de CRM. " * 4,
+                         "starts_at": {"day": 1, "month": 1 + i % 12, "year": 2000 + i % 20},
+                         "ends_at": None if i == 0 else {"day": 1, "month": 1, "year": 2001 + i % 20},
+                         "location": "São Paulo, Brasil"} for i in range(experiences)],
+        "education": [{"school": "Universidade de São Paulo", "degree_name": "Bacharelado"}],
+    }
+
+
+class MockAPIServer(StubServer):
+    """
+    Class responsible for serving the 'users/me', 'persons' and Proxycurl endpoints from a local thread.
+
+    The bodies are encoded once, so serving them costs little besides the configured latency.
+    """
+
+    def __init__(self, total_persons: int = 1000, experiences: int = 10, latency: float = 0.0,
+                 throttle_every: int = 0, retry_after: float = 0.01) -> None:
+        """
+        :param int total_persons: number of contacts served by the paginated 'persons' endpoint.
+        :param int experiences: number of experiences of the Proxycurl profiles, i.e. their payload size.
+        :param float latency: seconds every response is delayed.
+        :param int throttle_every: every throttle_every-th request is answered with 429, 0 never throttles.
+        :param float retry_after: value of the Retry-After header of the 429 responses.
+        """
+        self.total_persons = total_persons
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.throttled = 0
+        self._counter = itertools.count(1)
+        self._counter_lock = threading.Lock()
+        self._pages = {}
+        self._users_me = json.dumps({"success": True, "data": {"id": 1, "company_domain": "benchmark"}}).encode()
+        self._profile = json.dumps(profile(experiences)).encode()
+        self._email = json.dumps({"url": "https://www.linkedin.com/in/benchmark-profile"}).encode()
+
+        super(MockAPIServer, self).__init__({
+            pipedrive.USERS_ME: self._route(lambda query: self._users_me),
+            pipedrive.PERSONS: self._route(self._persons),
+            proxycurl.DATA_FROM_PROFILE: self._route(lambda query: self._profile),
+            proxycurl.URL_FROM_EMAIL: self._route(lambda query: self._email),
+        })
+
+    def _route(self, body):
+        def route(method, query, request_body):
+            if self.latency:
+                time.sleep(self.latency)
+            if self.throttle_every:
+                with self._counter_lock:
+                    throttled = next(self._counter) % self.throttle_every == 0
+                    self.throttled += throttled
+                if throttled:
+                    return 429, {"error": "Too Many Requests"}, {"Retry-After": str(self.retry_after)}
+            return 200, body(query)
+        return route
+
+    def warm(self, page_size: int) -> None:
+        """
+        Encodes every 'persons' page of page_size contacts ahead, so they are not built while a benchmark runs.
+        """
+        for start in range(0, self.total_persons + 1, page_size):
+            self._persons({'start': start, 'limit': page_size})
+
+    def _persons(self, query: dict) -> bytes:
+        start, limit = int(query.get('start', 0)), int(query.get('limit', 100))
+        page = self._pages.get((start, limit))
+        if page is None:
+            page = self._pages[(start, limit)] = json.dumps(persons_page(start, limit, self.total_persons)).encode()
+        return page
+
+    @property
+    def request_count(self) -> int:
+        return len(self.requests)
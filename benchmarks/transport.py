@@ -0,0 +1,87 @@
+"""
+Compares the sockets opened and the throughput of the requests and httpx transports at high concurrency.
+
+The requests and httpx HTTP/1.1 transports are measured against the HTTP/1.1 mock server, and the httpx HTTP/2 one
+against a local h2c server. Needs the httpx and h2 packages: pip install httpx[http2].
+
+Usage: python -m benchmarks.transport [--requests 2000] [--concurrency 128] [--latency 0.01] [--output results.json]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from apis.api import API, RequestStats, SUCCESS_HTTP_CODES
+from apis.bulk import run_bulk
+from apis.pipedrive import USERS_ME
+from apis.transport import HTTPXTransport
+from benchmarks.h2_server import H2Server
+from benchmarks.server import MockAPIServer
+
+TRANSPORTS = ('requests', 'httpx_http1', 'httpx_http2')
+
+
+def _transport(name: str, concurrency: int):
+    if name == 'requests':
+        return None
+    if name == 'httpx_http1':
+        return HTTPXTransport(http2=False, pool_maxsize=concurrency)
+    return HTTPXTransport(http1=False, pool_maxsize=concurrency)
+
+
+def run_transport(name: str, url: str, config: argparse.Namespace) -> tuple:
+    """
+    GETs the 'users/me' endpoint config.requests times, with config.concurrency requests in flight.
+
+    :return: number of failed requests and duration in seconds.
+    """
+    source = {"endpoints": {"base_url": url, "users_me": USERS_ME}}
+    with API(source, pool_maxsize=config.concurrency, transport=_transport(name, config.concurrency)) as api:
+        def get(i) -> None:
+            stats = RequestStats()
+            api.get('users_me', params={'api_token': 'benchmark'}, stats=stats)
+            if stats.status_code not in SUCCESS_HTTP_CODES:
+                raise Exception(f'Request failed -> ({stats.status_code})')
+
+        started = time.perf_counter()
+        errors = sum(not result.ok for result in run_bulk(get, range(config.requests), config.concurrency))
+        return errors, time.perf_counter() - started
+
+
+def main(argv: list = None) -> list:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transports', default=','.join(TRANSPORTS), help='comma separated transports to run')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=128, help='requests in flight at the same time')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds every response is delayed')
+    parser.add_argument('--output', help='file the JSON results are written to, defaults to stdout')
+    config = parser.parse_args(argv)
+    logging.getLogger('APIs').setLevel(logging.CRITICAL)
+
+    results = []
+    for name in config.transports.split(','):
+        if name not in TRANSPORTS:
+            parser.error(f'unknown transport: {name}')
+        if name == 'httpx_http2':
+            server = H2Server(lambda method, path, query: (200, b'{"success": true, "data": {"id": 1}}'),
+                              latency=config.latency)
+        else:
+            server = MockAPIServer(latency=config.latency)
+        with server:
+            errors, duration = run_transport(name, server.url, config)
+            results.append({"transport": name, "requests": config.requests, "concurrency": config.concurrency,
+                            "errors": errors, "connections": server.connections, "duration_s": round(duration, 6),
+                            "requests_per_s": round(config.requests / duration, 2)})
+
+    output = json.dumps(results, indent=2)
+    if config.output:
+        with open(config.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()